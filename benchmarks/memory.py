@@ -0,0 +1,135 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Memory benchmark of the extraction stage on synthetic query results.
+
+    python benchmarks/memory.py --classes 10000 --properties 5 --enumerations 20000
+
+The compactor is built from a graph holding the triples of the rows, as in
+respecter run, and the graph is dropped before extracting. Reports the memory
+the graph takes, the peak traced memory while extracting the models, the memory
+retained afterwards (which includes the graph if anything still references it),
+and the peak traced memory of rendering them (streamed to os.devnull).
+"""
+import argparse
+import gc
+import os
+import tracemalloc
+
+from rdflib import RDF, RDFS, Graph, Literal, Namespace, URIRef
+
+from respecter.compaction import UriCompactor
+from respecter.core import write_template
+from respecter.helpers import extract_terms
+from respecter.models import Ontology
+
+BASE = "https://example.org/ontology/"
+XSD_STRING = URIRef("http://www.w3.org/2001/XMLSchema#string")
+SH = Namespace("http://www.w3.org/ns/shacl#")
+
+
+def synthetic_rows(classes: int, properties: int, enumerations: int, groups: int):
+    """
+    Build concept and enumeration rows shaped like the results of the SPARQL queries.
+    """
+    concepts = [
+        {
+            "domain": URIRef(f"{BASE}Class{i}"),
+            "classLabel": Literal(f"Class{i}"),
+            "classDefinition": Literal(f"Definition of class {i}."),
+            "property": URIRef(f"{BASE}property{i}_{j}"),
+            "propertyLabel": Literal(f"property{i}_{j}"),
+            "propertyDefinition": Literal(f"Definition of property {j} of class {i}."),
+            "range": XSD_STRING if j % 2 else URIRef(f"{BASE}Class{(i + j) % classes}"),
+        }
+        for i in range(classes)
+        for j in range(properties)
+    ]
+    enumerations = [
+        {
+            "enumerationValue": URIRef(f"{BASE}Value{i}"),
+            "enumerationLabel": Literal(f"Value{i}"),
+            "enumerationDefinition": Literal(f"Definition of value {i}."),
+            "property": URIRef(f"{BASE}property{i % classes}_0"),
+            "group": URIRef(f"{BASE}Group{i % groups}"),
+            "groupLabel": Literal(f"Group{i % groups}"),
+            "groupDefinition": Literal(f"Definition of group {i % groups}."),
+        }
+        for i in range(enumerations)
+    ]
+    return concepts, enumerations
+
+
+def synthetic_graph(concepts_rows, enumerations_rows) -> Graph:
+    """
+    Build a graph holding the terms of the rows, with the prefixes of a real ontology bound.
+    """
+    graph = Graph()
+    graph.bind("ex", BASE)
+    for row in concepts_rows:
+        graph.add((row["domain"], RDFS.label, row["classLabel"]))
+        graph.add((row["property"], RDFS.label, row["propertyLabel"]))
+        graph.add((row["property"], SH.datatype, row["range"]))
+    for row in enumerations_rows:
+        graph.add((row["enumerationValue"], RDF.type, row["group"]))
+        graph.add((row["enumerationValue"], RDFS.label, row["enumerationLabel"]))
+    return graph
+
+
+def measure(concepts_rows, enumerations_rows):
+    gc.collect()
+    tracemalloc.start()
+    graph = synthetic_graph(concepts_rows, enumerations_rows)
+    graph_size, _ = tracemalloc.get_traced_memory()
+    compactor = UriCompactor.from_graph(graph, current_ontology_url=BASE)
+    del graph
+    gc.collect()
+
+    tracemalloc.reset_peak()
+    classes, properties, enumerations = extract_terms(concepts_rows, enumerations_rows, compactor)
+    gc.collect()
+    retained, extraction_peak = tracemalloc.get_traced_memory()
+
+    tracemalloc.reset_peak()
+    # Streamed to a sink that keeps nothing, so that the peak is the memory of rendering itself
+    with open(os.devnull, "w") as sink:
+        write_template(sink, Ontology(), classes, properties, enumerations)
+    _, render_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return graph_size, extraction_peak, retained, render_peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--classes", type=int, default=10000)
+    parser.add_argument("--properties", type=int, default=5, help="Properties per class")
+    parser.add_argument("--enumerations", type=int, default=20000)
+    parser.add_argument("--groups", type=int, default=100)
+    args = parser.parse_args()
+
+    concepts_rows, enumerations_rows = synthetic_rows(
+        args.classes, args.properties, args.enumerations, args.groups
+    )
+    graph_size, extraction_peak, retained, render_peak = measure(concepts_rows, enumerations_rows)
+    print(f"rows:             {len(concepts_rows)} concepts, {len(enumerations_rows)} enumerations")
+    print(f"graph:            {graph_size / 2**20:8.1f} MiB")
+    print(f"extraction peak:  {extraction_peak / 2**20:8.1f} MiB")
+    print(f"retained models:  {retained / 2**20:8.1f} MiB")
+    print(f"render peak:      {render_peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Time each stage of the pipeline on a synthetic ontology.
+
+    python benchmarks/run.py --shapes 500 --engine native --repeat 5 --fail
+
+Each stage is timed separately (best of the repeats) and the results are
+appended to a history file. Every stage is compared with the best time of
+the latest runs with the same parameters and engine: a stage slower by more
+than the threshold is reported as a regression, which fails the run with --fail.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from synthetic import add_parameter_arguments, parameters_from_arguments, write_ontology
+
+from respecter.cache import default_cache_dir
+from respecter.compaction import UriCompactor
+from respecter.core import QUERY_STAGES, QueryEngine, parse_ontology, run_stage, stream_template
+from respecter.helpers import extract_terms
+from respecter.models import Ontology
+from respecter.sparql import SparqlConfig
+
+STAGES = ("parse",) + QUERY_STAGES + ("extract", "render", "write")
+# Timings depend on the machine, so the history stays out of the repository
+DEFAULT_HISTORY = default_cache_dir() / "benchmarks" / "history.json"
+
+
+@contextmanager
+def timed(timings: Dict[str, float], stage: str):
+    start = time.perf_counter()
+    yield
+    timings[stage] = time.perf_counter() - start
+
+
+def run_pipeline(ontology_path: Path, config_path: Path, output_path: Path, engine: QueryEngine):
+    """
+    Run the whole pipeline once.
+
+    Returns:
+        The time of each of the STAGES and the number of result rows of each query.
+    """
+    timings = {}
+    config = SparqlConfig.from_path(config_path)
+
+    with timed(timings, "parse"):
+        graph = parse_ontology(ontology_path)
+
+    results = {}
+    for stage in QUERY_STAGES:
+        with timed(timings, stage):
+            results[stage] = run_stage(graph, stage, config, engine)
+
+    with timed(timings, "extract"):
+        compactor = UriCompactor.from_graph(
+            graph,
+            current_ontology_url=config.get_uri_base() + config.get_uri_separator(),
+        )
+        concepts, properties, enumerations = extract_terms(
+            results["concepts"], results["enumerations"], compactor
+        )
+        ontology = Ontology()
+        ontology.import_from_rdf(results["ontology"][0])
+
+    with timed(timings, "render"):
+        chunks = list(stream_template(ontology, concepts, properties, enumerations))
+
+    with timed(timings, "write"):
+        with open(output_path, "w") as f:
+            f.writelines(chunks)
+            f.write("\n")
+
+    return timings, {stage: len(rows) for stage, rows in results.items()}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def load_history(history_path: Path) -> List[dict]:
+    if not history_path.exists():
+        return []
+    with open(history_path, "r") as f:
+        return json.load(f)
+
+
+def find_regressions(run: dict, history: List[dict], threshold: float, window: int) -> Dict[str, tuple]:
+    """
+    Compare the timings of a run with the best timings of the latest comparable runs.
+
+    Returns:
+        The (baseline, current) timings of the stages slower than the baseline by more than the threshold.
+    """
+    previous = [
+        entry
+        for entry in history
+        if entry["parameters"] == run["parameters"] and entry["engine"] == run["engine"]
+    ][-window:]
+    regressions = {}
+    for stage, seconds in run["timings"].items():
+        baseline = min(
+            (entry["timings"][stage] for entry in previous if stage in entry["timings"]),
+            default=None,
+        )
+        if baseline is not None and seconds > baseline * (1 + threshold):
+            regressions[stage] = (baseline, seconds)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_parameter_arguments(parser)
+    parser.add_argument("--engine", type=QueryEngine, default=QueryEngine.sparql, choices=list(QueryEngine))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of the pipeline, the best time is kept")
+    parser.add_argument("--history", type=Path, default=DEFAULT_HISTORY, help="JSON file of the previous results")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Slowdown reported as a regression (0.25 = 25%%)")
+    parser.add_argument("--window", type=int, default=5, help="Latest comparable runs to compare with")
+    parser.add_argument("--fail", action="store_true", help="Exit with an error on regressions")
+    parser.add_argument("--no-save", action="store_true", help="Do not add the results to the history")
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    parameters = parameters_from_arguments(args)
+    with tempfile.TemporaryDirectory() as directory:
+        ontology_path, config_path = write_ontology(Path(directory), parameters)
+        output_path = Path(directory) / "synthetic.html"
+
+        best = {}
+        for _ in range(args.repeat):
+            timings, rows = run_pipeline(ontology_path, config_path, output_path, args.engine)
+            for stage, seconds in timings.items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "parameters": asdict(parameters),
+        "engine": args.engine.value,
+        "rows": rows,
+        "timings": {stage: best[stage] for stage in STAGES},
+    }
+    history = load_history(args.history)
+    regressions = find_regressions(run, history, args.threshold, args.window)
+
+    print(f"{'stage':14} {'seconds':>9}")
+    for stage in STAGES:
+        line = f"{stage:14} {run['timings'][stage]:9.4f}"
+        if stage in regressions:
+            baseline, seconds = regressions[stage]
+            line += f"  REGRESSION: {seconds / baseline - 1:+.0%} over {baseline:.4f}"
+        print(line)
+    print(f"{'total':14} {sum(run['timings'].values()):9.4f}")
+    print("rows: " + ", ".join(f"{stage} {count}" for stage, count in rows.items()))
+
+    if not args.no_save:
+        history.append(run)
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.history, "w") as f:
+            json.dump(history, f, indent=2)
+
+    if regressions and args.fail:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Time the startup of the lightweight CLI commands against a budget.
+
+    python benchmarks/startup.py --repeat 10 --budget 0.2
+
+Each command runs in a new interpreter, and the median wall time is compared with
+the budget. The modules of the pipeline that the commands must not import are
+listed too, along with the slowest imports of the CLI module (from -X importtime).
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+COMMANDS = {
+    "--version": ["--version"],
+    "--help": ["--help"],
+    "generate-config": ["generate-config"],
+}
+# Modules only needed by the commands that run the pipeline.
+HEAVY_MODULES = ("rdflib", "jinja2", "respecter.core", "respecter.cache", "respecter.templates")
+DEFAULT_BUDGET = 0.3
+
+
+def time_command(args: List[str], repeat: int) -> float:
+    """
+    Get the median wall time of a CLI command run in a new interpreter, in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "respecter.cli", *args], capture_output=True, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def heavy_imports() -> List[str]:
+    """
+    Get the heavy modules imported along with the CLI module.
+    """
+    code = f"import sys, respecter.cli; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, text=True).stdout.split()
+
+
+def slowest_imports(count: int) -> Dict[str, float]:
+    """
+    Get the top-level imports of the CLI module with the highest cumulative time, in seconds.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import respecter.cli"], capture_output=True, check=True, text=True
+    ).stderr
+    imports = {}
+    for line in stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented by two spaces per level
+        if len(name) - len(name.lstrip()) <= 3:
+            imports[name.strip()] = int(cumulative) / 1e6
+    return dict(sorted(imports.items(), key=lambda item: -item[1])[:count])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each command, the median time is kept")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Maximum median time of a command, in seconds")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports of the CLI module to list")
+    args = parser.parse_args()
+
+    over_budget = False
+    print(f"{'command':16} {'seconds':>9}")
+    for name, command in COMMANDS.items():
+        seconds = time_command(command, args.repeat)
+        line = f"{name:16} {seconds:9.4f}"
+        if seconds > args.budget:
+            line += f"  OVER BUDGET ({args.budget:.2f}s)"
+            over_budget = True
+        print(line)
+
+    print("\nslowest imports of respecter.cli:")
+    for name, seconds in slowest_imports(args.top).items():
+        print(f"  {name:30} {seconds:9.4f}")
+
+    heavy = heavy_imports()
+    if heavy:
+        print("\nheavy modules imported by respecter.cli: " + ", ".join(heavy))
+
+    if over_budget or heavy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
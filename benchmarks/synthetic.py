@@ -0,0 +1,179 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Generate a synthetic SHACL ontology and its respecter configuration.
+
+    python benchmarks/synthetic.py out/ --shapes 500 --properties 10 --or-width 3
+
+The ontology has one node shape per class, each with property shapes whose
+ranges cycle through a datatype, another class, an enumeration group and,
+when or_width is set, a sh:or of classes.
+"""
+import argparse
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Tuple
+
+BASE = "https://example.org/bench"
+
+PREFIXES = f"""@prefix ex: <{BASE}#> .
+@prefix dct: <http://purl.org/dc/terms/> .
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix sh: <http://www.w3.org/ns/shacl#> .
+@prefix skos: <http://www.w3.org/2004/02/skos/core#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+"""
+
+CONFIG = f"""ontology:
+  uri_base: "{BASE}"
+  separator: "#"
+
+type:
+  class: <http://www.w3.org/2000/01/rdf-schema#Class>
+  property: <http://www.w3.org/1999/02/22-rdf-syntax-ns#Property>
+  enumeration: <{BASE}#EnumerationType>
+
+predicate:
+  definition: <http://www.w3.org/2000/01/rdf-schema#comment>
+  label: <http://www.w3.org/2000/01/rdf-schema#label>
+  example: <http://www.w3.org/2004/02/skos/core#example>
+"""
+
+
+@dataclass
+class OntologyParameters:
+    """
+    Size of a synthetic ontology.
+    """
+
+    shapes: int = 200
+    properties: int = 10
+    groups: int = 20
+    members: int = 10
+    or_width: int = 3
+
+
+def generate_ontology(parameters: OntologyParameters) -> str:
+    """
+    Generate the synthetic ontology as a Turtle document.
+    """
+    lines = [
+        PREFIXES,
+        f"<{BASE}#> a owl:Ontology ;",
+        '    dct:title "Synthetic benchmark ontology" ;',
+        '    dct:description "Generated by benchmarks/synthetic.py." ;',
+        f'    dct:abstract "{asdict(parameters)}" ;',
+        '    dct:creator "respecter" ;',
+        '    dct:contributor "respecter" ;',
+        '    dct:modified "2024-01-01"^^xsd:date .',
+        "",
+    ]
+
+    for g in range(parameters.groups):
+        lines.append(
+            f'ex:Group{g} rdfs:subClassOf ex:EnumerationType ; rdfs:label "Group {g}" ; '
+            f'rdfs:comment "Enumeration group {g}." .'
+        )
+        for m in range(parameters.members):
+            lines.append(
+                f'ex:Group{g}Member{m} a ex:Group{g} ; rdfs:label "Member {m} of group {g}" ; '
+                f'rdfs:comment "Member {m} of enumeration group {g}." .'
+            )
+
+    for s in range(parameters.shapes):
+        property_shapes = ", ".join(f"ex:Shape{s}_{p}" for p in range(parameters.properties))
+        lines.append(
+            f'ex:Class{s} a rdfs:Class ; rdfs:label "Class {s}" ; rdfs:comment "Synthetic class {s}." .'
+        )
+        lines.append(f"ex:Shape{s} a sh:NodeShape ; sh:targetClass ex:Class{s} ; sh:property {property_shapes} .")
+
+        for p in range(parameters.properties):
+            lines.append(
+                f'ex:property{s}_{p} a rdf:Property ; rdfs:label "property {s} {p}" ; '
+                f'rdfs:comment "Property {p} of class {s}." ; skos:example "Example {p}" .'
+            )
+            kind = p % 4
+            if kind == 0 or (kind == 2 and not parameters.groups) or (kind == 3 and not parameters.or_width):
+                range_ = "sh:datatype xsd:string"
+            elif kind == 1:
+                range_ = f"sh:class ex:Class{(s + p) % parameters.shapes}"
+            elif kind == 2:
+                range_ = f"sh:class ex:Group{(s + p) % parameters.groups}"
+            else:
+                members = " ".join(
+                    f"[ sh:class ex:Class{(s + p + o) % parameters.shapes} ; sh:minCount 1 ]"
+                    for o in range(parameters.or_width)
+                )
+                range_ = f"sh:or ( {members} )"
+            lines.append(
+                f"ex:Shape{s}_{p} a sh:PropertyShape ; sh:path ex:property{s}_{p} ; {range_} ."
+            )
+
+    return "\n".join(lines) + "\n"
+
+
+def write_ontology(directory: Path, parameters: OntologyParameters) -> Tuple[Path, Path]:
+    """
+    Write the synthetic ontology and its configuration to the directory.
+
+    Returns:
+        The paths of the ontology and configuration files.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    ontology_path = directory / "synthetic.ttl"
+    config_path = directory / "config.yaml"
+    ontology_path.write_text(generate_ontology(parameters))
+    config_path.write_text(CONFIG)
+    return ontology_path, config_path
+
+
+def add_parameter_arguments(parser: argparse.ArgumentParser):
+    """
+    Add an option for each of the OntologyParameters.
+    """
+    defaults = OntologyParameters()
+    parser.add_argument("--shapes", type=int, default=defaults.shapes, help="Node shapes (classes)")
+    parser.add_argument("--properties", type=int, default=defaults.properties, help="Properties per shape")
+    parser.add_argument("--groups", type=int, default=defaults.groups, help="Enumeration groups")
+    parser.add_argument("--members", type=int, default=defaults.members, help="Members per enumeration group")
+    parser.add_argument("--or-width", type=int, default=defaults.or_width, help="Members of the sh:or ranges")
+
+
+def parameters_from_arguments(args: argparse.Namespace) -> OntologyParameters:
+    return OntologyParameters(
+        shapes=args.shapes,
+        properties=args.properties,
+        groups=args.groups,
+        members=args.members,
+        or_width=args.or_width,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("directory", type=Path)
+    add_parameter_arguments(parser)
+    args = parser.parse_args()
+
+    ontology_path, config_path = write_ontology(args.directory, parameters_from_arguments(args))
+    print(f"Wrote {ontology_path} and {config_path}")
+
+
+if __name__ == "__main__":
+    main()
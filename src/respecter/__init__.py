@@ -14,4 +14,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from respecter.defaults import *
+import importlib
+
+
+def __getattr__(name: str):
+    # The bundled resources of respecter.defaults, read on first access.
+    defaults = importlib.import_module("respecter.defaults")
+    if name in defaults.__all__:
+        return getattr(defaults, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
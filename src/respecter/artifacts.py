@@ -0,0 +1,200 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Serialized form of the extracted models, so that extraction and rendering can run
+as separate stages (see respecter extract and respecter render).
+
+A models file is a JSON object:
+
+    {
+      "format": "respecter-models",
+      "version": 1,
+      "base": "https://example.org/ontology#",
+      "terms": [["https://example.org/ontology#Person", "ex:Person"], ...],
+      "ontology": {"title": ..., "abstract": ..., ...},
+      "classes": [[label, definition, fragment_identifier, term, [property, ...]], ...],
+      "properties": [[label, definition, property, [domain, ...], fragment_identifier, [range, ...]], ...],
+      "groups": [[label, definition, fragment_identifier, term], ...],
+      "enumerations": [[label, definition, [group, ...], fragment_identifier, [property, ...], term], ...]
+    }
+
+Each URI is stored once in "terms", with the prefixed name it is rendered with, and
+the models refer to it by its index: a value is either a string or a term ID. The
+records list the fields of the models in the order they are declared, and the
+enumerations refer to their groups by index in "groups". "base" is the URI base of
+the ontology, whose terms link to fragments of the generated page.
+"""
+import json
+from dataclasses import fields
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from respecter.compaction import CompactTerm, UriCompactor
+from respecter.models import Class, Enumeration, EnumerationGroup, Ontology, Property
+
+MODELS_FORMAT = "respecter-models"
+MODELS_VERSION = 1
+
+
+def _model_fields(model) -> List[Tuple[str, bool]]:
+    """
+    Get the name of each field of a model, and whether it holds a collection of values
+    (see add_member), stored as a list.
+    """
+    return [(field.name, field.default == ()) for field in fields(model)]
+
+
+def dump_models(
+    ontology: Ontology,
+    concepts: Dict[str, Class],
+    properties: Dict[str, Property],
+    enumerations: Dict[str, Enumeration],
+) -> dict:
+    """
+    Convert the extracted models to their serialized form (see the module documentation).
+    The same models always give the same serialized form.
+    """
+    terms: Dict[str, int] = {}
+    qnames: List[Tuple[str, str]] = []
+    base = None
+
+    def value(term):
+        nonlocal base
+        if not isinstance(term, CompactTerm):
+            return str(term)
+        index = terms.get(term.uri)
+        if index is None:
+            index = terms[term.uri] = len(qnames)
+            qnames.append((term.uri, term.compactor.qname(term.uri)))
+            base = base or term.compactor.current_ontology_url
+        return index
+
+    groups: Dict[int, int] = {}
+    group_records = []
+
+    def group(enumeration_group: EnumerationGroup) -> int:
+        # Groups are shared by the enumerations, and stored once
+        index = groups.get(id(enumeration_group))
+        if index is None:
+            index = groups[id(enumeration_group)] = len(group_records)
+            group_records.append(record(enumeration_group))
+        return index
+
+    def record(model) -> list:
+        values = []
+        for name, collection in _model_fields(model):
+            member = getattr(model, name)
+            if name == "enumeration_group":
+                values.append([group(enumeration_group) for enumeration_group in member])
+            elif collection:
+                values.append([value(term) for term in member])
+            else:
+                values.append(value(member))
+        return values
+
+    classes = [record(class_) for class_ in concepts.values()]
+    property_records = [record(property) for property in properties.values()]
+    enumeration_records = [record(enumeration) for enumeration in enumerations.values()]
+    return {
+        "format": MODELS_FORMAT,
+        "version": MODELS_VERSION,
+        "base": base,
+        "terms": qnames,
+        "ontology": ontology.to_dict(),
+        "classes": classes,
+        "properties": property_records,
+        "groups": group_records,
+        "enumerations": enumeration_records,
+    }
+
+
+def load_models(data: dict):
+    """
+    Convert the serialized form of the models back to the models, which render the same
+    documentation as the models they were dumped from.
+
+    Raises:
+        ValueError: If the data is not a models file of a supported version.
+    """
+    if not isinstance(data, dict) or data.get("format") != MODELS_FORMAT:
+        raise ValueError("Not a respecter models file")
+    if data.get("version") != MODELS_VERSION:
+        raise ValueError(
+            f"Unsupported models file version {data.get('version')}, expected {MODELS_VERSION}: extract the ontology again"
+        )
+    compactor = UriCompactor.from_qnames(dict(data["terms"]), current_ontology_url=data["base"])
+    terms = [compactor.intern(uri) for uri, _ in data["terms"]]
+
+    def value(value):
+        return terms[value] if isinstance(value, int) else value
+
+    def model(cls, record: list, groups=()):
+        instance = cls()
+        for (name, collection), member in zip(_model_fields(instance), record):
+            if name == "enumeration_group":
+                for index in member:
+                    instance.add_enumeration_group(groups[index])
+            elif collection:
+                # Rebuilt with the add methods, as small collections are kept in a tuple
+                add = getattr(instance, "add_" + name)
+                for term in member:
+                    add(value(term))
+            else:
+                setattr(instance, name, value(member))
+        return instance
+
+    groups = [model(EnumerationGroup, record) for record in data["groups"]]
+    concepts = {}
+    for record in data["classes"]:
+        class_ = model(Class, record)
+        concepts[class_.label] = class_
+    properties = {}
+    for record in data["properties"]:
+        property = model(Property, record)
+        properties[property.label] = property
+    enumerations = {}
+    for record in data["enumerations"]:
+        enumeration = model(Enumeration, record, groups)
+        enumerations[enumeration.label] = enumeration
+    return Ontology(**data["ontology"]), concepts, properties, enumerations
+
+
+def write_models(path: Path, *models) -> Path:
+    """
+    Write the extracted models (ontology, concepts, properties and enumerations) to a models file.
+    """
+    with open(path, "w") as f:
+        json.dump(dump_models(*models), f, ensure_ascii=False, separators=(",", ":"))
+        f.write("\n")
+    return path
+
+
+def read_models(path: Path):
+    """
+    Read the models from a models file written by write_models.
+
+    Returns:
+        The ontology, concepts, properties and enumerations, as fetch_ontology does.
+
+    Raises:
+        ValueError: If the file is not a models file of a supported version.
+    """
+    with open(path) as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Not a respecter models file: {e}")
+    return load_models(data)
@@ -0,0 +1,240 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import yaml
+
+from respecter.cache import open_graph_cache
+from respecter.core import QueryEngine, fetch_ontology
+from respecter.imports import ImportCatalog
+from respecter.incremental import OutputCache, output_key
+from respecter.renderers import output_format, write_output
+from respecter.sparql import SparqlConfig
+from respecter.store import GraphStore
+from respecter.templates import DEFAULT_TEMPLATE, configure_bytecode_cache
+
+
+@dataclass
+class BuildItem:
+    """
+    An ontology to document, with its configuration file and output file,
+    rendered in the format of its suffix (see output_format).
+    """
+
+    ontology: Path
+    config: Path
+    output: Path
+
+
+@dataclass
+class BuildOptions:
+    """
+    Options shared by all the items of a build.
+    """
+
+    cache_dir: Optional[Path] = None
+    no_cache: bool = False
+    engine: QueryEngine = QueryEngine.sparql
+    store: GraphStore = GraphStore.memory
+    filter_triples: bool = False
+    template_name: str = DEFAULT_TEMPLATE
+    template_dirs: List[Path] = field(default_factory=list)
+    # Import catalog resolving the owl:imports of the ontologies, if any.
+    catalog: Optional[Path] = None
+
+
+@dataclass
+class BuildResult:
+    """
+    Status and timing of a built item.
+    """
+
+    item: BuildItem
+    ok: bool
+    seconds: float
+    error: str = ""
+    cached: bool = False
+
+
+def check_outputs(items: List[BuildItem]):
+    """
+    Check that no two items are written to the same output file, where they would overwrite each other.
+
+    Raises:
+        ValueError: If two items have the same output.
+    """
+    ontologies = {}
+    for item in items:
+        output = item.output.resolve()
+        if output in ontologies:
+            raise ValueError(f"{ontologies[output]} and {item.ontology} would both be written to {item.output}")
+        ontologies[output] = item.ontology
+
+
+def load_manifest(manifest_path: Path) -> List[BuildItem]:
+    """
+    Load the build items from a YAML manifest.
+
+    The manifest is a list of items (optionally under an "items" key), each with
+    "ontology", "config" and "output" paths relative to the manifest file:
+
+        items:
+          - ontology: custodian/custodian.ttl
+            config: custodian/config.yaml
+            output: site/custodian.html
+
+    Raises:
+        ValueError: If the manifest lists no items, if an item is not a mapping or is
+            missing one of the paths, or if two items have the same output.
+    """
+    manifest_path = Path(manifest_path)
+    with open(manifest_path, "r") as f:
+        manifest = yaml.safe_load(f) or []
+    if isinstance(manifest, dict):
+        manifest = manifest.get("items") or []
+    if not isinstance(manifest, list) or not manifest:
+        raise ValueError(f"{manifest_path} does not list any item")
+
+    items = []
+    for index, entry in enumerate(manifest):
+        if not isinstance(entry, dict):
+            raise ValueError(
+                f"Item {index} of {manifest_path} is not a mapping of ontology, config and output paths"
+            )
+        missing = [key for key in ("ontology", "config", "output") if entry.get(key) is None]
+        if missing:
+            raise ValueError(
+                f"Item {index} of {manifest_path} is missing {', '.join(missing)}"
+            )
+        items.append(
+            BuildItem(
+                ontology=manifest_path.parent / entry["ontology"],
+                config=manifest_path.parent / entry["config"],
+                output=manifest_path.parent / entry["output"],
+            )
+        )
+    check_outputs(items)
+    return items
+
+
+def discover_items(pattern: str, config_path: Path, output_dir: Path) -> List[BuildItem]:
+    """
+    Build one item per ontology file matching the glob pattern (relative or absolute,
+    with ** matching any number of directories), all sharing the same config.
+    Each output is written to output_dir under the ontology file name with an .html suffix.
+
+    Raises:
+        ValueError: If no file matches the pattern, or if two matching files have the same
+            name, so that their outputs would overwrite each other.
+    """
+    items = [
+        BuildItem(
+            ontology=ontology_path,
+            config=Path(config_path),
+            output=Path(output_dir) / (ontology_path.stem + ".html"),
+        )
+        for ontology_path in sorted(map(Path, glob.glob(pattern, recursive=True)))
+        if ontology_path.is_file()
+    ]
+    if not items:
+        raise ValueError(f"No ontology file matches {pattern}")
+    check_outputs(items)
+    return items
+
+
+def build_item(item: BuildItem, options: BuildOptions = BuildOptions()) -> BuildResult:
+    """
+    Run the whole pipeline for one item and write its output file, unless the output of
+    the same inputs is in the output cache. Errors are reported in the result instead of being raised.
+    """
+    start = time.perf_counter()
+    # Worker processes that are not forked do not inherit the templates cache configuration
+    configure_bytecode_cache(options.cache_dir, options.no_cache)
+    try:
+        config = SparqlConfig.from_path(item.config)
+        catalog = None if options.catalog is None else ImportCatalog.from_path(options.catalog)
+        output_cache = None
+        if not options.no_cache:
+            output_cache = OutputCache(options.cache_dir)
+            key = output_key(
+                item.ontology,
+                config,
+                options.template_name,
+                options.template_dirs,
+                output_format=output_format(item.output),
+                catalog=catalog,
+            )
+            if output_cache.restore(key, item.output):
+                return BuildResult(item=item, ok=True, seconds=time.perf_counter() - start, cached=True)
+        cache = open_graph_cache(options.store, options.cache_dir, options.no_cache)
+        ontology, concepts, properties, enumerations = fetch_ontology(
+            ontology_path=item.ontology,
+            config=config,
+            cache=cache,
+            engine=options.engine,
+            filter_triples=options.filter_triples,
+            catalog=catalog,
+        )
+        item.output.parent.mkdir(parents=True, exist_ok=True)
+        write_output(
+            item.output,
+            ontology,
+            concepts,
+            properties,
+            enumerations,
+            template_name=options.template_name,
+            template_dirs=options.template_dirs,
+        )
+        if output_cache is not None:
+            output_cache.put_file(key, item.output)
+    except Exception as e:
+        return BuildResult(
+            item=item,
+            ok=False,
+            seconds=time.perf_counter() - start,
+            error=f"{type(e).__name__}: {e}",
+        )
+    return BuildResult(item=item, ok=True, seconds=time.perf_counter() - start)
+
+
+def run_build(
+    items: List[BuildItem],
+    options: BuildOptions = BuildOptions(),
+    workers: Optional[int] = None,
+) -> Iterator[BuildResult]:
+    """
+    Build the items across a pool of worker processes, yielding results as they complete.
+
+    Args:
+        items: The items to build.
+        options: Options shared by all the items.
+        workers: The number of worker processes. Defaults to the number of CPUs;
+            with a single worker, the items are built in the current process.
+    """
+    if workers == 1 or len(items) <= 1:
+        for item in items:
+            yield build_item(item, options)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(build_item, item, options) for item in items]
+        for future in as_completed(futures):
+            yield future.result()
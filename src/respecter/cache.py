@@ -0,0 +1,440 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
+
+import rdflib
+from rdflib.term import BNode, Identifier, Literal, URIRef
+
+from respecter.ingest import PredicateFilter, parse_graph
+from respecter.sparql import rows_from_json, rows_to_json
+from respecter.store import SCHEMA_VERSION, GraphStore, build_store, open_graph
+
+# Binary graph format
+# -------------------
+# header:     magic (4s) | format version (B) | #namespaces (I) | #terms (I) | #triples (I)
+# namespaces: prefix string, namespace string
+# terms:      kind (B: U, B or L), value string, and for literals: datatype string, language string
+# triples:    3 x #triples unsigned ints (little-endian) indexing the term table
+# Strings are stored as a little-endian uint32 byte length followed by UTF-8 bytes.
+MAGIC = b"RSPG"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sBIII")
+_LENGTH = struct.Struct("<I")
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024  # 512 MiB
+DEFAULT_RESULT_MAX_AGE = 24 * 60 * 60  # 1 day
+DEFAULT_STORE_MAX_SIZE = 16 * 1024 * 1024 * 1024  # 16 GiB
+
+
+def default_cache_dir() -> Path:
+    """
+    Get the default cache directory, following the XDG base directory convention.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "respecter"
+
+
+def file_digest(path: Path, *extra: str) -> str:
+    """
+    Compute the SHA-256 hex digest of a file's content, optionally salted with extra strings.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    for value in extra:
+        digest.update(b"\0" + value.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _write_string(buffer: bytearray, value: str):
+    data = value.encode("utf-8")
+    buffer += _LENGTH.pack(len(data))
+    buffer += data
+
+
+def _read_string(data: memoryview, offset: int):
+    (length,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    return str(data[offset : offset + length], "utf-8"), offset + length
+
+
+def dump_graph(graph: rdflib.Graph) -> bytes:
+    """
+    Serialize a graph and its namespace bindings to the compact binary triple format.
+    """
+    namespaces = list(graph.namespaces())
+    term_ids = {}
+    terms = bytearray()
+    triples = array("I")
+
+    for triple in graph:
+        for term in triple:
+            term_id = term_ids.get(term)
+            if term_id is None:
+                term_id = term_ids[term] = len(term_ids)
+                if isinstance(term, Literal):
+                    terms += b"L"
+                    _write_string(terms, str(term))
+                    _write_string(terms, str(term.datatype or ""))
+                    _write_string(terms, term.language or "")
+                else:
+                    terms += b"B" if isinstance(term, BNode) else b"U"
+                    _write_string(terms, str(term))
+            triples.append(term_id)
+
+    if sys.byteorder != "little":
+        triples.byteswap()
+
+    buffer = bytearray(
+        _HEADER.pack(MAGIC, FORMAT_VERSION, len(namespaces), len(term_ids), len(triples) // 3)
+    )
+    for prefix, namespace in namespaces:
+        _write_string(buffer, prefix)
+        _write_string(buffer, str(namespace))
+    buffer += terms
+    buffer += triples.tobytes()
+    return bytes(buffer)
+
+
+def load_graph(data: bytes) -> rdflib.Graph:
+    """
+    Rebuild a graph from the compact binary triple format.
+
+    Raises:
+        ValueError: If the data is not in a supported format.
+    """
+    view = memoryview(data)
+    magic, version, n_namespaces, n_terms, n_triples = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Unsupported graph cache format")
+    offset = _HEADER.size
+
+    graph = rdflib.Graph()
+    for _ in range(n_namespaces):
+        prefix, offset = _read_string(view, offset)
+        namespace, offset = _read_string(view, offset)
+        graph.bind(prefix, namespace)
+
+    terms = []
+    for _ in range(n_terms):
+        kind = view[offset]
+        value, offset = _read_string(view, offset + 1)
+        if kind == ord("L"):
+            datatype, offset = _read_string(view, offset)
+            language, offset = _read_string(view, offset)
+            terms.append(
+                Literal(value, lang=language or None, datatype=datatype or None)
+            )
+        elif kind == ord("B"):
+            terms.append(BNode(value))
+        else:
+            terms.append(URIRef(value))
+
+    ids = array("I")
+    ids.frombytes(view[offset : offset + n_triples * 3 * ids.itemsize])
+    if sys.byteorder != "little":
+        ids.byteswap()
+    graph.addN(
+        (terms[ids[i]], terms[ids[i + 1]], terms[ids[i + 2]], graph)
+        for i in range(0, len(ids), 3)
+    )
+    return graph
+
+
+class DiskCache:
+    """
+    On-disk cache of binary entries, written atomically.
+
+    Entries are evicted in least-recently-used order once the total size of the
+    cache directory exceeds max_size bytes.
+
+    Args:
+        directory: The root directory of the caches, the entries are stored in its subdirectory
+            (e.g. graphs). Defaults to default_cache_dir().
+        max_size: The maximum total size of the cached entries, in bytes.
+    """
+
+    suffix = ".bin"
+    subdirectory = "entries"
+
+    def __init__(self, directory: Optional[Path] = None, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = (Path(directory) if directory else default_cache_dir()) / self.subdirectory
+        self.max_size = max_size
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / (key + self.suffix)
+
+    def read(self, key: str) -> Optional[bytes]:
+        """
+        Read an entry from the cache, or None if it is not cached.
+        """
+        entry = self._entry(key)
+        try:
+            data = entry.read_bytes()
+        except FileNotFoundError:
+            return None
+        # Mark the entry as recently used.
+        os.utime(entry)
+        return data
+
+    def write(self, key: str, data: bytes):
+        """
+        Store an entry in the cache and evict old entries if needed.
+        """
+        with self.writer(key) as f:
+            f.write(data)
+
+    @contextmanager
+    def writer(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Open an entry of the cache to write it in chunks. The entry is only stored, and
+        old entries evicted if needed, once the block completes without an exception.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so that concurrent readers never see a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                yield f
+            os.replace(tmp_path, self._entry(key))
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def discard(self, key: str):
+        """
+        Remove an entry from the cache, e.g. when it cannot be read.
+        """
+        self._entry(key).unlink(missing_ok=True)
+
+    def evict(self, keep: Optional[Path] = None):
+        """
+        Remove the least recently used entries until the cache fits in max_size,
+        except for the keep entry (e.g. one that is still in use).
+        """
+        entries = []
+        for entry in self.directory.glob("*" + self.suffix):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total_size <= self.max_size:
+                break
+            if entry == keep:
+                continue
+            entry.unlink(missing_ok=True)
+            total_size -= size
+
+
+class GraphCache(DiskCache):
+    """
+    On-disk cache of parsed graphs, keyed by the content hash of the source file.
+
+    Entries are evicted in least-recently-used order once the total size of the
+    cache directory exceeds max_size bytes.
+
+    Args:
+        directory: The root directory of the caches. The entries are stored in its graphs
+            subdirectory, under default_cache_dir() by default.
+        max_size: The maximum total size of the cached graphs, in bytes.
+    """
+
+    suffix = ".rspg"
+    subdirectory = "graphs"
+
+    def key(self, ontology_path: Path, predicate_filter: Optional[PredicateFilter] = None) -> str:
+        """
+        Get the cache key of an ontology file, parsed with the predicate filter if one is given.
+        """
+        ontology_path = Path(ontology_path)
+        extra = [ontology_path.suffix, rdflib.__version__, str(FORMAT_VERSION)]
+        if predicate_filter is not None:
+            extra.append(predicate_filter.key())
+        return file_digest(ontology_path, *extra)
+
+    def get(self, key: str) -> Optional[rdflib.Graph]:
+        """
+        Get a graph from the cache, or None if it is not cached.
+        """
+        data = self.read(key)
+        if data is None:
+            return None
+        try:
+            return load_graph(data)
+        except (ValueError, struct.error):
+            self.discard(key)
+            return None
+
+    def put(self, key: str, graph: rdflib.Graph):
+        """
+        Store a graph in the cache and evict old entries if needed.
+        """
+        self.write(key, dump_graph(graph))
+
+    def load(self, ontology_path: Path, predicate_filter: Optional[PredicateFilter] = None) -> rdflib.Graph:
+        """
+        Load an ontology graph, parsing the file only if it is not cached yet.
+        With a predicate filter, only the matching triples are parsed and cached.
+        """
+        key = self.key(ontology_path, predicate_filter)
+        graph = self.get(key)
+        if graph is None:
+            graph = parse_graph(ontology_path, predicate_filter)
+            self.put(key, graph)
+        return graph
+
+
+class StoreCache(DiskCache):
+    """
+    On-disk cache of SQLite graph stores, keyed by the content hash of the source file.
+
+    Unlike the graph cache, the stores are not loaded in memory: they are opened read-only,
+    and the queries read the triples from their indexes.
+
+    Args:
+        directory: The root directory of the caches. The entries are stored in its stores
+            subdirectory, under default_cache_dir() by default.
+        max_size: The maximum total size of the cached stores, in bytes.
+    """
+
+    suffix = ".sqlite"
+    subdirectory = "stores"
+
+    def __init__(self, directory: Optional[Path] = None, max_size: int = DEFAULT_STORE_MAX_SIZE):
+        super().__init__(directory, max_size)
+
+    def key(self, ontology_path: Path, predicate_filter: Optional[PredicateFilter] = None) -> str:
+        """
+        Get the cache key of an ontology file, parsed with the predicate filter if one is given.
+        """
+        ontology_path = Path(ontology_path)
+        extra = [ontology_path.suffix, rdflib.__version__, f"sqlite-{SCHEMA_VERSION}"]
+        if predicate_filter is not None:
+            extra.append(predicate_filter.key())
+        return file_digest(ontology_path, *extra)
+
+    def load(self, ontology_path: Path, predicate_filter: Optional[PredicateFilter] = None) -> rdflib.Graph:
+        """
+        Open the store of an ontology, building it from the file only if it is not cached yet.
+        """
+        entry = self._entry(self.key(ontology_path, predicate_filter))
+        try:
+            graph = open_graph(entry)
+            # Mark the entry as recently used.
+            os.utime(entry)
+            return graph
+        except (ValueError, FileNotFoundError):
+            entry.unlink(missing_ok=True)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Build next to the entry first so that concurrent readers never see a partial store.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            build_store(ontology_path, Path(tmp_path), predicate_filter)
+            os.replace(tmp_path, entry)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        graph = open_graph(entry)
+        self.evict(keep=entry)
+        return graph
+
+
+def open_graph_cache(
+    store: GraphStore = GraphStore.memory,
+    directory: Optional[Path] = None,
+    no_cache: bool = False,
+) -> Optional[Union[GraphCache, StoreCache]]:
+    """
+    Get the cache the ontology graphs are loaded through for a graph store.
+    SQLite stores always live in a cache, in-memory graphs only without no_cache.
+    """
+    if store == GraphStore.sqlite:
+        return StoreCache(directory)
+    return None if no_cache else GraphCache(directory)
+
+
+class ResultCache(DiskCache):
+    """
+    On-disk cache of SPARQL query results, keyed by the hash of the endpoint and query.
+
+    Args:
+        directory: The root directory of the caches. The entries are stored in its results
+            subdirectory, under default_cache_dir() by default.
+        max_size: The maximum total size of the cached results, in bytes.
+        max_age: Results fetched more than max_age seconds ago are fetched again.
+    """
+
+    suffix = ".json"
+    subdirectory = "results"
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+        max_age: float = DEFAULT_RESULT_MAX_AGE,
+    ):
+        super().__init__(directory, max_size)
+        self.max_age = max_age
+
+    def key(self, endpoint: str, query: str) -> str:
+        """
+        Get the cache key of a query on an endpoint.
+        """
+        digest = hashlib.sha256()
+        for value in (endpoint, query, str(FORMAT_VERSION)):
+            digest.update(value.encode("utf-8") + b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Identifier]]]:
+        """
+        Get the result rows from the cache, or None if they are not cached or too old.
+        """
+        data = self.read(key)
+        if data is None:
+            return None
+        try:
+            entry = json.loads(data)
+            if time.time() - entry["fetched"] > self.max_age:
+                return None
+            return rows_from_json(entry["results"])
+        except (ValueError, KeyError, TypeError):
+            self.discard(key)
+            return None
+
+    def put(self, key: str, rows: List[Dict[str, Identifier]]):
+        """
+        Store result rows in the cache and evict old entries if needed.
+        """
+        entry = {"fetched": time.time(), "results": rows_to_json(rows)}
+        self.write(key, json.dumps(entry).encode("utf-8"))
@@ -1,6 +1,6 @@
-# respecter
-# Copyright 2022 - Swiss Data Science Center (SDSC)
-# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
 # Eidgenössische Technische Hochschule Zürich (ETHZ).#
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -14,14 +14,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import sys
+from contextlib import nullcontext
 from pathlib import Path
 import click
 import typer
-from typing import Optional
+from typing import List, Optional
 from typing_extensions import Annotated
-from respecter.core import fetch_ontology, render_template
-from respecter.sparql import SparqlConfig
-from respecter import defaults
+# Only the option choices and defaults are imported here: each command imports the
+# modules it runs, so that --help, --version and generate-config do not load rdflib
+# and jinja2 (see benchmarks/startup.py).
+from respecter.options import (
+    DEFAULT_ENDPOINT_PAGE_SIZE as ENDPOINT_PAGE_SIZE,
+    DEFAULT_HOST,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_PORT,
+    DEFAULT_TEMPLATE,
+    GraphStore,
+    QueryEngine,
+    Split,
+)
 
 __version__ = (
     "0.0.1"  # TODO: Move this to __init__.py and use poetry to manage the version
@@ -43,14 +54,26 @@ def version_callback(value: bool):
         raise typer.Exit()
 
 
+def _load_catalog(catalog_path: Optional[Path], store: GraphStore, endpoint_url: Optional[str] = None):
+    """
+    Read the import catalog given with --catalog, if any.
+    """
+    if catalog_path is None:
+        return None
+    if endpoint_url is not None:
+        raise typer.BadParameter("--catalog resolves the imports of an ontology file, it cannot be used with --endpoint.")
+    if store == GraphStore.sqlite:
+        raise typer.BadParameter("--catalog merges the imports into an in-memory graph, it cannot be used with --store sqlite.")
+    from respecter.imports import ImportCatalog
+
+    try:
+        return ImportCatalog.from_path(catalog_path)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+
+
 @app.command()
 def run(
-    ontology_path: Annotated[Path, typer.Argument(
-        help="Path to the ontology RDF file.",
-        exists=True,
-        dir_okay=False,
-        show_default=False,
-    )],
     config_path: Annotated[Path, typer.Option(
         "-c",
         "--config",
@@ -59,18 +82,118 @@ def run(
         exists=True,
         dir_okay=False,
     )],
+    ontology_path: Annotated[Optional[Path], typer.Argument(
+        help="Path to the ontology RDF file.",
+        exists=True,
+        dir_okay=False,
+        show_default=False,
+    )] = None,
     debug: Annotated[bool, typer.Option(
         "-d",
         "--debug",
         help="Enable debugging mode."
     )] = False,
-    output: Annotated[Optional[Path], typer.Option(
+    output: Annotated[Optional[List[Path]], typer.Option(
         "-o",
         "--output",
-        help="Path to the output HTML file. If not provided, the output will be printed to stdout.",
+        help="Path to an output file, rendered in the format of its suffix: .html (ReSpec), .json (term catalogue) or .md (Markdown). Can be repeated to render several formats from a single extraction. If not provided, the HTML output will be printed to stdout.",
         exists=False,
         dir_okay=False,
     )] = None,
+    endpoint_url: Annotated[Optional[str], typer.Option(
+        "--endpoint",
+        help="URL of a SPARQL endpoint to query instead of an ontology file.",
+        show_default=False,
+    )] = None,
+    endpoint_page_size: Annotated[int, typer.Option(
+        "--endpoint-page-size",
+        help="Number of result rows fetched per request from the SPARQL endpoint, or 0 to fetch them all at once.",
+        min=0,
+    )] = ENDPOINT_PAGE_SIZE,
+    no_cache: Annotated[bool, typer.Option(
+        "--no-cache",
+        help="Always build the documentation, parse the ontology file (or query the endpoint) instead of going through the cache.",
+    )] = False,
+    cache_dir: Annotated[Optional[Path], typer.Option(
+        "--cache-dir",
+        help="Root directory of the caches, which keep the parsed graphs, SQLite stores, endpoint results, outputs and compiled templates in its graphs, stores, results, outputs and jinja subdirectories. Defaults to ~/.cache/respecter.",
+        envvar="RESPECTER_CACHE_DIR",
+        file_okay=False,
+    )] = None,
+    engine: Annotated[QueryEngine, typer.Option(
+        "--engine",
+        help="Extraction engine: evaluate the SPARQL queries, walk the SHACL shapes natively, or split the concepts query into sub-queries joined in Python (planned).",
+    )] = QueryEngine.sparql,
+    store: Annotated[GraphStore, typer.Option(
+        "--store",
+        help="Where the parsed graph is kept: in memory, or in an SQLite file built once in the cache directory and then queried from its indexes (for ontologies larger than memory).",
+    )] = GraphStore.memory,
+    filter_triples: Annotated[bool, typer.Option(
+        "--filter-triples",
+        help="Only load the triples whose predicate is read by the queries, dropping instance data and other annotations while parsing.",
+    )] = False,
+    catalog_path: Annotated[Optional[Path], typer.Option(
+        "--catalog",
+        help="Catalog mapping the IRIs of owl:imports to local files (YAML, or a Protégé catalog-v001.xml). The imports closure of the ontology is parsed in parallel, cached and merged into it.",
+        exists=True,
+        dir_okay=False,
+        show_default=False,
+    )] = None,
+    parallel: Annotated[bool, typer.Option(
+        "--parallel",
+        help="Run the ontology queries concurrently in a process pool (or threads, with --endpoint).",
+    )] = False,
+    watch: Annotated[bool, typer.Option(
+        "--watch",
+        help="Keep running and rebuild --output whenever the ontology, config or templates change, keeping the parsed graph in memory.",
+    )] = False,
+    split: Annotated[Optional[Split], typer.Option(
+        "--split",
+        help="Write a multi-page documentation to --output-dir: a page per class, per enumeration group, or per --page-size terms (size).",
+        show_default=False,
+    )] = None,
+    page_size: Annotated[int, typer.Option(
+        "--page-size",
+        help="Maximum number of terms of the pages that are not split per class or per enumeration group.",
+        min=1,
+    )] = DEFAULT_PAGE_SIZE,
+    output_dir: Annotated[Optional[Path], typer.Option(
+        "--output-dir",
+        help="Directory of the index and pages written with --split.",
+        file_okay=False,
+        show_default=False,
+    )] = None,
+    workers: Annotated[Optional[int], typer.Option(
+        "-j",
+        "--workers",
+        help="Number of worker processes rendering the pages written with --split, or the outputs. Defaults to the number of CPUs.",
+        min=1,
+        show_default=False,
+    )] = None,
+    profile: Annotated[Optional[Path], typer.Option(
+        "--profile",
+        help="Write the wall time, CPU time, peak memory and counts of each phase to this JSON file.",
+        dir_okay=False,
+        show_default=False,
+    )] = None,
+    profile_stats: Annotated[Optional[Path], typer.Option(
+        "--profile-stats",
+        help="Write the cProfile statistics of the slowest phase to this file (to be read with pstats).",
+        dir_okay=False,
+        show_default=False,
+    )] = None,
+    template_dirs: Annotated[Optional[List[Path]], typer.Option(
+        "-t",
+        "--template-dir",
+        help="Directory searched for templates and partials before the bundled ones. Can be repeated.",
+        exists=True,
+        file_okay=False,
+        show_default=False,
+    )] = None,
+    template_name: Annotated[str, typer.Option(
+        "--template",
+        help="Name of the template to render.",
+    )] = DEFAULT_TEMPLATE,
     version: Annotated[Optional[bool], typer.Option(
         "--version",
         help="Display version and exit",
@@ -80,16 +203,549 @@ def run(
     """
     Turns a RDF serialization of an ontology into a ReSpec styled HTML page
     """
+    from respecter.cache import ResultCache, open_graph_cache
+    from respecter.core import fetch_ontology, fetch_ontology_from_endpoint, write_template
+    from respecter.endpoint import SparqlEndpoint
+    from respecter.incremental import OutputCache, output_key
+    from respecter.pages import split_pages, write_pages
+    from respecter.profiling import Profiler
+    from respecter.renderers import output_format, write_outputs
+    from respecter.sparql import SparqlConfig
+    from respecter.templates import configure_bytecode_cache
+    from respecter.watch import LiveBuild, watch_build
+
+    if split is not None and output_dir is None:
+        raise typer.BadParameter("--output-dir is required with --split.")
+    if split is not None and template_name != DEFAULT_TEMPLATE:
+        raise typer.BadParameter("--split renders the page.html and index.html templates, override them with --template-dir instead of --template.")
+    if (ontology_path is None) == (endpoint_url is None):
+        raise typer.BadParameter("Either an ontology file or --endpoint is required, not both.")
+    if store == GraphStore.sqlite and no_cache:
+        raise typer.BadParameter("--store sqlite keeps the store in the cache, it cannot be used with --no-cache.")
+    if endpoint_url is not None and engine == QueryEngine.native:
+        raise typer.BadParameter("The native engine cannot query a SPARQL endpoint.")
+    catalog = _load_catalog(catalog_path, store, endpoint_url)
+    configure_bytecode_cache(cache_dir, no_cache)
+    outputs = output or []
+    try:
+        formats = [output_format(path) for path in outputs]
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    if watch and (ontology_path is None or formats != ["html"] or split or profile or profile_stats):
+        raise typer.BadParameter("--watch requires an ontology file and a single HTML --output, and cannot be used with --split or --profile.")
+    if watch:
+        live_build = LiveBuild(
+            ontology_path,
+            config_path,
+            outputs[0],
+            template_name=template_name,
+            template_dirs=template_dirs,
+            cache=open_graph_cache(store, cache_dir, no_cache),
+            engine=engine,
+            filter_triples=filter_triples,
+            debug=debug,
+            catalog=catalog,
+        )
+        print("Watching for changes, press Ctrl+C to stop.", file=sys.stderr)
+        try:
+            watch_build(live_build)
+        except KeyboardInterrupt:
+            pass
+        return
+
     config = SparqlConfig.from_path(config_path)
-    ontology, concepts, properties, enumerations = fetch_ontology(
+    profiler = None
+    if profile or profile_stats:
+        profiler = Profiler(capture_stats=profile_stats is not None)
+
+    # Skip the whole pipeline if the documentation of the same inputs was already rendered.
+    output_cache = None
+    if not (no_cache or debug or profiler or split or endpoint_url):
+        output_cache = OutputCache(cache_dir)
+        # Without --output, the HTML documentation is printed to stdout.
+        targets = list(zip(outputs, formats)) or [(None, "html")]
+        keys = [
+            output_key(ontology_path, config, template_name, template_dirs, output_format=format, catalog=catalog)
+            for _, format in targets
+        ]
+        if all(output_cache.restore(key, path) for key, (path, _) in zip(keys, targets)):
+            print("The output is up to date, skipped the build.", file=sys.stderr)
+            return
+
+    if endpoint_url is not None:
+        try:
+            endpoint = SparqlEndpoint(
+                endpoint_url,
+                page_size=endpoint_page_size,
+                cache=None if no_cache else ResultCache(cache_dir),
+            )
+        except ValueError as e:
+            raise typer.BadParameter(str(e))
+        with endpoint:
+            ontology, concepts, properties, enumerations = fetch_ontology_from_endpoint(
+                endpoint=endpoint,
+                config=config,
+                debug=debug,
+                engine=engine,
+                parallel=parallel,
+                profiler=profiler,
+            )
+    else:
+        ontology, concepts, properties, enumerations = fetch_ontology(
+            ontology_path=ontology_path,
+            config=config,
+            debug=debug,
+            cache=open_graph_cache(store, cache_dir, no_cache),
+            engine=engine,
+            parallel=parallel,
+            profiler=profiler,
+            filter_triples=filter_triples,
+            catalog=catalog,
+        )
+    if split is not None:
+        pages = split_pages(concepts, properties, enumerations, split=split, page_size=page_size)
+        paths = write_pages(
+            output_dir,
+            ontology,
+            pages,
+            template_dirs=template_dirs,
+            workers=workers,
+            profiler=profiler,
+        )
+        print(f"Wrote {len(paths) - 1} pages and the index to {output_dir}", file=sys.stderr)
+    elif outputs:
+        # A single extraction rendered to each output, concurrently if there are several
+        write_outputs(
+            outputs,
+            ontology,
+            concepts,
+            properties,
+            enumerations,
+            template_name=template_name,
+            template_dirs=template_dirs,
+            workers=workers,
+            profiler=profiler,
+        )
+        if output_cache is not None:
+            for key, path in zip(keys, outputs):
+                output_cache.put_file(key, path)
+    else:
+        # Stream the rendered template to stdout, storing it in the cache on the way
+        tee = nullcontext(sys.stdout) if output_cache is None else output_cache.tee(keys[0], sys.stdout)
+        with tee as sink:
+            write_template(
+                sink,
+                ontology,
+                concepts,
+                properties,
+                enumerations,
+                template_name=template_name,
+                template_dirs=template_dirs,
+                profiler=profiler,
+            )
+
+    if profiler is not None:
+        profiler.stop()
+        if profile:
+            profiler.dump(profile, ontology=str(ontology_path or endpoint_url), engine=engine.value, parallel=parallel)
+            print(f"Profile saved to file: {profile}", file=sys.stderr)
+        if profile_stats:
+            phase = profiler.dump_stats(profile_stats)
+            print(f"Statistics of the {phase} phase saved to file: {profile_stats}", file=sys.stderr)
+
+
+@app.command()
+def extract(
+    config_path: Annotated[Path, typer.Option(
+        "-c",
+        "--config",
+        help="Path to the YAML configuration file.",
+        show_default=False,
+        exists=True,
+        dir_okay=False,
+    )],
+    ontology_path: Annotated[Path, typer.Argument(
+        help="Path to the ontology RDF file.",
+        exists=True,
+        dir_okay=False,
+        show_default=False,
+    )],
+    output: Annotated[Path, typer.Option(
+        "-o",
+        "--output",
+        help="Path to the models file, to be rendered with respecter render.",
+        dir_okay=False,
+        show_default=False,
+    )],
+    debug: Annotated[bool, typer.Option(
+        "-d",
+        "--debug",
+        help="Enable debugging mode."
+    )] = False,
+    no_cache: Annotated[bool, typer.Option(
+        "--no-cache",
+        help="Parse the ontology file instead of going through the cache.",
+    )] = False,
+    cache_dir: Annotated[Optional[Path], typer.Option(
+        "--cache-dir",
+        help="Root directory of the caches, which keep the parsed graphs, SQLite stores, endpoint results, outputs and compiled templates in its graphs, stores, results, outputs and jinja subdirectories. Defaults to ~/.cache/respecter.",
+        envvar="RESPECTER_CACHE_DIR",
+        file_okay=False,
+    )] = None,
+    engine: Annotated[QueryEngine, typer.Option(
+        "--engine",
+        help="Extraction engine: evaluate the SPARQL queries, walk the SHACL shapes natively, or split the concepts query into sub-queries joined in Python (planned).",
+    )] = QueryEngine.sparql,
+    store: Annotated[GraphStore, typer.Option(
+        "--store",
+        help="Where the parsed graph is kept: in memory, or in an SQLite file built once in the cache directory and then queried from its indexes (for ontologies larger than memory).",
+    )] = GraphStore.memory,
+    filter_triples: Annotated[bool, typer.Option(
+        "--filter-triples",
+        help="Only load the triples whose predicate is read by the queries, dropping instance data and other annotations while parsing.",
+    )] = False,
+    catalog_path: Annotated[Optional[Path], typer.Option(
+        "--catalog",
+        help="Catalog mapping the IRIs of owl:imports to local files (YAML, or a Protégé catalog-v001.xml). The imports closure of the ontology is parsed in parallel, cached and merged into it.",
+        exists=True,
+        dir_okay=False,
+        show_default=False,
+    )] = None,
+    parallel: Annotated[bool, typer.Option(
+        "--parallel",
+        help="Run the ontology queries concurrently in a process pool.",
+    )] = False,
+):
+    """
+    Extracts the terms of an ontology to a models file, rendered later with respecter render.
+    """
+    from respecter.artifacts import write_models
+    from respecter.cache import open_graph_cache
+    from respecter.core import fetch_ontology
+    from respecter.sparql import SparqlConfig
+
+    if store == GraphStore.sqlite and no_cache:
+        raise typer.BadParameter("--store sqlite keeps the store in the cache, it cannot be used with --no-cache.")
+    catalog = _load_catalog(catalog_path, store)
+    models = fetch_ontology(
         ontology_path=ontology_path,
-        config=config,
+        config=SparqlConfig.from_path(config_path),
         debug=debug,
+        cache=open_graph_cache(store, cache_dir, no_cache),
+        engine=engine,
+        parallel=parallel,
+        filter_triples=filter_triples,
+        catalog=catalog,
     )
-    docs = render_template(ontology, concepts, properties, enumerations)
-    # Write rendered template to file
-    sink = open(output, "w") if output else sys.stdout
-    typer.echo(docs, file=sink)
+    write_models(output, *models)
+    print(f"Models saved to file: {output}", file=sys.stderr)
+
+
+@app.command()
+def render(
+    models_path: Annotated[Path, typer.Argument(
+        help="Path to a models file written by respecter extract.",
+        exists=True,
+        dir_okay=False,
+        show_default=False,
+    )],
+    output: Annotated[Optional[List[Path]], typer.Option(
+        "-o",
+        "--output",
+        help="Path to an output file, rendered in the format of its suffix: .html (ReSpec), .json (term catalogue) or .md (Markdown). Can be repeated. If not provided, the HTML output will be printed to stdout.",
+        dir_okay=False,
+        show_default=False,
+    )] = None,
+    workers: Annotated[Optional[int], typer.Option(
+        "-j",
+        "--workers",
+        help="Number of worker processes rendering the outputs. Defaults to the number of CPUs.",
+        min=1,
+        show_default=False,
+    )] = None,
+    template_dirs: Annotated[Optional[List[Path]], typer.Option(
+        "-t",
+        "--template-dir",
+        help="Directory searched for templates and partials before the bundled ones. Can be repeated.",
+        exists=True,
+        file_okay=False,
+        show_default=False,
+    )] = None,
+    template_name: Annotated[str, typer.Option(
+        "--template",
+        help="Name of the template to render.",
+    )] = DEFAULT_TEMPLATE,
+):
+    """
+    Renders the documentation of a models file written by respecter extract, without parsing the ontology.
+    """
+    from respecter.artifacts import read_models
+    from respecter.core import write_template
+    from respecter.renderers import output_format, write_outputs
+
+    outputs = output or []
+    try:
+        for path in outputs:
+            output_format(path)
+        models = read_models(models_path)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    if outputs:
+        write_outputs(outputs, *models, template_name=template_name, template_dirs=template_dirs, workers=workers)
+    else:
+        write_template(sys.stdout, *models, template_name=template_name, template_dirs=template_dirs)
+
+
+@app.command()
+def build(
+    manifest_path: Annotated[Optional[Path], typer.Argument(
+        help="Path to a YAML manifest listing the ontology, config and output paths of each item.",
+        exists=True,
+        dir_okay=False,
+        show_default=False,
+    )] = None,
+    pattern: Annotated[Optional[str], typer.Option(
+        "-g",
+        "--glob",
+        help="Glob pattern of the ontology files to build, instead of a manifest.",
+        show_default=False,
+    )] = None,
+    config_path: Annotated[Optional[Path], typer.Option(
+        "-c",
+        "--config",
+        help="Path to the YAML configuration file shared by the files matching --glob.",
+        show_default=False,
+        exists=True,
+        dir_okay=False,
+    )] = None,
+    output_dir: Annotated[Path, typer.Option(
+        "-o",
+        "--output-dir",
+        help="Directory of the HTML files generated for the files matching --glob.",
+        file_okay=False,
+    )] = Path("."),
+    workers: Annotated[Optional[int], typer.Option(
+        "-j",
+        "--workers",
+        help="Number of worker processes. Defaults to the number of CPUs.",
+        min=1,
+        show_default=False,
+    )] = None,
+    no_cache: Annotated[bool, typer.Option(
+        "--no-cache",
+        help="Always build the documentations and parse the ontology files instead of going through the cache.",
+    )] = False,
+    cache_dir: Annotated[Optional[Path], typer.Option(
+        "--cache-dir",
+        help="Root directory of the caches, which keep the parsed graphs, SQLite stores, endpoint results, outputs and compiled templates in its graphs, stores, results, outputs and jinja subdirectories. Defaults to ~/.cache/respecter.",
+        envvar="RESPECTER_CACHE_DIR",
+        file_okay=False,
+    )] = None,
+    engine: Annotated[QueryEngine, typer.Option(
+        "--engine",
+        help="Extraction engine: evaluate the SPARQL queries, walk the SHACL shapes natively, or split the concepts query into sub-queries joined in Python (planned).",
+    )] = QueryEngine.sparql,
+    store: Annotated[GraphStore, typer.Option(
+        "--store",
+        help="Where the parsed graph is kept: in memory, or in an SQLite file built once in the cache directory and then queried from its indexes (for ontologies larger than memory).",
+    )] = GraphStore.memory,
+    filter_triples: Annotated[bool, typer.Option(
+        "--filter-triples",
+        help="Only load the triples whose predicate is read by the queries, dropping instance data and other annotations while parsing.",
+    )] = False,
+    catalog_path: Annotated[Optional[Path], typer.Option(
+        "--catalog",
+        help="Catalog mapping the IRIs of owl:imports to local files (YAML, or a Protégé catalog-v001.xml). The imports closure of the ontology is parsed in parallel, cached and merged into it.",
+        exists=True,
+        dir_okay=False,
+        show_default=False,
+    )] = None,
+    template_dirs: Annotated[Optional[List[Path]], typer.Option(
+        "-t",
+        "--template-dir",
+        help="Directory searched for templates and partials before the bundled ones. Can be repeated.",
+        exists=True,
+        file_okay=False,
+        show_default=False,
+    )] = None,
+    template_name: Annotated[str, typer.Option(
+        "--template",
+        help="Name of the template to render.",
+    )] = DEFAULT_TEMPLATE,
+):
+    """
+    Generates the HTML pages of several ontologies in a pool of worker processes.
+    """
+    from respecter.build import BuildOptions, discover_items, load_manifest, run_build
+    from respecter.templates import configure_bytecode_cache
+
+    if (manifest_path is None) == (pattern is None):
+        raise typer.BadParameter("Provide either a manifest or a --glob pattern.")
+    if manifest_path is not None:
+        try:
+            items = load_manifest(manifest_path)
+        except ValueError as e:
+            raise typer.BadParameter(str(e))
+    else:
+        if config_path is None:
+            raise typer.BadParameter("--config is required with --glob.")
+        try:
+            items = discover_items(pattern, config_path, output_dir)
+        except ValueError as e:
+            raise typer.BadParameter(str(e))
+
+    if store == GraphStore.sqlite and no_cache:
+        raise typer.BadParameter("--store sqlite keeps the stores in the cache, it cannot be used with --no-cache.")
+    _load_catalog(catalog_path, store)
+    configure_bytecode_cache(cache_dir, no_cache)
+    options = BuildOptions(
+        cache_dir=cache_dir,
+        no_cache=no_cache,
+        engine=engine,
+        store=store,
+        filter_triples=filter_triples,
+        template_name=template_name,
+        template_dirs=template_dirs or [],
+        catalog=catalog_path,
+    )
+    failed = 0
+    for result in run_build(items, options, workers=workers):
+        status = ("cached" if result.cached else "ok") if result.ok else "FAILED"
+        typer.echo(
+            f"{status:6} {result.seconds:7.2f}s  {result.item.ontology} -> {result.item.output}"
+        )
+        if not result.ok:
+            failed += 1
+            typer.echo(f"       {result.error}", err=True)
+
+    typer.echo(f"Built {len(items) - failed}/{len(items)} ontologies.")
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def serve(
+    manifest_path: Annotated[Optional[Path], typer.Argument(
+        help="Path to a YAML manifest listing the ontology, config and output paths of each item. Each ontology is served at the name of its output file.",
+        exists=True,
+        dir_okay=False,
+        show_default=False,
+    )] = None,
+    pattern: Annotated[Optional[str], typer.Option(
+        "-g",
+        "--glob",
+        help="Glob pattern of the ontology files to serve, instead of a manifest.",
+        show_default=False,
+    )] = None,
+    config_path: Annotated[Optional[Path], typer.Option(
+        "-c",
+        "--config",
+        help="Path to the YAML configuration file shared by the files matching --glob.",
+        show_default=False,
+        exists=True,
+        dir_okay=False,
+    )] = None,
+    host: Annotated[str, typer.Option(
+        "--host",
+        help="Address to listen on.",
+    )] = DEFAULT_HOST,
+    port: Annotated[int, typer.Option(
+        "-p",
+        "--port",
+        help="Port to listen on.",
+        min=0,
+    )] = DEFAULT_PORT,
+    no_cache: Annotated[bool, typer.Option(
+        "--no-cache",
+        help="Parse the ontology files instead of going through the cache.",
+    )] = False,
+    cache_dir: Annotated[Optional[Path], typer.Option(
+        "--cache-dir",
+        help="Root directory of the caches, which keep the parsed graphs, SQLite stores, endpoint results, outputs and compiled templates in its graphs, stores, results, outputs and jinja subdirectories. Defaults to ~/.cache/respecter.",
+        envvar="RESPECTER_CACHE_DIR",
+        file_okay=False,
+    )] = None,
+    engine: Annotated[QueryEngine, typer.Option(
+        "--engine",
+        help="Extraction engine: evaluate the SPARQL queries, walk the SHACL shapes natively, or split the concepts query into sub-queries joined in Python (planned).",
+    )] = QueryEngine.sparql,
+    store: Annotated[GraphStore, typer.Option(
+        "--store",
+        help="Where the parsed graph is kept: in memory, or in an SQLite file built once in the cache directory and then queried from its indexes (for ontologies larger than memory).",
+    )] = GraphStore.memory,
+    filter_triples: Annotated[bool, typer.Option(
+        "--filter-triples",
+        help="Only load the triples whose predicate is read by the queries, dropping instance data and other annotations while parsing.",
+    )] = False,
+    catalog_path: Annotated[Optional[Path], typer.Option(
+        "--catalog",
+        help="Catalog mapping the IRIs of owl:imports to local files (YAML, or a Protégé catalog-v001.xml). The imports closure of the ontology is parsed in parallel, cached and merged into it.",
+        exists=True,
+        dir_okay=False,
+        show_default=False,
+    )] = None,
+    template_dirs: Annotated[Optional[List[Path]], typer.Option(
+        "-t",
+        "--template-dir",
+        help="Directory searched for templates and partials before the bundled ones. Can be repeated.",
+        exists=True,
+        file_okay=False,
+        show_default=False,
+    )] = None,
+    template_name: Annotated[str, typer.Option(
+        "--template",
+        help="Name of the template to render.",
+    )] = DEFAULT_TEMPLATE,
+):
+    """
+    Serves the HTML pages of several ontologies over HTTP, rendering them again when their files change.
+    """
+    from respecter.build import BuildOptions, discover_items, load_manifest
+    from respecter.server import DocumentationServer
+    from respecter.templates import configure_bytecode_cache
+
+    if (manifest_path is None) == (pattern is None):
+        raise typer.BadParameter("Provide either a manifest or a --glob pattern.")
+    if manifest_path is not None:
+        try:
+            items = load_manifest(manifest_path)
+        except ValueError as e:
+            raise typer.BadParameter(str(e))
+    else:
+        if config_path is None:
+            raise typer.BadParameter("--config is required with --glob.")
+        try:
+            items = discover_items(pattern, config_path, Path("."))
+        except ValueError as e:
+            raise typer.BadParameter(str(e))
+
+    if store == GraphStore.sqlite and no_cache:
+        raise typer.BadParameter("--store sqlite keeps the stores in the cache, it cannot be used with --no-cache.")
+    _load_catalog(catalog_path, store)
+    configure_bytecode_cache(cache_dir, no_cache)
+    options = BuildOptions(
+        cache_dir=cache_dir,
+        no_cache=no_cache,
+        engine=engine,
+        store=store,
+        filter_triples=filter_triples,
+        template_name=template_name,
+        template_dirs=template_dirs or [],
+        catalog=catalog_path,
+    )
+    try:
+        server = DocumentationServer(items, options, (host, port))
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    for name, error in server.warm():
+        typer.echo(f"Failed to render /{name}: {type(error).__name__}: {error}", err=True)
+    typer.echo(f"Serving {len(items)} ontologies on {server.url}, press Ctrl+C to stop.")
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
 
 @app.command()
 def generate_config(
@@ -103,6 +759,9 @@ def generate_config(
     """
     Generate an example configuration file.
     """
+    from respecter import defaults
+    from respecter.sparql import SparqlConfig
+
     config = SparqlConfig.parse(defaults.CONFIG)
 
     if interactive:
@@ -125,10 +784,10 @@ def generate_config(
     typer.echo(config.dump())
 
 
-
 typer_cli = typer.main.get_command(app)
 cli.add_command(typer_cli, "cli")
 
+
 # Called when respecter is called without a subcommand
 @app.callback()
 def callback(
@@ -137,5 +796,6 @@ def callback(
     """respecter generates a ReSpec styled HTML page from an ontology RDF file."""
     ...
 
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,285 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+import re
+import sys
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+from unicodedata import category
+
+import rdflib
+from rdflib.namespace import ALLOWED_NAME_CHARS, NAME_CATEGORIES, SPLIT_START_CATEGORIES
+from rdflib.term import Literal, URIRef
+
+DEFAULT_MEMO_SIZE = 65536
+
+# Prefixes renamed by rdflib when a document binds a default prefix to another namespace (e.g. schema1)
+_RENAMED_PREFIX = re.compile(r"^(\D+?)\d+$")
+
+
+@lru_cache(maxsize=None)
+def _default_namespaces() -> Dict[str, str]:
+    return {prefix: str(namespace) for prefix, namespace in rdflib.Graph().namespaces()}
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _is_name_char(char: str) -> bool:
+    return category(char) in NAME_CATEGORIES or char in ALLOWED_NAME_CHARS
+
+
+def _is_local_name(name: str) -> bool:
+    return bool(name) and (
+        category(name[0]) in SPLIT_START_CATEGORIES or name[0] == "_"
+    ) and all(_is_name_char(char) for char in name)
+
+
+def preferred_prefixes(namespaces: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+    """
+    Map each namespace to the prefix it should be rendered with.
+
+    rdflib binds default prefixes (e.g. schema: <https://schema.org/>) to every graph,
+    so a document binding one of them to another namespace gets a renamed prefix
+    (e.g. schema1: <http://schema.org/>). Such prefixes are mapped back to the name
+    used in the document.
+    """
+    namespaces = [(prefix, str(namespace)) for prefix, namespace in namespaces]
+    defaults = _default_namespaces()
+    bound = dict(namespaces)
+    prefixes = {}
+    for prefix, namespace in namespaces:
+        match = _RENAMED_PREFIX.match(prefix)
+        if match:
+            stem = match.group(1)
+            if stem in defaults and bound.get(stem) == defaults[stem] != namespace:
+                prefix = stem
+        prefixes[namespace] = prefix
+    return prefixes
+
+
+def namespace_snapshot(namespaces: Iterable[Tuple[str, str]]) -> rdflib.Graph:
+    """
+    Get an empty graph binding the given namespaces, to compute prefixed names
+    like the graph they were bound in.
+    """
+    snapshot = rdflib.Graph(bind_namespaces="none")
+    for prefix, namespace in namespaces:
+        snapshot.bind(prefix, namespace, override=True, replace=True)
+    return snapshot
+
+
+class CompactTerm:
+    """
+    A URI interned by a UriCompactor, rendered as an anchor only when converted to a string.
+
+    Terms are interned once per compactor, so they compare and hash by identity.
+    """
+
+    __slots__ = ("uri", "compactor")
+
+    def __init__(self, uri: str, compactor: "UriCompactor"):
+        self.uri = uri
+        self.compactor = compactor
+
+    def __str__(self) -> str:
+        return self.compactor.anchor(self.uri)
+
+    def __repr__(self) -> str:
+        return f"CompactTerm({self.uri!r})"
+
+
+class UriCompactor:
+    """
+    Compacts URIs into prefixed names and renders RDF terms for the template.
+
+    The namespaces are stored in a character trie built once, so that the longest
+    namespace of a URI is found in a single walk over the URI. Rendered anchors
+    are memoized in a bounded cache, as the same terms appear in many rows.
+
+    Args:
+        namespaces: The (prefix, namespace) bindings to compact URIs with.
+        current_ontology_url: URIs starting with this base link to fragments of the generated page
+            (or of the page documenting them, see link_pages).
+        fallback_qname: Used for URIs that are not in one of the namespaces (e.g. graph.qname).
+        memo_size: The maximum number of memoized anchors.
+
+    Attributes:
+        key: A digest of the namespaces, base URL and page links the anchors are rendered
+            with, so that two compactors with the same key render the same anchors (as long
+            as the fallback_qname of the constructor follows the namespaces, as in from_graph).
+    """
+
+    def __init__(
+        self,
+        namespaces: Iterable[Tuple[str, str]],
+        current_ontology_url: Optional[str] = None,
+        fallback_qname: Optional[Callable[[str], str]] = None,
+        memo_size: int = DEFAULT_MEMO_SIZE,
+    ):
+        namespaces = [(prefix, str(namespace)) for prefix, namespace in namespaces]
+        self.prefixes = preferred_prefixes(namespaces)
+        self._renamed = {
+            prefix: self.prefixes[namespace]
+            for prefix, namespace in namespaces
+            if self.prefixes[namespace] != prefix
+        }
+        self.current_ontology_url = current_ontology_url
+        self.pages: Dict[str, str] = {}
+        self.fallback_qname = fallback_qname
+        self._trie = {}
+        for namespace in self.prefixes:
+            node = self._trie
+            for char in namespace:
+                node = node.setdefault(char, {})
+            node[None] = namespace
+        self.anchor = lru_cache(maxsize=memo_size)(self._anchor)
+        self._terms: Dict[str, CompactTerm] = {}
+        self._bindings = repr((namespaces, current_ontology_url))
+        self._update_key()
+
+    @classmethod
+    def from_graph(cls, graph: rdflib.Graph, current_ontology_url: Optional[str] = None, **kwargs):
+        """
+        Create a compactor from the namespaces bound in a graph.
+
+        The bindings are copied, so that the compactor (and the models holding its terms)
+        does not keep the graph alive once the ontology is extracted.
+        """
+        namespaces = list(graph.namespaces())
+        return cls(
+            namespaces,
+            current_ontology_url=current_ontology_url,
+            fallback_qname=namespace_snapshot(namespaces).qname,
+            **kwargs,
+        )
+
+    @classmethod
+    def from_qnames(cls, qnames: Dict[str, str], current_ontology_url: Optional[str] = None, **kwargs):
+        """
+        Create a compactor rendering each URI with a prefixed name computed beforehand,
+        e.g. by the compactor of a graph that is not available anymore (see respecter.artifacts).
+        URIs without a prefixed name are rendered as they are.
+        """
+        compactor = cls(
+            [],
+            current_ontology_url=current_ontology_url,
+            fallback_qname=lambda uri: qnames.get(uri, uri),
+            **kwargs,
+        )
+        compactor._bindings += repr(sorted(qnames.items()))
+        compactor._update_key()
+        return compactor
+
+    def longest_namespace(self, uri: str) -> Optional[str]:
+        """
+        Get the longest namespace the URI starts with, if any.
+        """
+        node = self._trie
+        namespace = None
+        for char in uri:
+            node = node.get(char)
+            if node is None:
+                break
+            namespace = node.get(None, namespace)
+        return namespace
+
+    def _rename(self, qname: str) -> str:
+        prefix, separator, name = qname.partition(":")
+        if separator and prefix in self._renamed:
+            return self._renamed[prefix] + ":" + name
+        return qname
+
+    def qname(self, uri: str) -> str:
+        """
+        Compact a URI into a prefixed name, e.g. "http://schema.org/name" into "schema:name".
+        """
+        namespace = self.longest_namespace(uri)
+        # Only namespaces ending on a URI delimiter give the same local names as rdflib.
+        if namespace and not _is_name_char(namespace[-1]):
+            name = uri[len(namespace):]
+            if _is_local_name(name):
+                prefix = self.prefixes[namespace]
+                return prefix + ":" + name if prefix else name
+        if self.fallback_qname is None:
+            return uri
+        try:
+            return self._rename(self.fallback_qname(uri))
+        except ValueError:
+            return uri
+
+    def link_pages(self, pages: Dict[str, str]):
+        """
+        Link the URIs of the ontology to the pages documenting them, for a multi-page output.
+
+        Args:
+            pages: The page (file name) documenting each URI. Other URIs of the ontology
+                link to a fragment of the current page.
+        """
+        self.pages = dict(pages)
+        self.anchor.cache_clear()
+        self._update_key()
+
+    def _update_key(self):
+        self.key = _digest(self._bindings + repr(sorted(self.pages.items())))
+
+    def _anchor(self, uri: str) -> str:
+        if self.current_ontology_url and uri.startswith(self.current_ontology_url):
+            href = self.pages.get(uri, "") + uri.replace(self.current_ontology_url, "#")
+        else:
+            href = uri
+        return '<a href="' + href + '">' + self.qname(uri) + "</a>"
+
+    def term(self, term) -> Union[CompactTerm, str]:
+        """
+        Intern an RDF term from a result row to be used in the models.
+
+        URIs are interned as CompactTerm and only formatted when rendered,
+        the other terms are formatted right away (see format).
+        """
+        if isinstance(term, URIRef):
+            return self.intern(str(term))
+        return self.format(term)
+
+    def intern(self, uri: str) -> CompactTerm:
+        """
+        Get the CompactTerm of a URI, created the first time the URI is seen.
+        """
+        compact_term = self._terms.get(uri)
+        if compact_term is None:
+            compact_term = self._terms[uri] = CompactTerm(uri, self)
+        return compact_term
+
+    def format(self, term) -> str:
+        """
+        Format an RDF term from a result row to be used in the template.
+        """
+        if isinstance(term, URIRef):
+            return self.anchor(str(term))
+        elif isinstance(term, Literal):
+            return str(term)
+        elif term is None:
+            # Display a warning message
+            print("Warning: missing value encountered.", file=sys.stderr)
+            return ""
+        else:  # FIXME: handle other types
+            # Display a warning message
+            print(
+                f"Warning: unknown type {type(term).__name__.lower()} for value {term}",
+                file=sys.stderr,
+            )
+            return str(term)
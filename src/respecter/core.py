@@ -1,6 +1,6 @@
-# respecter
-# Copyright 2022 - Swiss Data Science Center (SDSC)
-# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
 # Eidgenössische Technische Hochschule Zürich (ETHZ).# 
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -13,107 +13,359 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
-from jinja2 import Template
 import json
 import rdflib
 import os
 from respecter.models import Ontology, Class, Property, Enumeration
 from respecter.helpers import (
-    extract_classes,
-    extract_enumerations,
-    extract_properties,
+    extract_terms,
     format_classes,
     format_properties,
     group_format_enumerations,
 )
 from respecter import defaults
-from respecter.sparql import run_query, SparqlConfig
-from typing import List
+from respecter.cache import GraphCache, StoreCache
+from respecter.compaction import UriCompactor
+from respecter.endpoint import SparqlEndpoint
+from respecter.imports import ImportCatalog, import_filter, resolve_imports
+from respecter.ingest import PredicateFilter, parse_graph
+from respecter.options import QueryEngine
+from respecter.parallel import graph_pool, shared_graph
+from respecter.profiling import Profiler, profile_phase
+from respecter.shacl import concepts_rows, enumerations_rows
+from respecter.sparql import plan_concepts_rows, query_rows, rows_to_json, SparqlConfig
+from respecter.templates import DEFAULT_TEMPLATE, FragmentCache, get_template
+from typing import Dict, Iterator, List, Optional, Sequence, TextIO, Union
 
 
-def fetch_ontology(ontology_path: Path, config: SparqlConfig, debug=False):
+# The queries run on the ontology graph, in the order their results are merged.
+QUERY_STAGES = ("ontology", "concepts", "enumerations")
+
+
+def parse_ontology(
+    ontology_path: Path,
+    cache: Optional[Union[GraphCache, StoreCache]] = None,
+    predicate_filter: Optional[PredicateFilter] = None,
+    catalog: Optional[ImportCatalog] = None,
+    cache_ontology=True,
+):
     """
-    Fetch the ontology from the RDF file and the SPARQL query.
+    Parse the ontology RDF file into a graph, going through the graph cache if one is given.
+    With a StoreCache, the graph is an SQLite store opened read-only instead of an in-memory graph.
+    With a predicate filter, the other triples are dropped while parsing.
+    With an import catalog, the owl:imports closure of the ontology is merged into the graph
+    (see resolve_imports), the imported files going through the graph cache too.
+    With cache_ontology False, only the imported files go through the cache, e.g. for an
+    ontology that is being edited, whose versions would never be read from the cache again.
+
+    Raises:
+        ValueError: If imports are to be merged into an SQLite store.
     """
-    # Load the turtle file
-    graph = rdflib.Graph()
-    graph.parse(ontology_path)
-    
-    
-    # Load the SPARQL query
-    concepts_query = config.build_concepts_query()
-    
+    if catalog is not None:
+        if isinstance(cache, StoreCache):
+            raise ValueError("Imports cannot be merged into an SQLite store, use the in-memory store to resolve them.")
+        predicate_filter = import_filter(predicate_filter)
+    if cache is not None and cache_ontology:
+        graph = cache.load(ontology_path, predicate_filter)
+    else:
+        graph = parse_graph(ontology_path, predicate_filter)
+    if catalog is not None:
+        resolve_imports(graph, catalog, cache=cache, predicate_filter=predicate_filter)
+    return graph
+
+
+def select_stage(select, stage: str, config: SparqlConfig, engine: QueryEngine = QueryEngine.sparql):
+    """
+    Run one of the QUERY_STAGES with select, a function running a SELECT query and
+    returning its result rows, e.g. on a graph or on a SPARQL endpoint.
+    """
+    if stage == "ontology":
+        return select(defaults.QUERY)
+    if stage == "concepts":
+        if engine == QueryEngine.planned:
+            return plan_concepts_rows(select, config)
+        return select(config.build_concepts_query())
+    if stage == "enumerations":
+        return select(config.build_enumerations_query())
+    raise ValueError(f"Unknown query stage {stage}")
+
+
+def run_stage(graph, stage: str, config: SparqlConfig, engine: QueryEngine = QueryEngine.sparql):
+    """
+    Run one of the QUERY_STAGES on the graph and return its result rows.
+    """
+    if engine == QueryEngine.native:
+        if stage == "concepts":
+            return list(concepts_rows(graph, config))
+        if stage == "enumerations":
+            return list(enumerations_rows(graph, config))
+    return select_stage(partial(query_rows, graph), stage, config, engine)
+
+
+def _run_shared_stage(stage: str, config: SparqlConfig, engine: QueryEngine):
+    return run_stage(shared_graph(), stage, config, engine)
+
+
+def query_ontology(
+    graph,
+    config: SparqlConfig,
+    engine: QueryEngine = QueryEngine.sparql,
+    parallel=False,
+    profiler: Optional[Profiler] = None,
+) -> Dict[str, list]:
+    """
+    Run the ontology metadata, concepts and enumerations queries on the graph.
+
+    With parallel, the queries are evaluated concurrently in a process pool sharing the graph.
+    With a profiler, each query is profiled as a query_<stage> phase, or all of them
+    as a single queries phase when they run in parallel.
 
+    Returns:
+        The result rows of each of the QUERY_STAGES, keyed by stage.
+    """
+    if not parallel:
+        results = {}
+        for stage in QUERY_STAGES:
+            with profile_phase(profiler, f"query_{stage}") as phase:
+                results[stage] = run_stage(graph, stage, config, engine)
+                phase.count(rows=len(results[stage]))
+        return results
+
+    with profile_phase(profiler, "queries") as phase:
+        with graph_pool(graph, max_workers=len(QUERY_STAGES)) as pool:
+            futures = {
+                stage: pool.submit(_run_shared_stage, stage, config, engine)
+                for stage in QUERY_STAGES
+            }
+            results = {stage: futures[stage].result() for stage in QUERY_STAGES}
+        phase.count(**{f"{stage}_rows": len(rows) for stage, rows in results.items()})
+        return results
+
+
+def query_endpoint(
+    endpoint: SparqlEndpoint,
+    config: SparqlConfig,
+    engine: QueryEngine = QueryEngine.sparql,
+    parallel=False,
+    profiler: Optional[Profiler] = None,
+) -> Dict[str, list]:
+    """
+    Run the ontology metadata, concepts and enumerations queries on a SPARQL endpoint.
+
+    With parallel, the queries are sent concurrently from a thread pool, on the pooled
+    connections of the endpoint. Profiling is the same as for query_ontology.
+
+    Raises:
+        ValueError: If the engine needs the graph itself (native).
+    """
+    if engine == QueryEngine.native:
+        raise ValueError("The native engine cannot query a SPARQL endpoint")
+
+    if not parallel:
+        results = {}
+        for stage in QUERY_STAGES:
+            with profile_phase(profiler, f"query_{stage}") as phase:
+                results[stage] = select_stage(endpoint.select, stage, config, engine)
+                phase.count(rows=len(results[stage]))
+        return results
+
+    with profile_phase(profiler, "queries") as phase:
+        with ThreadPoolExecutor(max_workers=len(QUERY_STAGES)) as pool:
+            futures = {
+                stage: pool.submit(select_stage, endpoint.select, stage, config, engine)
+                for stage in QUERY_STAGES
+            }
+            results = {stage: futures[stage].result() for stage in QUERY_STAGES}
+        phase.count(**{f"{stage}_rows": len(rows) for stage, rows in results.items()})
+        return results
+
+
+def _save_query(config: SparqlConfig):
     # Save the query to a file (for debugging)
+    os.makedirs("debug", exist_ok=True)
+    filename = "debug/sparql_query_file.sparql"
+    with open(filename, "w") as file:
+        # Load the SPARQL query
+        file.write(config.build_concepts_query())
+        print(f"SPARQL query saved to file: {filename}")
+
+
+def _extract_ontology(
+    results: Dict[str, list],
+    graph,
+    config: SparqlConfig,
+    debug=False,
+    profiler: Optional[Profiler] = None,
+):
+    ontology_metadata = results["ontology"]
+    concepts_data = results["concepts"]
+    enumerations_data = results["enumerations"]
+
+    # Save the query results in the SPARQL JSON format (for debugging)
     if debug:
-        os.makedirs("debug", exist_ok=True)
-        filename = "debug/sparql_query_file.sparql"
-        with open(filename, "w") as file:
-            # Load the SPARQL query
-            file.write(concepts_query)
-            print(f"SPARQL query saved to file: {filename}")
-
-    ontology_query_result = run_query(graph, defaults.QUERY)
-    concepts_query_result = graph.query(concepts_query).serialize(format="json")
-    concepts_query_result = json.loads(concepts_query_result)
-
-    enumerations_query = config.build_enumerations_query()
-    enumerations_query_result = graph.query(enumerations_query).serialize(format="json")
-    enumerations_query_result = json.loads(enumerations_query_result)
-
-    ontology_metadata = ontology_query_result.get("results", {}).get("bindings", [])
-    
-    concepts_data = concepts_query_result.get("results", {}).get("bindings", [])
-    enumerations_data = enumerations_query_result.get("results", {}).get("bindings", [])
-
-    concepts = extract_classes(
-        concepts_data,
-        qname=graph.qname,
-        current_ontology_url=config.get_uri_base()
-        
-        + config.get_uri_separator(),
-    )
-    properties = extract_properties(
-        concepts_data,
-        qname=graph.qname,
-        current_ontology_url=config.get_uri_base()
-        + config.get_uri_separator(),
-    )
-    enumerations = extract_enumerations(
-        enumerations_data,
-        qname=graph.qname,
-        current_ontology_url=config.get_uri_base()
-        + config.get_uri_separator(),
-    )
-    ontology = Ontology()
-    ontology.import_from_rdf(ontology_metadata[0])
-   
+        for name, rows in [("concepts", concepts_data), ("enumerations", enumerations_data)]:
+            filename = f"debug/{name}_results.json"
+            with open(filename, "w") as file:
+                json.dump(rows_to_json(rows), file, indent=2)
+                print(f"SPARQL results saved to file: {filename}")
+
+    with profile_phase(profiler, "extract") as phase:
+        # URIs are compacted with the prefixes bound in the graph
+        compactor = UriCompactor.from_graph(
+            graph,
+            current_ontology_url=config.get_uri_base() + config.get_uri_separator(),
+        )
+        concepts, properties, enumerations = extract_terms(concepts_data, enumerations_data, compactor)
+        ontology = Ontology()
+        ontology.import_from_rdf(ontology_metadata[0])
+        phase.count(classes=len(concepts), properties=len(properties), enumerations=len(enumerations))
+
     return ontology, concepts, properties, enumerations
 
-def fix_prefixes(rendered_html):
+
+def fetch_ontology(
+    ontology_path: Path,
+    config: SparqlConfig,
+    debug=False,
+    cache: Optional[Union[GraphCache, StoreCache]] = None,
+    engine: QueryEngine = QueryEngine.sparql,
+    parallel=False,
+    profiler: Optional[Profiler] = None,
+    filter_triples=False,
+    catalog: Optional[ImportCatalog] = None,
+):
     """
-    Fixes a bug caused by rdflib replacing the prefix "schema" with "schema1".
+    Fetch the ontology from the RDF file and the SPARQL query.
+
+    With filter_triples, only the triples with the predicates read by the queries are
+    parsed (see SparqlConfig.get_predicate_filter), so that the instance data and
+    annotations of the file are not loaded.
+    With a StoreCache as cache, the queries run on an SQLite store built once from the file
+    (see SQLiteStore), for ontologies that do not fit in memory.
+    With an import catalog, the imported ontologies are parsed from the local files it lists
+    and merged into the graph, so that the labels and definitions of imported terms are found.
     """
-    if "schema1" in rendered_html:
-        rendered_html = rendered_html.replace("schema1", "schema")
-    return rendered_html
+    predicate_filter = config.get_predicate_filter() if filter_triples else None
+    # Load the turtle file
+    with profile_phase(profiler, "parse") as phase:
+        graph = parse_ontology(ontology_path, cache=cache, predicate_filter=predicate_filter, catalog=catalog)
+        phase.count(triples=len(graph))
 
-def render_template(
+    return fetch_ontology_from_graph(graph, config, debug=debug, engine=engine, parallel=parallel, profiler=profiler)
+
+
+def fetch_ontology_from_graph(
+    graph,
+    config: SparqlConfig,
+    debug=False,
+    engine: QueryEngine = QueryEngine.sparql,
+    parallel=False,
+    profiler: Optional[Profiler] = None,
+):
+    """
+    Fetch the ontology from an already parsed graph, e.g. one kept in memory between builds.
+    """
+    if debug:
+        _save_query(config)
+
+    results = query_ontology(graph, config, engine=engine, parallel=parallel, profiler=profiler)
+    return _extract_ontology(results, graph, config, debug=debug, profiler=profiler)
+
+
+def fetch_ontology_from_endpoint(
+    endpoint: SparqlEndpoint,
+    config: SparqlConfig,
+    debug=False,
+    engine: QueryEngine = QueryEngine.sparql,
+    parallel=False,
+    profiler: Optional[Profiler] = None,
+):
+    """
+    Fetch the ontology from a SPARQL endpoint instead of an RDF file.
+
+    The endpoint does not tell which prefixes the ontology uses: URIs are compacted with
+    the prefixes of the config file (see SparqlConfig.get_namespaces) and rdflib's defaults.
+    """
+    if debug:
+        _save_query(config)
+
+    results = query_endpoint(endpoint, config, engine=engine, parallel=parallel, profiler=profiler)
+    graph = rdflib.Graph()
+    for prefix, namespace in config.get_namespaces():
+        graph.bind(prefix, namespace)
+    return _extract_ontology(results, graph, config, debug=debug, profiler=profiler)
+
+
+def stream_template(
     ontology: Ontology,
     concepts: List[Class],
     properties: List[Property],
     enumerations: List[Enumeration],
-):
+    template_name: str = DEFAULT_TEMPLATE,
+    template_dirs: Optional[Sequence[Path]] = None,
+    fragment_cache: Optional[FragmentCache] = None,
+) -> Iterator[str]:
+    """
+    Render the HTML documentation chunk by chunk, as the template produces it.
+
+    With a fragment cache, the blocks of the classes, properties and enumerations that
+    did not change since they were cached are neither formatted nor rendered again
+    (see FragmentExtension).
+    """
     grouped_enumerations = group_format_enumerations(enumerations)
-    template = Template(defaults.TEMPLATE)
-    # Render the template
-    rendered_html = template.render(
+    template = get_template(template_name, template_dirs)
+    return template.generate(
         concepts=format_classes(concepts),
         ontology=ontology.to_dict(),
         properties=format_properties(properties),
         grouped_enumerations=grouped_enumerations,
+        fragment_cache=fragment_cache,
     )
-    rendered_html = fix_prefixes(rendered_html)
-    return rendered_html
+
+
+def write_template(sink: TextIO, *args, profiler: Optional[Profiler] = None, **kwargs):
+    """
+    Stream the HTML documentation to a file-like sink, followed by a newline,
+    without building the whole document in memory.
+    Takes the same arguments as stream_template; with a profiler, rendering and
+    writing are profiled as the render phase.
+    """
+    with profile_phase(profiler, "render") as phase:
+        size = 0
+        for chunk in stream_template(*args, **kwargs):
+            sink.write(chunk)
+            size += len(chunk)
+        sink.write("\n")
+        phase.count(characters=size + 1)
+
+
+def render_template(
+    ontology: Ontology,
+    concepts: List[Class],
+    properties: List[Property],
+    enumerations: List[Enumeration],
+    template_name: str = DEFAULT_TEMPLATE,
+    template_dirs: Optional[Sequence[Path]] = None,
+    profiler: Optional[Profiler] = None,
+):
+    """
+    Render the HTML documentation with the bundled template, or with template_name
+    looked up in template_dirs first.
+    """
+    with profile_phase(profiler, "render") as phase:
+        rendered = "".join(
+            stream_template(
+                ontology,
+                concepts,
+                properties,
+                enumerations,
+                template_name=template_name,
+                template_dirs=template_dirs,
+            )
+        )
+        phase.count(characters=len(rendered))
+    return rendered
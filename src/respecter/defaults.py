@@ -1,6 +1,17 @@
+from functools import lru_cache
 from importlib import resources
 
+# The bundled resources, read on first access rather than when respecter is imported.
+_RESOURCES = {
+    "CONFIG": "data/config.yaml",
+    "QUERY": "data/queries/ontology_metadata.sparql",
+    "TEMPLATE": "data/template.html",
+}
 
+__all__ = list(_RESOURCES)
+
+
+@lru_cache(maxsize=None)
 def _read_resource(path: str):
     data = (
         resources.files("respecter").joinpath(path).open("r", encoding="utf-8").read()
@@ -8,6 +19,7 @@ def _read_resource(path: str):
     return data
 
 
-CONFIG = _read_resource("data/config.yaml")
-QUERY = _read_resource("data/queries/ontology_metadata.sparql")
-TEMPLATE = _read_resource("data/template.html")
+def __getattr__(name: str):
+    if name in _RESOURCES:
+        return _read_resource(_RESOURCES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,223 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import http.client
+import json
+import queue
+import re
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.term import Identifier
+
+from respecter.cache import ResultCache
+from respecter.options import DEFAULT_ENDPOINT_PAGE_SIZE as DEFAULT_PAGE_SIZE
+from respecter.sparql import rows_from_json
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 60.0
+
+# Queries that already limit their results are not paginated.
+_LIMIT = re.compile(r"\b(LIMIT|OFFSET)\s+\d+\s*$", re.IGNORECASE)
+# Comments, PREFIX and BASE declarations before the query form.
+_PROLOGUE = re.compile(r"(?:\s+|#[^\n]*|PREFIX\s+[^\s:]*:\s*<[^>]*>|BASE\s+<[^>]*>)*", re.IGNORECASE)
+
+# Raised when a pooled connection was closed by the server while idle.
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class EndpointError(RuntimeError):
+    """
+    Raised when a SPARQL endpoint does not answer a query with results.
+    """
+
+
+def ordered_query(query: str) -> Optional[str]:
+    """
+    Wrap a SELECT query into a query ordering its solutions by all of its projected variables,
+    so that the pages of its results cut with LIMIT/OFFSET neither repeat nor drop rows:
+    SPARQL does not guarantee the same order for the solutions of an unordered query.
+
+    Returns:
+        The ordered query, or None if the query is not a SELECT query rdflib can parse
+        (e.g. one using extensions of the endpoint).
+    """
+    try:
+        algebra = prepareQuery(query).algebra
+    except Exception:  # pyparsing and rdflib raise various exceptions for invalid queries
+        return None
+    if algebra.name != "SelectQuery" or not algebra["PV"]:
+        return None
+    prologue = _PROLOGUE.match(query).group()
+    order = " ".join(variable.n3() for variable in algebra["PV"])
+    ordered = f"SELECT * WHERE {{\n{query[len(prologue):].strip()}\n}}\nORDER BY {order}"
+    return f"{prologue.strip()}\n{ordered}" if prologue.strip() else ordered
+
+
+class SparqlEndpoint:
+    """
+    Runs SELECT queries against a SPARQL endpoint over HTTP(S).
+
+    Requests go through a pool of keep-alive connections, so that the queries of a run
+    (and the pages of a query) reuse the same connections, including across threads.
+    Results are fetched in pages of page_size rows with LIMIT/OFFSET over the query
+    ordered by its variables (see ordered_query), and stored in the result cache if there is one.
+
+    Args:
+        url: The URL of the SPARQL endpoint.
+        page_size: The number of rows fetched per request, or 0 to fetch all the rows at once.
+        pool_size: The maximum number of idle connections kept open.
+        timeout: The timeout of the connections, in seconds.
+        cache: The cache of the query results.
+
+    Raises:
+        ValueError: If the URL is not an HTTP(S) URL.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        cache: Optional[ResultCache] = None,
+    ):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Invalid SPARQL endpoint URL {url}")
+        self.url = url
+        self.page_size = page_size
+        self.timeout = timeout
+        self.cache = cache
+        self._connection_class = (
+            http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        )
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path = parts.path or "/"
+        if parts.query:
+            self._path += "?" + parts.query
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Close the idle connections of the pool.
+        """
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _acquire(self, fresh: bool = False) -> http.client.HTTPConnection:
+        if not fresh:
+            try:
+                return self._pool.get_nowait()
+            except queue.Empty:
+                pass
+        return self._connection_class(self._host, self._port, timeout=self.timeout)
+
+    def _release(self, connection: http.client.HTTPConnection):
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _post(self, connection: http.client.HTTPConnection, query: str):
+        connection.request(
+            "POST",
+            self._path,
+            body=urlencode({"query": query}),
+            headers={
+                "Accept": "application/sparql-results+json",
+                "Content-Type": "application/x-www-form-urlencoded",
+            },
+        )
+        response = connection.getresponse()
+        return response, response.read()
+
+    def request(self, query: str) -> dict:
+        """
+        Send a query to the endpoint and return the results in the SPARQL JSON format.
+
+        Raises:
+            EndpointError: If the endpoint answers with an error.
+        """
+        connection = self._acquire()
+        try:
+            try:
+                response, body = self._post(connection, query)
+            except _STALE_CONNECTION_ERRORS:
+                # Retry once on a new connection if the server closed the pooled one.
+                connection.close()
+                connection = self._acquire(fresh=True)
+                response, body = self._post(connection, query)
+        except BaseException:
+            connection.close()
+            raise
+        self._release(connection)
+
+        if response.status != 200:
+            raise EndpointError(
+                f"SPARQL endpoint {self.url} returned {response.status} {response.reason}: "
+                + body[:500].decode("utf-8", "replace")
+            )
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise EndpointError(f"SPARQL endpoint {self.url} returned invalid JSON results: {e}")
+
+    def iter_rows(self, query: str) -> Iterator[Dict[str, Identifier]]:
+        """
+        Stream the result rows of a query, fetching them page by page.
+
+        The pages are delimited with LIMIT/OFFSET over the query ordered by its projected
+        variables. Queries that cannot be ordered (see ordered_query) or already have a
+        LIMIT or OFFSET are fetched with a single request.
+        """
+        paged_query = None if not self.page_size or _LIMIT.search(query.strip()) else ordered_query(query)
+        if paged_query is None:
+            yield from rows_from_json(self.request(query))
+            return
+
+        offset = 0
+        while True:
+            rows = rows_from_json(
+                self.request(f"{paged_query}\nLIMIT {self.page_size} OFFSET {offset}")
+            )
+            yield from rows
+            if len(rows) < self.page_size:
+                return
+            offset += self.page_size
+
+    def select(self, query: str) -> List[Dict[str, Identifier]]:
+        """
+        Get the result rows of a query, from the result cache if they are cached.
+        """
+        if self.cache is None:
+            return list(self.iter_rows(query))
+        key = self.cache.key(self.url, query)
+        rows = self.cache.get(key)
+        if rows is None:
+            rows = list(self.iter_rows(query))
+            self.cache.put(key, rows)
+        return rows
@@ -1,6 +1,6 @@
-# respecter
-# Copyright 2022 - Swiss Data Science Center (SDSC)
-# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
 # Eidgenössische Technische Hochschule Zürich (ETHZ).# 
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -13,23 +13,116 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import sys
+from collections.abc import Mapping
+
+from rdflib.term import BNode
+from respecter.compaction import CompactTerm, UriCompactor
 from respecter.models import Class, Property, Enumeration, EnumerationGroup
-from typing import Dict, List
+from respecter.sparql import CONCEPTS_VARIABLES, ENUMERATIONS_VARIABLES
+from typing import Collection, Dict, Iterator, List, Sequence
+
+
+def _raw_value(value):
+    if value.__class__ is CompactTerm:
+        return value.uri
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (tuple, dict)):
+        return tuple(map(_raw_value, value))
+    # A term nested in another, e.g. the groups of an enumeration
+    return tuple(map(_raw_value, map(value.__getattribute__, value.__slots__)))
+
+
+def term_key(term) -> tuple:
+    """
+    Get a hashable key of the raw data of a term of the models, which is the same for
+    terms rendered the same, without rendering them: URIs are keyed by themselves and
+    by the key of the compactor of the term, which renders them as anchors (the terms
+    of the models share a compactor). A term without a URI of its own is keyed by
+    its formatted data instead.
+    """
+    key = [term.__class__.__name__]
+    compactor = None
+    for name in term.__slots__:
+        value = getattr(term, name)
+        if value.__class__ is CompactTerm:
+            compactor = value.compactor
+            key.append(value.uri)
+        else:
+            key.append(_raw_value(value))
+    key.append(repr(term.to_dict()) if compactor is None else compactor.key)
+    return tuple(key)
+
+
+class FormattedTerm(Mapping):
+    """
+    The dictionary of a term for the template (see to_dict of the models), only
+    formatted when the template reads it.
+
+    A template block caching its output by the term (see FragmentExtension) gets its
+    key from fragment_key, so that terms whose block is cached are not formatted at all.
+    """
+
+    __slots__ = ("term", "_data")
+
+    def __init__(self, term):
+        self.term = term
+        self._data = None
+
+    def fragment_key(self) -> tuple:
+        return term_key(self.term)
+
+    def _formatted(self) -> dict:
+        if self._data is None:
+            self._data = self.term.to_dict()
+        return self._data
+
+    def __getitem__(self, key):
+        return self._formatted()[key]
+
+    def items(self):
+        return self._formatted().items()
+
+    def __iter__(self):
+        return iter(self._formatted())
+
+    def __len__(self) -> int:
+        return len(self._formatted())
+
+
+class FormattedTerms:
+    """
+    Terms formatted for the template one at a time, as the template reads them (see
+    FormattedTerm), so that the dictionaries of all the terms are never held in memory at once.
+
+    Like a list, it has a length and is false when there are no terms (e.g. for
+    {% if concepts %}), but each iteration formats the terms again.
+    """
+
+    __slots__ = ("terms",)
+
+    def __init__(self, terms: Collection):
+        self.terms = terms
+
+    def __iter__(self) -> Iterator[FormattedTerm]:
+        return map(FormattedTerm, self.terms)
+
+    def __len__(self) -> int:
+        return len(self.terms)
 
 
 def format_classes(classes):
     """
     Format the classes to be used in the template.
     """
-    return [class_.to_dict() for class_ in classes.values()]
+    return FormattedTerms(classes.values())
 
 
 def format_enumerations(enumerations: List[Enumeration]):
     """
     Format the enumerations to be used in the template.
     """
-    return [enumeration.to_dict() for enumeration in enumerations]
+    return FormattedTerms(enumerations)
 
 
 def format_properties(properties):
@@ -37,42 +130,7 @@ def format_properties(properties):
     Format the properties to be used in the template.
     """
 
-    return [property.to_dict() for property in properties.values()]
-
-def format_uri_value(value, qname=None, current_ontology_url=None):
-    if current_ontology_url and value.startswith(current_ontology_url):
-        value_uri = value.replace(current_ontology_url, "#")
-    else:
-        value_uri = value
-    if qname:
-        value_string = qname(value)
-    else:
-        value_string = value
-    return '<a href="' + value_uri + '">' + value_string + "</a>"
-
-
-def format_value(item, qname=None, current_ontology_url=None):
-    """
-    Format the value to be used in the template.
-    """
-    # FIXME: the following section is a hack to have a working example.
-    # This should be done differently and follow the Respec syntax for URLs.
-    
-    if item.get("type") == "uri":
-        return format_uri_value(item.get("value", ""), qname=qname, current_ontology_url=current_ontology_url)
-    elif item.get("type") == "literal":
-        return item["value"]
-    elif item.get("type") == None:
-        # Display a warning message
-        print("Warning: missing value encountered.", file=sys.stderr)
-        return ""
-    else:  # FIXME: handle other types
-        # Display a warning message
-        print(
-            f'Warning: unknown type {item.get("type")} for value {item.get("value")}',
-            file=sys.stderr
-        )
-        return item["value"]
+    return FormattedTerms(properties.values())
 
 
 def extract_fragment_identifier(uri_reference: str, separator="#"):
@@ -95,150 +153,109 @@ def extract_fragment_identifier(uri_reference: str, separator="#"):
     return ""
 
 
-def extract_properties(rdf_properties, qname, current_ontology_url=None):
+def row_sort_key(variables: Sequence[str]):
     """
-    Extract the properties from the RDF data.
+    Get a key ordering result rows by the values of the variables, in order, whatever
+    order the query engine returned them in. Blank node labels change from one parse to
+    the next, so they do not order rows.
     """
-    properties = dict()
-    for property in rdf_properties:
-        label = property.get("propertyLabel", "")["value"]
-        if label not in properties:
-            properties[label] = Property()
-
-        current_property = properties[label]
-        current_property.label = label
-        current_property.definition = format_value(
-            property.get("propertyDefinition", {}),
-            qname=qname,
-            current_ontology_url=current_ontology_url,
-        )
-        current_property.fragment_identifier = extract_fragment_identifier(  # TODO: refactor this to use the separator from the sparql config
-            property.get("property", {}).get("value", "")
-        )
-        current_property.property = format_value(
-            property.get("property", {}),
-            qname=qname,
-            current_ontology_url=current_ontology_url,
-        )
-        current_property.add_domain(
-            format_value(
-                property.get("domain", {}),
-                qname=qname,
-                current_ontology_url=current_ontology_url,
-            )
-        )
-        current_property.add_range(
-            format_value(
-                property.get("range", {}),
-                qname=qname,
-                current_ontology_url=current_ontology_url,
-            )
+
+    def key(row: dict) -> tuple:
+        return tuple(
+            "" if value is None or isinstance(value, BNode) else str(value)
+            for value in map(row.get, variables)
         )
-        properties[label] = current_property
-    return properties
+
+    return key
 
 
-def extract_classes(rdf_classes, qname, current_ontology_url=None):
+def extract_terms(rdf_concepts, rdf_enumerations, compactor: UriCompactor):
     """
-    Extract the classes from the RDF data.
+    Extract the classes, properties and enumerations from the RDF data in a single
+    pass over each result. Terms shared by a class and a property are formatted once
+    per row, and each distinct enumeration group is only built once.
+
+    The rows are first sorted (see row_sort_key), so that the order of the terms and
+    the values kept for terms with duplicate labels do not depend on the query engine
+    or on hash randomization: the same results always give the same documentation.
+
+    Returns:
+        The classes, properties and enumerations, keyed by label.
     """
+    # URIs are interned by the compactor and only formatted when rendered.
+    format_term = compactor.term
+    fragment_identifiers = dict()
+
+    def fragment_identifier(term):
+        uri = str(term or "")
+        value = fragment_identifiers.get(uri)
+        if value is None:
+            # TODO: refactor this to use the separator from the sparql config
+            value = fragment_identifiers[uri] = extract_fragment_identifier(uri)
+        return value
+
     classes = dict()
-    for rdf_class in rdf_classes:
-        label = rdf_class.get("classLabel", {}).get("value", "")
-        if label not in classes:
-            classes[label] = Class()
-
-        current_class = classes[label]
-        current_class.label = label
-        current_class.definition = format_value(
-            rdf_class.get("classDefinition", {}),
-            qname=qname,
-            current_ontology_url=current_ontology_url,
-        )
-        current_class.fragment_identifier = extract_fragment_identifier(  # TODO: refactor this to use the separator from the sparql config
-            rdf_class.get("domain", {}).get("value", "")
-        )
-        current_class.term = format_value(
-            rdf_class.get("domain", {}),
-            qname=qname,
-            current_ontology_url=current_ontology_url,
-        )
-        current_class.add_property(
-            format_value(
-                rdf_class.get("property", {}),
-                qname=qname,
-                current_ontology_url=current_ontology_url,
-            )
-        )
+    properties = dict()
+    for row in sorted(rdf_concepts, key=row_sort_key(CONCEPTS_VARIABLES)):
+        domain = row.get("domain")
+        property = row.get("property")
+        domain_term = format_term(domain)
+        property_term = format_term(property)
 
-        classes[label] = current_class
-    return classes
+        class_label = str(row.get("classLabel", ""))
+        current_class = classes.get(class_label)
+        if current_class is None:
+            current_class = classes[class_label] = Class(label=class_label)
+        current_class.definition = format_term(row.get("classDefinition"))
+        current_class.fragment_identifier = fragment_identifier(domain)
+        current_class.term = domain_term
+        current_class.add_property(property_term)
 
+        property_label = str(row["propertyLabel"])
+        current_property = properties.get(property_label)
+        if current_property is None:
+            current_property = properties[property_label] = Property(label=property_label)
+        current_property.definition = format_term(row.get("propertyDefinition"))
+        current_property.fragment_identifier = fragment_identifier(property)
+        current_property.property = property_term
+        current_property.add_domain(domain_term)
+        current_property.add_range(format_term(row.get("range")))
 
-def extract_enumerations(rdf_enumerations, qname, current_ontology_url=None):
-    """
-    Extract the enumerations from the RDF data.
-    """
     enumerations = dict()
-    for rdf_enumeration in rdf_enumerations:
-        label = rdf_enumeration.get("enumerationLabel", {}).get("value", "")
-        if label not in enumerations:
-            enumerations[label] = Enumeration()
-
-        current_enumeration = enumerations[label]
-        current_enumeration.label = label
-        current_enumeration.definition = format_value(
-            rdf_enumeration.get("enumerationDefinition", {}),
-            qname=qname,
-            current_ontology_url=current_ontology_url,
-        )
-        current_enumeration.fragment_identifier = extract_fragment_identifier(  # TODO: refactor this to use the separator from the sparql config
-            rdf_enumeration.get("enumerationValue", {}).get("value", "")
-        )
-        current_enumeration.term = format_value(
-            rdf_enumeration.get("enumerationValue", {}),
-            qname=qname,
-            current_ontology_url=current_ontology_url,
-        )
-        current_enumeration.add_property(
-            format_value(
-                rdf_enumeration.get("property", {}),
-                qname=qname,
-                current_ontology_url=current_ontology_url,
+    enumeration_groups = dict()
+    for row in sorted(rdf_enumerations, key=row_sort_key(ENUMERATIONS_VARIABLES)):
+        label = str(row.get("enumerationLabel", ""))
+        current_enumeration = enumerations.get(label)
+        if current_enumeration is None:
+            current_enumeration = enumerations[label] = Enumeration(label=label)
+        value = row.get("enumerationValue")
+        current_enumeration.definition = format_term(row.get("enumerationDefinition"))
+        current_enumeration.fragment_identifier = fragment_identifier(value)
+        current_enumeration.term = format_term(value)
+        current_enumeration.add_property(format_term(row.get("property")))
+
+        group = row.get("group")
+        group_key = (group, row.get("groupLabel"), row.get("groupDefinition"))
+        enumeration_group = enumeration_groups.get(group_key)
+        if enumeration_group is None:
+            enumeration_group = enumeration_groups[group_key] = EnumerationGroup(
+                label=format_term(row.get("groupLabel")),
+                term=format_term(group),
+                fragment_identifier=fragment_identifier(group),
+                definition=format_term(row.get("groupDefinition")),
             )
-        )
-        group_label = format_value(
-            rdf_enumeration.get("groupLabel", {}),
-            qname=qname,
-            current_ontology_url=current_ontology_url,
-        )
-        group_term = format_value(
-            rdf_enumeration.get("group", {}),
-            qname=qname,
-            current_ontology_url=current_ontology_url,
-        )
-        group_fragment_identifier = extract_fragment_identifier(  # TODO: refactor this to use the separator from the sparql config
-            rdf_enumeration.get("group", {}).get("value", "")                                         
-        )
-        group_definition = format_value(
-            rdf_enumeration.get("groupDefinition", {}),
-            qname=qname,
-            current_ontology_url=current_ontology_url,
-        )
-        enumeration_group = EnumerationGroup(label=group_label, term=group_term, fragment_identifier=group_fragment_identifier, definition=group_definition)
         current_enumeration.add_enumeration_group(enumeration_group)
 
-        enumerations[label] = current_enumeration
-        
-    return enumerations
+    return classes, properties, enumerations
 
 
-def group_format_enumerations(enumerations: Dict[str, Enumeration]):
+def group_format_enumerations(enumerations: Dict[str, Enumeration], groups=None):
     """
     Group the enumerations by the group term.
 
     Args:
         enumerations: A dictionary of enumerations.
+        groups: Only keep the groups with these terms, if given.
 
     Returns:
         A dictionary of grouped enumerations.
@@ -247,15 +264,17 @@ def group_format_enumerations(enumerations: Dict[str, Enumeration]):
     {
         "term": str,
         "label": str,
-        "enumerations": List[Dict[str, str]]
+        "enumerations": FormattedTerms (the sorted enumerations, formatted as they are iterated)
     }
     """
     grouped_enumerations = dict()
     for _, enumeration in enumerations.items():
         for enumeration_group in enumeration.enumeration_group:
+            if groups is not None and enumeration_group.term not in groups:
+                continue
             if enumeration_group.term not in grouped_enumerations:
                 grouped_enumerations[enumeration_group.term] = {
-                    "term": enumeration_group.term,
+                    "term": str(enumeration_group.term),
                     "label": enumeration_group.label,
                     "FragmentIdentifier": enumeration_group.fragment_identifier,
                     "enumerations": [],
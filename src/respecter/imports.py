@@ -0,0 +1,229 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+import os
+import sys
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import rdflib
+import yaml
+from rdflib.namespace import OWL, RDF
+
+from respecter.cache import GraphCache, dump_graph, load_graph
+from respecter.ingest import PredicateFilter, parse_graph
+from respecter.parallel import fork_context
+
+
+def _normalize_iri(iri: str) -> str:
+    # Imports of the same ontology are written with or without the trailing delimiter
+    return str(iri).rstrip("#/")
+
+
+class ImportCatalog:
+    """
+    Maps the IRIs of imported ontologies to local files, so that owl:imports are resolved
+    offline (see resolve_imports). IRIs match with or without a trailing "#" or "/".
+
+    Args:
+        entries: The local file of each IRI.
+        path: The catalog file the entries were read from, if any.
+    """
+
+    def __init__(self, entries: Dict[str, Path], path: Optional[Path] = None):
+        self.entries = {_normalize_iri(iri): Path(file) for iri, file in entries.items()}
+        self.path = None if path is None else Path(path)
+
+    @classmethod
+    def from_path(cls, catalog_path: Path) -> "ImportCatalog":
+        """
+        Read a catalog file, with the paths relative to the catalog file.
+
+        The catalog is either a YAML file mapping each IRI to a path:
+
+            imports:
+              https://schema.org/: vocabularies/schemaorg.ttl
+              http://www.w3.org/2004/02/skos/core: vocabularies/skos.rdf
+
+        or an XML catalog as written by Protégé (catalog-v001.xml), with a
+        <uri name="IRI" uri="path"/> element per import.
+
+        Raises:
+            ValueError: If the catalog cannot be read, or an entry does not map an IRI to a path.
+        """
+        catalog_path = Path(catalog_path)
+        if catalog_path.suffix.lower() in (".yaml", ".yml"):
+            with open(catalog_path, "r") as f:
+                catalog = yaml.safe_load(f) or {}
+            entries = catalog.get("imports") if isinstance(catalog, dict) else None
+            if not isinstance(entries, dict):
+                raise ValueError(f"{catalog_path} does not map the imported IRIs to files under an imports key")
+        else:
+            try:
+                root = ElementTree.parse(catalog_path).getroot()
+            except ElementTree.ParseError as e:
+                raise ValueError(f"Invalid XML catalog {catalog_path}: {e}")
+            entries = {
+                element.get("name"): element.get("uri")
+                for element in root.iter()
+                if element.tag.rpartition("}")[2] == "uri" and element.get("name") and element.get("uri")
+            }
+        for iri, path in entries.items():
+            if not isinstance(iri, str) or not isinstance(path, str):
+                raise ValueError(f"{catalog_path} maps {iri!r} to {path!r}, expected an IRI and a file path")
+        return cls({iri: catalog_path.parent / path for iri, path in entries.items()}, path=catalog_path)
+
+    def resolve(self, iri: str) -> Optional[Path]:
+        """
+        Get the local file of an imported IRI, or None if the catalog does not list it.
+        """
+        return self.entries.get(_normalize_iri(iri))
+
+    @property
+    def paths(self) -> List[Path]:
+        """
+        The catalog file, if any, and the files it lists.
+        """
+        return ([self.path] if self.path is not None else []) + sorted(set(self.entries.values()))
+
+    def digest(self) -> str:
+        """
+        Compute a digest of the catalog entries and of the content of their files,
+        which changes whenever an import may resolve to other triples.
+        """
+        digest = hashlib.sha256()
+        for iri, path in sorted(self.entries.items()):
+            digest.update(iri.encode("utf-8") + b"\0" + path.suffix.encode("utf-8") + b"\0")
+            try:
+                digest.update(path.read_bytes())
+            except FileNotFoundError:
+                digest.update(b"\0missing")
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+
+def import_filter(predicate_filter: Optional[PredicateFilter]) -> Optional[PredicateFilter]:
+    """
+    Extend a predicate filter to keep the owl:imports triples, which are followed to resolve the imports.
+    """
+    if predicate_filter is None:
+        return None
+    return PredicateFilter(predicate_filter.predicates | {OWL.imports}, predicate_filter.namespaces)
+
+
+def _parse_import(path: Path, predicate_filter: Optional[PredicateFilter]) -> bytes:
+    # Graphs are sent back to the parent process in the binary graph cache format
+    return dump_graph(parse_graph(path, predicate_filter))
+
+
+def parse_imports(
+    paths: Sequence[Path],
+    cache: Optional[GraphCache] = None,
+    predicate_filter: Optional[PredicateFilter] = None,
+    workers: Optional[int] = None,
+) -> List[rdflib.Graph]:
+    """
+    Parse the files of imported ontologies, going through the graph cache if one is given.
+
+    The files that are not cached yet are parsed in a pool of forked worker processes,
+    and stored in the cache by the current process, so that an import shared by
+    several ontologies is only parsed once.
+    """
+    graphs: Dict[Path, rdflib.Graph] = {}
+    missing = []
+    for path in paths:
+        graph = None if cache is None else cache.get(cache.key(path, predicate_filter))
+        if graph is None:
+            missing.append(path)
+        else:
+            graphs[path] = graph
+
+    context = fork_context()
+    if workers == 1 or len(missing) <= 1 or context is None:
+        for path in missing:
+            graph = graphs[path] = parse_graph(path, predicate_filter)
+            if cache is not None:
+                cache.put(cache.key(path, predicate_filter), graph)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(len(missing), workers or os.cpu_count() or 1),
+            mp_context=context,
+        ) as pool:
+            for path, data in zip(missing, pool.map(_parse_import, missing, [predicate_filter] * len(missing))):
+                graphs[path] = load_graph(data)
+                if cache is not None:
+                    cache.write(cache.key(path, predicate_filter), data)
+    return [graphs[path] for path in paths]
+
+
+def _merge_import(graph: rdflib.Graph, imported: rdflib.Graph):
+    # The metadata of the imported ontologies is left out, so that the ontology
+    # metadata query only finds the documented ontology.
+    ontologies = set(imported.subjects(RDF.type, OWL.Ontology))
+    graph.addN((s, p, o, graph) for s, p, o in imported if s not in ontologies)
+    for prefix, namespace in imported.namespaces():
+        graph.bind(prefix, namespace, override=False)
+
+
+def resolve_imports(
+    graph: rdflib.Graph,
+    catalog: ImportCatalog,
+    cache: Optional[GraphCache] = None,
+    predicate_filter: Optional[PredicateFilter] = None,
+    workers: Optional[int] = None,
+) -> List[str]:
+    """
+    Merge the owl:imports closure of an ontology graph into it, with the imported ontologies
+    read from the local files of the catalog rather than from the web.
+
+    The imports are followed level by level, the files of each level being parsed
+    concurrently (see parse_imports). Imports that are not in the catalog, or whose
+    file does not exist, are skipped with a warning.
+
+    Args:
+        predicate_filter: Only merge the matching triples of the imported ontologies
+            (see import_filter to keep following their imports).
+
+    Returns:
+        The IRIs of the merged imports.
+    """
+    seen = {_normalize_iri(iri) for iri in graph.subjects(RDF.type, OWL.Ontology)}
+    pending = list(graph.objects(None, OWL.imports))
+    merged = []
+    while pending:
+        paths: Dict[Path, str] = {}
+        for iri in pending:
+            if _normalize_iri(iri) in seen:
+                continue
+            seen.add(_normalize_iri(iri))
+            path = catalog.resolve(iri)
+            if path is None:
+                print(f"Warning: import {iri} is not in the catalog, skipped.", file=sys.stderr)
+            elif not path.is_file():
+                print(f"Warning: file {path} of import {iri} does not exist, skipped.", file=sys.stderr)
+            elif path not in paths:
+                paths[path] = str(iri)
+
+        pending = []
+        for (path, iri), imported in zip(
+            paths.items(), parse_imports(list(paths), cache, predicate_filter, workers)
+        ):
+            pending.extend(imported.objects(None, OWL.imports))
+            _merge_import(graph, imported)
+            merged.append(iri)
+    return merged
@@ -0,0 +1,179 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from importlib import metadata, resources
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, TextIO
+
+import rdflib
+
+from respecter.cache import DiskCache, file_digest
+from respecter.imports import ImportCatalog
+from respecter.sparql import SparqlConfig
+from respecter.templates import DEFAULT_TEMPLATE
+
+try:
+    RESPECTER_VERSION = metadata.version("respecter")
+except metadata.PackageNotFoundError:
+    RESPECTER_VERSION = "unknown"
+
+
+def _digest_tree(digest, root):
+    # Works on the Traversable of the bundled templates as well as on paths.
+    for entry in sorted(root.iterdir(), key=lambda entry: entry.name):
+        if entry.is_dir():
+            digest.update(b"\0dir\0" + entry.name.encode("utf-8"))
+            _digest_tree(digest, entry)
+        elif entry.is_file():
+            digest.update(b"\0file\0" + entry.name.encode("utf-8") + b"\0")
+            digest.update(entry.read_bytes())
+
+
+def template_digest(template_dirs: Optional[Sequence[Path]] = None) -> str:
+    """
+    Compute a digest of the templates available to render the documentation:
+    the files of the template directories, followed by the bundled templates.
+    """
+    digest = hashlib.sha256()
+    for template_dir in template_dirs or ():
+        _digest_tree(digest, Path(template_dir))
+    _digest_tree(digest, resources.files("respecter") / "data")
+    return digest.hexdigest()
+
+
+def output_key(
+    ontology_path: Path,
+    config: SparqlConfig,
+    template_name: str = DEFAULT_TEMPLATE,
+    template_dirs: Optional[Sequence[Path]] = None,
+    output_format: str = "html",
+    catalog: Optional[ImportCatalog] = None,
+) -> str:
+    """
+    Get the key of the documentation of an ontology in an output format, which changes with
+    the content of the ontology file, the configuration, the templates and the versions of
+    respecter and rdflib, and with the files of the import catalog if one is given.
+
+    The query engine and the triple filter are not part of the key, as they give the same output.
+    """
+    return file_digest(
+        ontology_path,
+        config.dump(),
+        template_name,
+        output_format,
+        template_digest(template_dirs),
+        RESPECTER_VERSION,
+        rdflib.__version__,
+        *([] if catalog is None else ["imports", catalog.digest()]),
+    )
+
+
+class _Tee:
+    """
+    Text sink writing each chunk to several streams.
+    """
+
+    __slots__ = ("streams",)
+
+    def __init__(self, *streams: TextIO):
+        self.streams = streams
+
+    def write(self, text: str) -> int:
+        for stream in self.streams:
+            stream.write(text)
+        return len(text)
+
+
+class OutputCache(DiskCache):
+    """
+    On-disk cache of rendered documentations, keyed by output_key.
+
+    Args:
+        directory: The root directory of the caches. The entries are stored in its outputs
+            subdirectory, under default_cache_dir() by default.
+        max_size: The maximum total size of the cached documentations, in bytes.
+    """
+
+    suffix = ".out"
+    subdirectory = "outputs"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a rendered documentation from the cache, or None if it is not cached.
+        """
+        data = self.read(key)
+        return None if data is None else data.decode("utf-8")
+
+    def put(self, key: str, text: str):
+        """
+        Store a rendered documentation in the cache and evict old entries if needed.
+        """
+        self.write(key, text.encode("utf-8"))
+
+    def put_file(self, key: str, path: Path):
+        """
+        Store a documentation written to a file in the cache and evict old entries if needed.
+        """
+        with self.writer(key) as entry, open(path, "rb") as f:
+            shutil.copyfileobj(f, entry)
+
+    @contextmanager
+    def tee(self, key: str, stream: TextIO) -> Iterator[TextIO]:
+        """
+        Get a sink writing a documentation to the stream (e.g. stdout) and storing it in
+        the cache as it is rendered, without holding the whole documentation in memory.
+        The entry is only stored once the whole documentation was written.
+        """
+        with self.writer(key) as entry, io.TextIOWrapper(entry, encoding="utf-8") as text:
+            yield _Tee(stream, text)
+
+    def restore(self, key: str, output: Optional[Path] = None) -> bool:
+        """
+        Write the cached documentation of the key to the output file, or to stdout.
+        An output file that is already up to date is left untouched.
+
+        Returns:
+            Whether the documentation was cached.
+        """
+        text = self.get(key)
+        if text is None:
+            return False
+        if output is None:
+            sys.stdout.write(text)
+            return True
+
+        output = Path(output)
+        try:
+            if output.read_text() == text:
+                return True
+        except (FileNotFoundError, UnicodeDecodeError):
+            pass
+        output.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=output.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, output)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        return True
@@ -0,0 +1,133 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import FrozenSet, Iterable, Optional, Set, Tuple
+
+import rdflib
+from rdflib.paths import Path as PropertyPath
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.parserutils import CompValue
+from rdflib.plugins.stores.memory import Memory
+from rdflib.term import URIRef
+
+SHACL = "http://www.w3.org/ns/shacl#"
+
+
+def _path_predicates(path: PropertyPath) -> Iterable[URIRef]:
+    # Sequence, alternative, inverse, negated and repeated paths all nest their
+    # predicates in their attributes.
+    for value in vars(path).values():
+        for item in value if isinstance(value, (list, tuple)) else (value,):
+            if isinstance(item, URIRef):
+                yield item
+            elif isinstance(item, PropertyPath):
+                yield from _path_predicates(item)
+
+
+def _algebra_predicates(node, predicates: Set[URIRef]):
+    if isinstance(node, CompValue):
+        if node.name == "BGP":
+            for _, predicate, _ in node.triples:
+                if isinstance(predicate, URIRef):
+                    predicates.add(predicate)
+                elif isinstance(predicate, PropertyPath):
+                    predicates.update(_path_predicates(predicate))
+        for value in node.values():
+            _algebra_predicates(value, predicates)
+    elif isinstance(node, (list, tuple)):
+        for value in node:
+            _algebra_predicates(value, predicates)
+
+
+def query_predicates(query: str) -> Set[URIRef]:
+    """
+    Get the predicates of the triple patterns and property paths of a SPARQL query.
+    Patterns with a variable predicate are ignored.
+    """
+    predicates = set()
+    _algebra_predicates(prepareQuery(query).algebra, predicates)
+    return predicates
+
+
+@dataclass(frozen=True)
+class PredicateFilter:
+    """
+    The predicates of the triples kept when parsing an ontology.
+
+    Attributes:
+        predicates: The predicates kept.
+        namespaces: The namespaces whose predicates are all kept.
+    """
+
+    predicates: FrozenSet[URIRef]
+    namespaces: Tuple[str, ...] = (SHACL,)
+
+    @classmethod
+    def from_queries(cls, queries: Iterable[str], namespaces: Tuple[str, ...] = (SHACL,)):
+        """
+        Keep the predicates used by the queries, along with the given namespaces.
+        """
+        predicates = set()
+        for query in queries:
+            predicates |= query_predicates(query)
+        return cls(frozenset(predicates), tuple(namespaces))
+
+    def __contains__(self, predicate) -> bool:
+        # Identifier.startswith does not accept a tuple of prefixes
+        return predicate in self.predicates or str.startswith(predicate, self.namespaces)
+
+    def key(self) -> str:
+        """
+        Get a digest of the filter, which changes whenever the kept predicates change.
+        """
+        digest = hashlib.sha256()
+        for value in sorted(map(str, self.predicates)) + [""] + list(self.namespaces):
+            digest.update(value.encode("utf-8") + b"\0")
+        return digest.hexdigest()
+
+
+class FilteredMemory(Memory):
+    """
+    In-memory store dropping the triples whose predicate is not in the filter as they are added.
+
+    Args:
+        predicate_filter: The predicates of the triples kept.
+    """
+
+    def __init__(self, predicate_filter: PredicateFilter, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.predicate_filter = predicate_filter
+        self.dropped = 0
+
+    def add(self, triple, context, quoted=False):
+        if triple[1] in self.predicate_filter:
+            super().add(triple, context, quoted)
+        else:
+            self.dropped += 1
+
+
+def parse_graph(ontology_path: Path, predicate_filter: Optional[PredicateFilter] = None) -> rdflib.Graph:
+    """
+    Parse an RDF file into a graph, keeping only the triples matching the predicate filter if one is given.
+    """
+    if predicate_filter is None:
+        graph = rdflib.Graph()
+    else:
+        graph = rdflib.Graph(store=FilteredMemory(predicate_filter))
+    graph.parse(ontology_path)
+    return graph
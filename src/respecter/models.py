@@ -1,6 +1,6 @@
-# respecter
-# Copyright 2022 - Swiss Data Science Center (SDSC)
-# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
 # Eidgenössische Technische Hochschule Zürich (ETHZ).# 
 # Licensed under the Apache License, Version 2.0 (the "License");
 # you may not use this file except in compliance with the License.
@@ -14,9 +14,40 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Collection, Union
 
+if TYPE_CHECKING:
+    from respecter.compaction import CompactTerm
 
-@dataclass
+# Terms extracted from the query results: URIs are interned as CompactTerm and only
+# rendered when converted to a string, other values are strings (see UriCompactor.term).
+Term = Union["CompactTerm", str]
+
+# Most terms have a few domains, ranges or properties: they are kept in a tuple,
+# which takes a fraction of the memory of a dict, until they get that many.
+MAX_TUPLE_MEMBERS = 8
+
+
+def add_member(members: Collection, member) -> Collection:
+    """
+    Add a member to a collection of distinct members, keeping the order they are added in.
+
+    Returns:
+        The collection with the member, which is a tuple for small collections
+        and a dict (with the members as keys) otherwise.
+    """
+    if member in members:
+        return members
+    if isinstance(members, tuple):
+        if len(members) < MAX_TUPLE_MEMBERS:
+            return members + (member,)
+        # Unlike a set, a dict iterates in insertion order, which keeps the output deterministic.
+        members = dict.fromkeys(members)
+    members[member] = None
+    return members
+
+
+@dataclass(slots=True)
 class Ontology:
     """
     Class to store the ontology metadata.
@@ -42,82 +73,83 @@ class Ontology:
         }
 
     def import_from_rdf(self, rdf_ontology):
-        self.title = rdf_ontology.get("title", {}).get("value", "")
-        self.introduction = rdf_ontology.get("description", {}).get("value", "")
-        self.abstract = rdf_ontology.get("abstract", {}).get("value", "")
-        self.publish_date = rdf_ontology.get("modified", {}).get("value", "")
-        self.contributors = (
-            rdf_ontology.get("contributors", {}).get("value", "").split("\n")
+        self.title = str(rdf_ontology.get("title", ""))
+        self.introduction = str(rdf_ontology.get("description", ""))
+        self.abstract = str(rdf_ontology.get("abstract", ""))
+        self.publish_date = str(rdf_ontology.get("modified", ""))
+        # GROUP_CONCAT does not order the values
+        self.contributors = sorted(
+            str(rdf_ontology.get("contributors", "")).split("\n")
         )
-        self.creators = rdf_ontology.get("creators", {}).get("value", "").split("\n")
-        self.download_url = rdf_ontology.get("download_url", {}).get("value", "")
+        self.creators = sorted(str(rdf_ontology.get("creators", "")).split("\n"))
+        self.download_url = str(rdf_ontology.get("download_url", ""))
 
 
-@dataclass
+@dataclass(slots=True)
 class Property:
     """
     Class to store the property metadata.
     """
 
     label: str = ""
-    definition: str = ""
-    property: str = ""
-    domain: set = field(default_factory=set)
+    definition: Term = ""
+    property: Term = ""
+    domain: Collection = ()
     fragment_identifier: str = ""
-    range: set = field(default_factory=set)
+    range: Collection = ()
 
     def add_domain(self, domain):
-        self.domain.add(domain)
+        self.domain = add_member(self.domain, domain)
 
     def add_range(self, range):
-        self.range.add(range)
+        self.range = add_member(self.range, range)
 
     def to_dict(self):
         return {
             "Label": self.label,
             "Definition": self.definition,
             "FragmentIdentifier": self.fragment_identifier,
-            "Property": self.property,
-            "Domain": ", ".join(self.domain),
-            "Range": ", ".join(self.range),
+            "Property": str(self.property),
+            "Domain": ", ".join(map(str, self.domain)),
+            "Range": ", ".join(map(str, self.range)),
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Class:
     """
     Class to store the class metadata.
     """
 
     label: str = ""
-    definition: str = ""
+    definition: Term = ""
     fragment_identifier: str = ""
-    term: str = ""
-    property: set = field(default_factory=set)
+    term: Term = ""
+    property: Collection = ()
 
     def add_property(self, property):
-        self.property.add(property)
+        self.property = add_member(self.property, property)
 
     def to_dict(self):
         return {
             "Label": self.label,
             "Definition": self.definition,
             "FragmentIdentifier": self.fragment_identifier,
-            "Term": self.term,
-            "Property": ", ".join(self.property),
+            "Term": str(self.term),
+            "Property": ", ".join(map(str, self.property)),
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class EnumerationGroup:
     """
     Class to store the enumeration group metadata.
     """
 
-    label: str = ""
-    definition: str = ""
+    label: Term = ""
+    definition: Term = ""
     fragment_identifier: str = ""
-    term: str = ""
+    term: Term = ""
 
     def to_string(self):
         return f"{self.term}"
@@ -127,28 +159,28 @@ class EnumerationGroup:
             "Label": self.label,
             "Definition": self.definition,
             "FragmentIdentifier": self.fragment_identifier,
-            "Term": self.term,
+            "Term": str(self.term),
         }
 
     def __hash__(self) -> int:
         return hash(self.term)  # TODO: Check if this is correct
 
 
-@dataclass
+@dataclass(slots=True)
 class Enumeration:
     """
     Class to store the enumeration instances metadata.
     """
 
     label: str = ""
-    definition: str = ""
-    enumeration_group: set = field(default_factory=set)
+    definition: Term = ""
+    enumeration_group: Collection = ()
     fragment_identifier: str = ""
-    property: set = field(default_factory=set)
-    term: str = ""
+    property: Collection = ()
+    term: Term = ""
 
     def add_property(self, property):
-        self.property.add(property)
+        self.property = add_member(self.property, property)
 
     def add_enumeration_group(self, enumeration_group: EnumerationGroup):
         """
@@ -156,16 +188,16 @@ class Enumeration:
         Parameters:
             group (EnumerationGroup): The group to add to the enumeration.
         """
-        self.enumeration_group.add(enumeration_group)
+        self.enumeration_group = add_member(self.enumeration_group, enumeration_group)
 
     def to_dict(self):
         return {
             "Label": self.label,
             "Definition": self.definition,
             "FragmentIdentifier": self.fragment_identifier,
-            "Term": self.term,
+            "Term": str(self.term),
             "Groups": ", ".join([g.to_string() for g in self.enumeration_group]),
-            "Property": ", ".join(self.property),
+            "Property": ", ".join(map(str, self.property)),
         }
 
     def __lt__(self, other):
@@ -0,0 +1,71 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Choices and defaults of the command line options.
+
+The CLI needs them to declare its commands, so this module only uses the standard
+library: the modules implementing the pipeline (and rdflib or jinja2) are only
+imported by the commands that run it. The implementing modules re-export them.
+"""
+from enum import Enum
+
+DEFAULT_TEMPLATE = "template.html"
+# Maximum number of terms of a page of a multi-page documentation.
+DEFAULT_PAGE_SIZE = 500
+# Number of result rows fetched per request from a SPARQL endpoint.
+DEFAULT_ENDPOINT_PAGE_SIZE = 10000
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+
+
+class QueryEngine(str, Enum):
+    """
+    Engines used to extract the concepts and enumerations from the ontology graph.
+
+    sparql evaluates the queries built by SparqlConfig (reference implementation),
+    native walks the SHACL shapes directly through the graph's triple indexes,
+    planned splits the concepts query into sub-queries joined in Python (see plan_concepts_rows).
+    """
+
+    sparql = "sparql"
+    native = "native"
+    planned = "planned"
+
+
+class GraphStore(str, Enum):
+    """
+    Where the parsed ontology graph is stored.
+
+    memory: rdflib's in-memory store, loaded from the graph cache or parsed on each run.
+    sqlite: an SQLite file with SPO, POS and OSP indexes, built once and then opened read-only.
+    """
+
+    memory = "memory"
+    sqlite = "sqlite"
+
+
+class Split(str, Enum):
+    """
+    How the documentation is split into pages.
+
+    class: a page per class (with the properties of the class) and a page per enumeration group.
+    group: a page per enumeration group, and the classes and properties in pages of page_size terms.
+    size: the classes, properties and enumeration values in pages of page_size terms.
+    """
+
+    class_ = "class"
+    group = "group"
+    size = "size"
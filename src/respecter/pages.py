@@ -0,0 +1,288 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from respecter.compaction import CompactTerm
+from respecter.helpers import format_classes, format_properties, group_format_enumerations
+from respecter.models import Class, Enumeration, EnumerationGroup, Ontology, Property
+from respecter.options import DEFAULT_PAGE_SIZE, Split
+from respecter.parallel import fork_context
+from respecter.profiling import Profiler, profile_phase
+from respecter.templates import get_template
+
+INDEX_PAGE = "index.html"
+INDEX_TEMPLATE = "index.html"
+PAGE_TEMPLATE = "page.html"
+
+
+@dataclass
+class Page:
+    """
+    A page of a multi-page documentation, with the terms it documents.
+    """
+
+    name: str
+    title: str
+    concepts: Dict[str, Class] = field(default_factory=dict)
+    properties: Dict[str, Property] = field(default_factory=dict)
+    enumerations: Dict[str, Enumeration] = field(default_factory=dict)
+    groups: Dict[object, EnumerationGroup] = field(default_factory=dict)
+
+    def terms(self) -> Iterator:
+        """
+        Iterate over the terms documented on the page.
+        """
+        for class_ in self.concepts.values():
+            yield class_.term
+        for property in self.properties.values():
+            yield property.property
+        for enumeration in self.enumerations.values():
+            yield enumeration.term
+        yield from self.groups
+
+    def links(self) -> List[Tuple[str, str]]:
+        """
+        Get the label and link of the classes, properties and enumeration groups of the page.
+        """
+        return [
+            (label, f"{self.name}#{term.fragment_identifier}")
+            for labelled_terms in (
+                self.concepts.items(),
+                self.properties.items(),
+                ((group.label, group) for group in self.groups.values()),
+            )
+            for label, term in labelled_terms
+        ]
+
+
+def _page_name(prefix: str, identifier: str, used: set) -> str:
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "-", identifier).strip("-") or "term"
+    name = f"{prefix}-{slug}.html"
+    count = 1
+    while name in used:
+        count += 1
+        name = f"{prefix}-{slug}-{count}.html"
+    used.add(name)
+    return name
+
+
+def _chunks(items: dict, size: int) -> Iterator[dict]:
+    items = list(items.items())
+    for start in range(0, len(items), size):
+        yield dict(items[start:start + size])
+
+
+def _enumeration_groups(enumerations: Dict[str, Enumeration]):
+    groups = {}
+    for label, enumeration in enumerations.items():
+        for group in enumeration.enumeration_group:
+            groups.setdefault(group.term, (group, {}))[1][label] = enumeration
+    return groups
+
+
+def split_pages(
+    concepts: Dict[str, Class],
+    properties: Dict[str, Property],
+    enumerations: Dict[str, Enumeration],
+    split: Split = Split.size,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> List[Page]:
+    """
+    Split the classes, properties and enumerations into pages.
+
+    Args:
+        split: How the terms are split (see Split).
+        page_size: The maximum number of terms of a page, for the pages that are not
+            split per class or per enumeration group. A group with more values than
+            that still gets a page of its own.
+    """
+    pages = []
+    used = set()
+
+    if split == Split.class_:
+        class_pages = {}
+        for label, class_ in concepts.items():
+            page = Page(
+                name=_page_name("class", class_.fragment_identifier or label, used),
+                title=label,
+                concepts={label: class_},
+            )
+            pages.append(page)
+            class_pages.setdefault(class_.term, page)
+        # Properties are documented with their first domain, the others get pages of their own.
+        remaining = {}
+        for label, property in properties.items():
+            page = next((class_pages[domain] for domain in property.domain if domain in class_pages), None)
+            if page is None:
+                remaining[label] = property
+            else:
+                page.properties[label] = property
+    else:
+        for number, chunk in enumerate(_chunks(concepts, page_size), 1):
+            pages.append(Page(name=f"classes-{number}.html", title=f"Classes ({number})", concepts=chunk))
+        remaining = properties
+    for number, chunk in enumerate(_chunks(remaining, page_size), 1):
+        pages.append(Page(name=f"properties-{number}.html", title=f"Properties ({number})", properties=chunk))
+
+    page = None
+    number = 0
+    for term, (group, members) in _enumeration_groups(enumerations).items():
+        if split != Split.size:
+            page = Page(
+                name=_page_name("group", group.fragment_identifier or str(group.label), used),
+                title=str(group.label),
+            )
+            pages.append(page)
+        elif page is None or len(page.enumerations) + len(members) > page_size:
+            number += 1
+            page = Page(name=f"enumerations-{number}.html", title=f"Enumerations ({number})")
+            pages.append(page)
+        page.groups[term] = group
+        page.enumerations.update(members)
+
+    return pages
+
+
+def page_links(pages: Sequence[Page]) -> Dict[str, str]:
+    """
+    Map the URI of each documented term to the first page documenting it.
+    """
+    links = {}
+    for page in pages:
+        for term in page.terms():
+            if isinstance(term, CompactTerm):
+                links.setdefault(term.uri, page.name)
+    return links
+
+
+def stream_page(
+    ontology: Ontology,
+    page: Page,
+    template_dirs: Optional[Sequence[Path]] = None,
+) -> Iterator[str]:
+    """
+    Render a page of the documentation chunk by chunk, as the template produces it.
+    """
+    template = get_template(PAGE_TEMPLATE, template_dirs)
+    return template.generate(
+        ontology={
+            **ontology.to_dict(),
+            "title": f"{ontology.title}: {page.title}" if ontology.title else page.title,
+            "name": ontology.title,
+        },
+        index=INDEX_PAGE,
+        page=page,
+        concepts=format_classes(page.concepts),
+        properties=format_properties(page.properties),
+        grouped_enumerations=group_format_enumerations(page.enumerations, groups=page.groups),
+    )
+
+
+def stream_index(
+    ontology: Ontology,
+    pages: Sequence[Page],
+    template_dirs: Optional[Sequence[Path]] = None,
+) -> Iterator[str]:
+    """
+    Render the index of the pages chunk by chunk, as the template produces it.
+    """
+    template = get_template(INDEX_TEMPLATE, template_dirs)
+    return template.generate(ontology=ontology.to_dict(), pages=pages)
+
+
+def _write(path: Path, chunks: Iterator[str]) -> Path:
+    with open(path, "w") as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.write("\n")
+    return path
+
+
+# Documentation shared with the worker processes of write_pages.
+_shared_pages = None
+
+
+def _share_pages(*args):
+    global _shared_pages
+    _shared_pages = args
+
+
+def _write_shared_page(index: int) -> Path:
+    output_dir, ontology, pages, template_dirs = _shared_pages
+    page = pages[index]
+    return _write(output_dir / page.name, stream_page(ontology, page, template_dirs))
+
+
+def write_pages(
+    output_dir: Path,
+    ontology: Ontology,
+    pages: Sequence[Page],
+    template_dirs: Optional[Sequence[Path]] = None,
+    workers: Optional[int] = None,
+    profiler: Optional[Profiler] = None,
+) -> List[Path]:
+    """
+    Write the index and the pages of a multi-page documentation to the output directory.
+
+    The URIs of the documented terms are linked to their pages while rendering, so that
+    the links across pages resolve; the previous links of the compactors are restored
+    afterwards, so that the same models can still be rendered as a single page. The
+    pages are rendered in a pool of forked worker processes, which inherit the models
+    without copying them; where fork is not available, or with a single worker, they
+    are rendered in the current process.
+
+    Returns:
+        The paths of the written files, starting with the index.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    links = page_links(pages)
+    compactors = {
+        term.compactor for page in pages for term in page.terms() if isinstance(term, CompactTerm)
+    }
+    previous_links = {compactor: compactor.pages for compactor in compactors}
+    for compactor in compactors:
+        compactor.link_pages(links)
+    try:
+        with profile_phase(profiler, "render") as phase:
+            paths = [_write(output_dir / INDEX_PAGE, stream_index(ontology, pages, template_dirs))]
+            context = fork_context()
+            if workers == 1 or len(pages) <= 1 or context is None:
+                paths.extend(
+                    _write(output_dir / page.name, stream_page(ontology, page, template_dirs))
+                    for page in pages
+                )
+            else:
+                workers = workers or os.cpu_count() or 1
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=context,
+                    initializer=_share_pages,
+                    initargs=(output_dir, ontology, pages, template_dirs),
+                ) as pool:
+                    chunksize = max(1, len(pages) // (workers * 4))
+                    paths.extend(pool.map(_write_shared_page, range(len(pages)), chunksize=chunksize))
+            phase.count(pages=len(paths))
+    finally:
+        for compactor, pages_links in previous_links.items():
+            compactor.link_pages(pages_links)
+    return paths
@@ -0,0 +1,90 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+import rdflib
+
+from respecter.cache import dump_graph, load_graph
+
+# Graph shared with the worker processes of graph_pool.
+_shared_graph: Optional[rdflib.Graph] = None
+
+
+def fork_context():
+    """
+    Get the fork multiprocessing context, or None if the platform does not support it.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def shared_graph() -> rdflib.Graph:
+    """
+    Get the graph shared with the current worker process.
+    """
+    if _shared_graph is None:
+        raise RuntimeError("No graph is shared with this process")
+    return _shared_graph
+
+
+def _share_graph(graph: rdflib.Graph):
+    global _shared_graph
+    _shared_graph = graph
+
+
+def _load_snapshot(snapshot_path: str):
+    _share_graph(load_graph(Path(snapshot_path).read_bytes()))
+
+
+@contextmanager
+def graph_pool(graph: rdflib.Graph, max_workers: Optional[int] = None):
+    """
+    Create a process pool whose workers can read the graph through shared_graph().
+
+    Workers are forked so that they inherit the parsed graph without copying it.
+    Where fork is not available, the graph is written to a snapshot in the binary
+    graph cache format, which each worker loads once on startup.
+    """
+    context = fork_context()
+    if context is not None:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=context,
+            initializer=_share_graph,
+            initargs=(graph,),
+        ) as pool:
+            yield pool
+        return
+
+    fd, snapshot_path = tempfile.mkstemp(suffix=".rspg")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dump_graph(graph))
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_load_snapshot,
+            initargs=(snapshot_path,),
+        ) as pool:
+            yield pool
+    finally:
+        os.unlink(snapshot_path)
@@ -0,0 +1,179 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _cpu_time() -> float:
+    # Includes the terminated child processes, e.g. the workers of --parallel.
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _max_rss() -> int:
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kibibytes on Linux, in bytes on macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+@dataclass
+class PhaseProfile:
+    """
+    Resources used by a phase of the pipeline.
+
+    Attributes:
+        name: The name of the phase.
+        wall_seconds: Elapsed time.
+        cpu_seconds: CPU time of the process and of its terminated child processes.
+        peak_memory: Peak memory traced by tracemalloc during the phase, in bytes.
+        max_rss: Peak resident set size of the process at the end of the phase, in bytes.
+        counts: Number of triples, rows or terms handled by the phase.
+    """
+
+    name: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_memory: int = 0
+    max_rss: int = 0
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def count(self, **counts: int):
+        """
+        Record the number of items handled by the phase, e.g. count(rows=42).
+        """
+        self.counts.update(counts)
+
+
+class Profiler:
+    """
+    Records the wall time, CPU time, peak memory and counts of the pipeline phases.
+
+    Memory is traced with tracemalloc from the first phase on, which slows down
+    the phases being profiled. With capture_stats, each phase is also run under
+    cProfile so that the statistics of the slowest one can be dumped.
+
+    Args:
+        trace_memory: Trace the peak memory of each phase.
+        capture_stats: Run each phase under cProfile.
+    """
+
+    def __init__(self, trace_memory: bool = True, capture_stats: bool = False):
+        self.trace_memory = trace_memory
+        self.capture_stats = capture_stats
+        self.phases: List[PhaseProfile] = []
+        self._stats: Dict[str, cProfile.Profile] = {}
+        self._started_tracing = False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseProfile]:
+        """
+        Profile the code run in the context as the phase name.
+        """
+        profile = PhaseProfile(name)
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+        stats = cProfile.Profile() if self.capture_stats else None
+
+        wall, cpu = time.perf_counter(), _cpu_time()
+        if stats is not None:
+            stats.enable()
+        try:
+            yield profile
+        finally:
+            if stats is not None:
+                stats.disable()
+                self._stats[name] = stats
+            profile.wall_seconds = time.perf_counter() - wall
+            profile.cpu_seconds = _cpu_time() - cpu
+            if self.trace_memory:
+                profile.peak_memory = tracemalloc.get_traced_memory()[1]
+            profile.max_rss = _max_rss()
+            self.phases.append(profile)
+
+    def stop(self):
+        """
+        Stop tracing memory, if it was started by the profiler.
+        """
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def slowest_phase(self) -> Optional[PhaseProfile]:
+        """
+        Get the phase with the longest wall time, if any.
+        """
+        return max(self.phases, key=lambda phase: phase.wall_seconds, default=None)
+
+    def to_dict(self) -> dict:
+        return {
+            "phases": [asdict(phase) for phase in self.phases],
+            "total": {
+                "wall_seconds": sum(phase.wall_seconds for phase in self.phases),
+                "cpu_seconds": sum(phase.cpu_seconds for phase in self.phases),
+                "max_rss": max((phase.max_rss for phase in self.phases), default=0),
+            },
+        }
+
+    def dump(self, path: Path, **metadata):
+        """
+        Write the profile of the phases to a JSON file, along with the given metadata.
+        """
+        with open(path, "w") as f:
+            json.dump({**metadata, **self.to_dict()}, f, indent=2)
+
+    def dump_stats(self, path: Path) -> Optional[str]:
+        """
+        Write the cProfile statistics of the slowest phase, to be read with pstats.
+
+        Returns:
+            The name of the slowest phase, or None if no statistics were captured.
+        """
+        slowest = self.slowest_phase()
+        if slowest is None or slowest.name not in self._stats:
+            return None
+        self._stats[slowest.name].dump_stats(str(path))
+        return slowest.name
+
+
+@contextmanager
+def profile_phase(profiler: Optional[Profiler], name: str) -> Iterator[PhaseProfile]:
+    """
+    Profile a phase with the profiler, if there is one.
+    Without a profiler, the phase is still given a (discarded) PhaseProfile to count items on.
+    """
+    if profiler is None:
+        yield PhaseProfile(name)
+        return
+    with profiler.phase(name) as phase:
+        yield phase
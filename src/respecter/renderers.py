@@ -0,0 +1,238 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, TextIO
+
+from respecter.compaction import CompactTerm
+from respecter.core import write_template
+from respecter.models import Class, Enumeration, Ontology, Property
+from respecter.options import DEFAULT_TEMPLATE
+from respecter.parallel import fork_context
+from respecter.profiling import Profiler, profile_phase
+from respecter.templates import get_template
+
+MARKDOWN_TEMPLATE = "template.md"
+
+# A renderer writes the documentation of the extracted models to a file-like sink.
+Renderer = Callable[..., None]
+
+# The renderers, by format name, and the format of each output file suffix.
+RENDERERS: Dict[str, Renderer] = {}
+FORMAT_SUFFIXES: Dict[str, str] = {}
+
+
+def register_renderer(name: str, *suffixes: str):
+    """
+    Register a renderer under a format name, used for the output files with the given suffixes.
+
+    The renderer is called as renderer(sink, ontology, concepts, properties, enumerations,
+    template_name=..., template_dirs=...) and writes the documentation to the sink.
+    """
+
+    def register(renderer: Renderer) -> Renderer:
+        RENDERERS[name] = renderer
+        for suffix in suffixes:
+            FORMAT_SUFFIXES[suffix] = name
+        return renderer
+
+    return register
+
+
+def output_format(path: Path) -> str:
+    """
+    Get the format of an output file from its suffix.
+
+    Raises:
+        ValueError: If no renderer is registered for the suffix.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix not in FORMAT_SUFFIXES:
+        raise ValueError(
+            f"Unknown output format for {path}, use one of the suffixes {', '.join(sorted(FORMAT_SUFFIXES))}"
+        )
+    return FORMAT_SUFFIXES[suffix]
+
+
+def _uri(term) -> str:
+    return term.uri if isinstance(term, CompactTerm) else ""
+
+
+def _plain(value) -> str:
+    # The URI of a term, rather than the HTML anchor it renders as in the template
+    return value.uri if isinstance(value, CompactTerm) else str(value)
+
+
+def term_catalogue(
+    ontology: Ontology,
+    concepts: Dict[str, Class],
+    properties: Dict[str, Property],
+    enumerations: Dict[str, Enumeration],
+    qnames: Optional[Dict[str, str]] = None,
+) -> dict:
+    """
+    Get the documented terms as plain data, with their URIs instead of the HTML anchors
+    of the template: the ontology metadata, then the classes, properties, enumeration
+    groups and enumeration values, each with its URI, prefixed name, label and definition,
+    and the URIs of the terms it relates to.
+
+    Args:
+        qnames: Filled with the prefixed name of every URI of the catalogue, if given.
+    """
+    qnames = {} if qnames is None else qnames
+
+    def uris(terms: Iterable) -> List[str]:
+        result = []
+        for term in terms:
+            uri = _uri(term)
+            if uri:
+                qnames.setdefault(uri, term.compactor.qname(uri))
+                result.append(uri)
+        return result
+
+    def entry(term, label: str, definition) -> dict:
+        uri = "".join(uris([term]))
+        return {"uri": uri, "qname": qnames.get(uri, ""), "label": _plain(label), "definition": _plain(definition)}
+
+    groups = {}
+    for enumeration in enumerations.values():
+        for group in enumeration.enumeration_group:
+            if (_uri(group.term) or group.label) not in groups:
+                groups[_uri(group.term) or group.label] = entry(group.term, group.label, group.definition)
+    return {
+        "ontology": ontology.to_dict(),
+        "classes": [
+            {**entry(class_.term, class_.label, class_.definition), "properties": uris(class_.property)}
+            for class_ in concepts.values()
+        ],
+        "properties": [
+            {
+                **entry(property.property, property.label, property.definition),
+                "domain": uris(property.domain),
+                "range": uris(property.range),
+            }
+            for property in properties.values()
+        ],
+        "groups": list(groups.values()),
+        "enumerations": [
+            {
+                **entry(enumeration.term, enumeration.label, enumeration.definition),
+                "groups": uris(group.term for group in enumeration.enumeration_group),
+                "properties": uris(enumeration.property),
+            }
+            for enumeration in enumerations.values()
+        ],
+    }
+
+
+@register_renderer("html", ".html", ".htm")
+def render_html(sink: TextIO, *models, template_name: str = DEFAULT_TEMPLATE, template_dirs=None):
+    """
+    Render the ReSpec HTML documentation, with the template looked up in template_dirs first.
+    """
+    write_template(sink, *models, template_name=template_name, template_dirs=template_dirs)
+
+
+@register_renderer("json", ".json")
+def render_json(sink: TextIO, *models, template_name: str = DEFAULT_TEMPLATE, template_dirs=None):
+    """
+    Render the term catalogue (see term_catalogue) as JSON.
+    """
+    json.dump(term_catalogue(*models), sink, indent=2, ensure_ascii=False)
+    sink.write("\n")
+
+
+@register_renderer("markdown", ".md", ".markdown")
+def render_markdown(sink: TextIO, *models, template_name: str = DEFAULT_TEMPLATE, template_dirs=None):
+    """
+    Render the term catalogue as Markdown, with the template.md template looked up in
+    template_dirs first. The template name only applies to the HTML documentation.
+    """
+    qnames = {}
+    catalogue = term_catalogue(*models, qnames=qnames)
+    template = get_template(MARKDOWN_TEMPLATE, template_dirs)
+    for chunk in template.generate(**catalogue, qnames=qnames):
+        sink.write(chunk)
+
+
+def write_output(path: Path, *models, template_name: str = DEFAULT_TEMPLATE, template_dirs=None) -> Path:
+    """
+    Write the documentation to a file, in the format of its suffix (see output_format).
+    """
+    renderer = RENDERERS[output_format(path)]
+    with open(path, "w") as f:
+        renderer(f, *models, template_name=template_name, template_dirs=template_dirs)
+    return path
+
+
+# Documentation shared with the worker processes of write_outputs.
+_shared_outputs = None
+
+
+def _share_outputs(*args):
+    global _shared_outputs
+    _shared_outputs = args
+
+
+def _write_shared_output(path: Path) -> Path:
+    models, template_name, template_dirs = _shared_outputs
+    return write_output(path, *models, template_name=template_name, template_dirs=template_dirs)
+
+
+def write_outputs(
+    outputs: Sequence[Path],
+    ontology: Ontology,
+    concepts: Dict[str, Class],
+    properties: Dict[str, Property],
+    enumerations: Dict[str, Enumeration],
+    template_name: str = DEFAULT_TEMPLATE,
+    template_dirs: Optional[Sequence[Path]] = None,
+    workers: Optional[int] = None,
+    profiler: Optional[Profiler] = None,
+) -> List[Path]:
+    """
+    Write the documentation extracted once to several files, each in the format of its suffix.
+
+    The outputs are rendered in a pool of forked worker processes, which inherit the
+    models without copying them; where fork is not available, or with a single output
+    or worker, they are rendered in the current process.
+
+    Raises:
+        ValueError: If the format of an output is unknown, before anything is written.
+    """
+    for path in outputs:
+        output_format(path)
+    models = (ontology, concepts, properties, enumerations)
+
+    with profile_phase(profiler, "render") as phase:
+        context = fork_context()
+        if workers == 1 or len(outputs) <= 1 or context is None:
+            paths = [
+                write_output(path, *models, template_name=template_name, template_dirs=template_dirs)
+                for path in outputs
+            ]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(len(outputs), workers or os.cpu_count() or 1),
+                mp_context=context,
+                initializer=_share_outputs,
+                initargs=(models, template_name, template_dirs),
+            ) as pool:
+                paths = list(pool.map(_write_shared_output, outputs))
+        phase.count(outputs=len(paths))
+    return paths
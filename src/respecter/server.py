@@ -0,0 +1,267 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+import html
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from respecter.artifacts import dump_models, load_models
+from respecter.build import BuildItem, BuildOptions
+from respecter.cache import open_graph_cache
+from respecter.imports import ImportCatalog
+from respecter.options import DEFAULT_HOST, DEFAULT_PORT
+from respecter.parallel import fork_context
+from respecter.watch import LiveBuild, Snapshot, changed_paths, snapshot
+
+
+@dataclass(frozen=True)
+class RenderedPage:
+    """
+    A rendered documentation page, with the validators sent along with it.
+
+    Attributes:
+        body: The encoded HTML page.
+        etag: The entity tag of the page, a digest of its content.
+        last_modified: The modification time of the newest input of the page, in seconds.
+    """
+
+    body: bytes
+    etag: str
+    last_modified: int
+
+
+class Site:
+    """
+    The documentation page of one ontology, rendered on request and kept in memory.
+
+    The parsed graph and the extracted terms are kept between renders (see LiveBuild),
+    and the page is rendered again, from the stages affected by the change, when the
+    ontology, the config or a template file is modified.
+    """
+
+    def __init__(self, item: BuildItem, options: BuildOptions):
+        self.item = item
+        self.live_build = LiveBuild(
+            item.ontology,
+            item.config,
+            None,
+            template_name=options.template_name,
+            template_dirs=options.template_dirs,
+            cache=open_graph_cache(options.store, options.cache_dir, options.no_cache),
+            engine=options.engine,
+            filter_triples=options.filter_triples,
+            catalog=None if options.catalog is None else ImportCatalog.from_path(options.catalog),
+        )
+        self._lock = threading.Lock()
+        self._state: Optional[Snapshot] = None
+        self._page: Optional[RenderedPage] = None
+
+    def page(self) -> RenderedPage:
+        """
+        Get the rendered page, rendering it first if it is not cached or its inputs changed.
+        Concurrent requests for the same page wait for a single render.
+        """
+        with self._lock:
+            state = snapshot(self.live_build.paths)
+            if self._page is None or state != self._state:
+                changed = None if self._page is None else changed_paths(self._state, state)
+                self.live_build.build(changed)
+                body = self.live_build.text.encode("utf-8")
+                self._page = RenderedPage(
+                    body=body,
+                    etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+                    last_modified=max((mtime // 10**9 for mtime, _ in state.values()), default=0),
+                )
+                self._state = state
+            return self._page
+
+    def dump(self) -> Tuple[dict, Snapshot, RenderedPage]:
+        """
+        Render the page and get what restore needs to serve it from another process:
+        the extracted models, the state of the inputs and the page.
+        """
+        page = self.page()
+        return dump_models(*self.live_build.terms), self._state, page
+
+    def restore(self, models: dict, state: Snapshot, page: RenderedPage):
+        """
+        Serve a page rendered by dump in another process, keeping its terms for the next
+        renders. The graph is parsed (through the graph cache) on the first change that
+        needs the queries to run again.
+        """
+        with self._lock:
+            self.live_build.restore(load_models(models), page.body.decode("utf-8"))
+            self._state = state
+            self._page = page
+
+
+def _dump_site(item: BuildItem, options: BuildOptions):
+    # Runs in the worker processes of DocumentationServer.warm
+    return Site(item, options).dump()
+
+
+def site_name(item: BuildItem) -> str:
+    """
+    Get the URL path of the page of an item: the name of its output file.
+    """
+    return item.output.name
+
+
+class DocumentationServer(ThreadingHTTPServer):
+    """
+    HTTP server rendering the documentation of several ontologies on request.
+
+    Each ontology is served at the name of its output file, e.g. /custodian.html, and the
+    root lists them. The pages are first rendered in worker processes (see warm), then
+    requests are answered in threads from memory, a page being rendered again in the
+    thread requesting it when its inputs change. Pages are sent with an
+    ETag and a Last-Modified header, and conditional requests are answered with
+    304 Not Modified while the page has not changed.
+
+    Args:
+        items: The ontologies to serve.
+        options: The options of the pipeline, as for a build.
+        address: The host and port to listen on.
+
+    Raises:
+        ValueError: If two items have the same output file name.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        items: List[BuildItem],
+        options: BuildOptions = BuildOptions(),
+        address: Tuple[str, int] = (DEFAULT_HOST, DEFAULT_PORT),
+    ):
+        self.options = options
+        self.sites: Dict[str, Site] = {}
+        for item in items:
+            name = site_name(item)
+            if name in self.sites:
+                raise ValueError(f"Two ontologies are served as /{name}")
+            self.sites[name] = Site(item, options)
+        super().__init__(address, DocumentationHandler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def warm(self, workers: Optional[int] = None) -> List[Tuple[str, Exception]]:
+        """
+        Render every page up front.
+
+        Parsing, querying and rendering are CPU-bound, so the pages are rendered in a pool
+        of forked worker processes rather than threads. The extracted terms are sent back
+        with the pages, so that later changes only re-run the affected stages (see
+        Site.restore). Where fork is not available, or with a single page or worker, the
+        pages are rendered in the current process.
+
+        Returns:
+            The names of the pages that failed to render, with their errors.
+        """
+        failures = []
+        context = fork_context()
+        if workers == 1 or len(self.sites) <= 1 or context is None:
+            for name, site in self.sites.items():
+                try:
+                    site.page()
+                except Exception as e:
+                    failures.append((name, e))
+            return failures
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {
+                name: pool.submit(_dump_site, site.item, self.options) for name, site in self.sites.items()
+            }
+            for name, future in futures.items():
+                try:
+                    self.sites[name].restore(*future.result())
+                except Exception as e:
+                    failures.append((name, e))
+        return failures
+
+
+class DocumentationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}", file=sys.stderr)
+
+    def _send(self, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _not_modified(self, page: RenderedPage) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return page.etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                return page.last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].split("#", 1)[0]
+        if path == "/":
+            links = "".join(
+                f'<li><a href="/{html.escape(name)}">{html.escape(str(site.item.ontology))}</a></li>'
+                for name, site in self.server.sites.items()
+            )
+            body = f"<!DOCTYPE html><html><body><ul>{links}</ul></body></html>".encode("utf-8")
+            self._send(200, body, {"Content-Type": "text/html; charset=utf-8"})
+            return
+
+        site = self.server.sites.get(path.lstrip("/"))
+        if site is None:
+            self._send(404, b"Not found", {"Content-Type": "text/plain; charset=utf-8"})
+            return
+        try:
+            page = site.page()
+        except Exception as e:
+            self.log_error("Failed to render %s: %s", path, e)
+            body = f"Failed to render {site.item.ontology}: {type(e).__name__}: {e}".encode("utf-8")
+            self._send(500, body, {"Content-Type": "text/plain; charset=utf-8"})
+            return
+
+        headers = {
+            "ETag": page.etag,
+            "Last-Modified": formatdate(page.last_modified, usegmt=True),
+            # Revalidate on each request, so that a change of the ontology shows up.
+            "Cache-Control": "no-cache",
+        }
+        if self._not_modified(page):
+            self._send(304, headers=headers)
+        else:
+            self._send(200, page.body, {"Content-Type": "text/html; charset=utf-8", **headers})
+
+    do_HEAD = do_GET
@@ -0,0 +1,201 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Native extraction engine walking the SHACL shapes directly through the graph's
+triple indexes, instead of evaluating the queries built by SparqlConfig.
+
+The rows yielded here are the same as the rows returned by query_rows for the
+reference SPARQL queries (SparqlConfig.build_concepts_query and
+build_enumerations_query).
+"""
+from functools import lru_cache
+from itertools import product
+from typing import Dict, Iterator
+
+import rdflib
+from rdflib.namespace import RDF, RDFS, SH, SKOS
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.term import Identifier, URIRef
+
+from respecter.sparql import QUERY_PREFIXES, SparqlConfig
+
+_CONCEPTS_VARIABLES = (
+    "domain",
+    "classLabel",
+    "classDefinition",
+    "property",
+    "propertyLabel",
+    "propertyDefinition",
+    "range",
+    "example",
+)
+_ENUMERATIONS_VARIABLES = (
+    "enumerationValue",
+    "enumerationLabel",
+    "enumerationDefinition",
+    "property",
+    "propertyLabel",
+    "group",
+    "groupLabel",
+    "groupDefinition",
+)
+
+
+@lru_cache(maxsize=None)
+def _query_namespaces() -> Dict[str, URIRef]:
+    # The namespaces of the PREFIX declarations of the queries, as the SPARQL engine reads them
+    prologue = prepareQuery(QUERY_PREFIXES + "ASK {}").prologue
+    return dict(prologue.namespace_manager.namespaces())
+
+
+def resolve_term(value: str) -> URIRef:
+    """
+    Resolve a type or predicate from the config file (e.g. "<http://...>" or "skos:definition").
+
+    CURIEs are expanded with the PREFIX declarations of the SPARQL queries, rather than
+    the prefixes of the graph, so that both engines read the same terms.
+
+    Raises:
+        ValueError: If the prefix is not declared by the queries.
+    """
+    value = value.strip()
+    if value.startswith("<") and value.endswith(">"):
+        return URIRef(value[1:-1])
+    prefix, colon, local_name = value.partition(":")
+    namespace = _query_namespaces().get(prefix)
+    if namespace is None or not colon:
+        raise ValueError(f"Unknown prefix in {value}, use a full IRI (<...>) instead")
+    return URIRef(namespace + local_name)
+
+
+def _row(variables, values) -> Dict[str, Identifier]:
+    return {name: value for name, value in zip(variables, values) if value is not None}
+
+
+def _or_members(graph: rdflib.Graph, property_shape) -> Iterator:
+    """
+    Yield the members of the sh:or lists of a property shape (sh:or/rdf:rest*/rdf:first).
+    """
+    for head in graph.objects(property_shape, SH["or"]):
+        seen = set()
+        node = head
+        while node is not None and node not in seen:
+            seen.add(node)
+            yield from graph.objects(node, RDF.first)
+            node = graph.value(node, RDF.rest)
+
+
+def _coalesce(*terms):
+    return next((term for term in terms if term is not None), None)
+
+
+def concepts_rows(graph: rdflib.Graph, config: SparqlConfig) -> Iterator[Dict]:
+    """
+    Yield the concepts rows (classes and their properties) from the SHACL shapes.
+    """
+    property_type = resolve_term(config.get_type("property"))
+    definition = resolve_term(config.get_predicate("definition"))
+    label = resolve_term(config.get_predicate("label"))
+
+    for nodeshape, property_shape in graph.subject_objects(SH.property):
+        if (property_shape, RDF.type, SH.PropertyShape) not in graph:
+            continue
+        for property in graph.objects(property_shape, SH.path):
+            if (property, RDF.type, property_type) not in graph:
+                continue
+            property_definitions = list(graph.objects(property, definition))
+            property_labels = list(graph.objects(property, label))
+            if not property_definitions or not property_labels:
+                continue
+
+            examples = list(graph.objects(property, SKOS.example)) or [None]
+            datatypes = list(graph.objects(property_shape, SH.datatype)) or [None]
+            class_restrictions = list(graph.objects(property_shape, SH["class"])) or [None]
+            things = [
+                thing
+                for option in _or_members(graph, property_shape)
+                for thing in graph.objects(option)
+            ] or [None]
+            ranges = [
+                _coalesce(thing, class_restriction, datatype)
+                for datatype in datatypes
+                for class_restriction in class_restrictions
+                for thing in things
+            ]
+
+            for domain in list(graph.objects(nodeshape, SH.targetClass)) or [nodeshape]:
+                for row in product(
+                    [domain],
+                    list(graph.objects(domain, label)),
+                    list(graph.objects(domain, definition)),
+                    [property],
+                    property_labels,
+                    property_definitions,
+                    ranges,
+                    examples,
+                ):
+                    yield _row(_CONCEPTS_VARIABLES, row)
+
+
+def enumerations_rows(graph: rdflib.Graph, config: SparqlConfig) -> Iterator[Dict]:
+    """
+    Yield the distinct enumerations rows (enumeration values and their groups) from the SHACL shapes.
+    """
+    enumeration_type = resolve_term(config.get_type("enumeration"))
+    definition = resolve_term(config.get_predicate("definition"))
+    label = resolve_term(config.get_predicate("label"))
+
+    seen = set()
+    for property_shape in graph.subjects(RDF.type, SH.PropertyShape):
+        # Groups restricted directly with sh:class, and through the members of sh:or lists.
+        # NOTE: the reference query reads the enumeration definition from the label
+        # predicate for the sh:or branch; this is reproduced here.
+        branches = (
+            (list(graph.objects(property_shape, SH["class"])), definition),
+            (
+                [
+                    group
+                    for option in _or_members(graph, property_shape)
+                    for group in graph.objects(option, SH["class"])
+                ],
+                label,
+            ),
+        )
+        for property in graph.objects(property_shape, SH.path):
+            property_labels = list(graph.objects(property, label)) or [None]
+            for groups, value_definition in branches:
+                for group in groups:
+                    if (group, RDFS.subClassOf, enumeration_type) not in graph:
+                        continue
+                    group_labels = list(graph.objects(group, label))
+                    group_definitions = list(graph.objects(group, definition))
+                    for value in graph.subjects(RDF.type, group):
+                        value_definitions = list(graph.objects(value, value_definition)) or [None]
+                        value_labels = list(graph.objects(value, label)) or [None]
+                        for row in product(
+                            [value],
+                            value_labels,
+                            value_definitions,
+                            [property],
+                            property_labels,
+                            [group],
+                            group_labels,
+                            group_definitions,
+                        ):
+                            if row in seen:
+                                continue
+                            seen.add(row)
+                            yield _row(_ENUMERATIONS_VARIABLES, row)
@@ -1,7 +1,67 @@
+from __future__ import annotations
+
 from pathlib import Path
 import json
 import yaml
+from collections import defaultdict
 from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Sequence
+
+from respecter import defaults
+
+# rdflib is only imported when terms are handled, so that reading and writing
+# configuration files (e.g. respecter generate-config) stays fast.
+if TYPE_CHECKING:
+    from rdflib.term import Identifier
+
+    from respecter.ingest import PredicateFilter
+
+# Prefixes of the sub-queries of the concepts query plan
+QUERY_PREFIXES = """
+            PREFIX sh: <http://www.w3.org/ns/shacl#>
+            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+            PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
+            PREFIX owl: <http://www.w3.org/2002/07/owl#>
+            PREFIX dct: <http://purl.org/dc/terms/>
+            PREFIX dcat: <https://www.w3.org/TR/vocab-dcat-2/#>
+            PREFIX vann: <http://purl.org/vocab/vann/>
+            prefix schema: <http://schema.org/>
+            prefix sd: <https://w3id.org/okn/o/sd#>
+            prefix bio: <https://bioschemas.org/>
+            prefix spe: <https://openschemas.github.io/spec-container/specifications/>
+            prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+            prefix xsd:  <http://www.w3.org/2001/XMLSchema#>
+            prefix shsh: <http://www.w3.org/ns/shacl-shacl#>
+            prefix dcterms: <http://purl.org/dc/terms/>
+            prefix ex: <https://epfl.ch/example/>
+            prefix md4i: <http://w3id.org/nfdi4ing/metadata4ing#>
+            prefix sdc:  <https://swissdatacustodian.ch/doc/ontology#>
+            prefix dpv:  <https://w3id.org/dpv#>
+"""
+
+# Variables selected by the concepts query
+CONCEPTS_VARIABLES = (
+    "domain",
+    "classLabel",
+    "classDefinition",
+    "property",
+    "propertyLabel",
+    "propertyDefinition",
+    "range",
+    "example",
+)
+
+# Variables selected by the enumerations query
+ENUMERATIONS_VARIABLES = (
+    "enumerationValue",
+    "enumerationLabel",
+    "enumerationDefinition",
+    "property",
+    "propertyLabel",
+    "group",
+    "groupLabel",
+    "groupDefinition",
+)
 
 @dataclass
 class SparqlConfig:
@@ -14,11 +74,13 @@ class SparqlConfig:
     Attributes:
         types (dict): A dictionary of types.
         predicates (dict): A dictionary of predicates.
+        prefixes (dict): A dictionary of namespace prefixes.
     """
 
     types: dict = field(default_factory=dict)
     predicates: dict = field(default_factory=dict)
     ontology: dict = field(default_factory=dict)
+    prefixes: dict = field(default_factory=dict)
 
 
 
@@ -49,6 +111,7 @@ class SparqlConfig:
             types=_yaml_config["type"], 
             predicates=_yaml_config["predicate"],
             ontology=_yaml_config["ontology"],
+            prefixes=_yaml_config.get("prefix") or {},
         )
 
     def dump(self):
@@ -61,6 +124,7 @@ class SparqlConfig:
                 "type": self.types,
                 "predicate": self.predicates,
                 "ontology": self.ontology,
+                "prefix": self.prefixes,
             }
         )
 
@@ -76,6 +140,15 @@ class SparqlConfig:
         """
         return self.ontology.get("separator")
 
+    def get_namespaces(self):
+        """
+        Get the (prefix, namespace) bindings of the prefixes in the config file.
+        """
+        return [
+            (prefix, str(namespace).strip().strip("<>"))
+            for prefix, namespace in self.prefixes.items()
+        ]
+
     def get_type(self, type_name):
         """
         Get the type URI from the config file.
@@ -242,10 +315,88 @@ class SparqlConfig:
 
         return sparql_query
 
+    def build_concepts_subqueries(self) -> Dict[str, str]:
+        """
+        Builds the sub-queries of the concepts query plan (see plan_concepts_rows).
+
+        Returns:
+            Dict[str, str]: The SPARQL query strings for the shapes, property metadata,
+                class metadata and range options, keyed by name.
+        """
+        label = self.get_predicate("label")
+        definition = self.get_predicate("definition")
+        return {
+            "shapes": QUERY_PREFIXES + """
+            SELECT ?nodeshape ?propertyShape ?property
+            WHERE {
+            ?nodeshape sh:property ?propertyShape .
+            ?propertyShape a sh:PropertyShape .
+            ?propertyShape sh:path ?property .
+            }
+            """,
+            "properties": QUERY_PREFIXES + f"""
+            SELECT ?property ?propertyLabel ?propertyDefinition ?example
+            WHERE {{
+            ?property a {self.get_type("property")} .
+            ?property {definition} ?propertyDefinition .
+            ?property {label} ?propertyLabel .
+            OPTIONAL {{?property skos:example ?example}}
+            }}
+            """,
+            "classes": QUERY_PREFIXES + f"""
+            SELECT DISTINCT ?nodeshape ?domain ?classLabel ?classDefinition
+            WHERE {{
+            ?nodeshape sh:property ?propertyShape .
+            OPTIONAL {{?nodeshape sh:targetClass ?domain1 .}}
+            BIND(COALESCE(?domain1, ?nodeshape) AS ?domain)
+            ?domain {label} ?classLabel .
+            ?domain {definition} ?classDefinition .
+            }}
+            """,
+            # The range is the first kind of option found, in the order of the COALESCE
+            # of the concepts query: sh:or members, then sh:class, then sh:datatype.
+            "ranges": QUERY_PREFIXES + """
+            SELECT DISTINCT ?propertyShape ?range ?rank
+            WHERE {
+            {?propertyShape sh:or/rdf:rest*/rdf:first ?option .
+             ?option ?pred ?range .
+             BIND(0 AS ?rank)}
+            UNION
+            {?propertyShape sh:class ?range .
+             BIND(1 AS ?rank)}
+            UNION
+            {?propertyShape sh:datatype ?range .
+             BIND(2 AS ?rank)}
+            }
+            """,
+        }
+
+    def get_predicate_filter(self) -> PredicateFilter:
+        """
+        Get the filter keeping the triples read by the ontology metadata, concepts and
+        enumerations queries (and by the native engine) when parsing an ontology.
+
+        Predicates used as variables (the members of sh:or lists) are covered by
+        keeping the whole SHACL vocabulary.
+        """
+        from respecter.ingest import PredicateFilter
+
+        return PredicateFilter.from_queries(
+            [
+                defaults.QUERY,
+                self.build_concepts_query(),
+                self.build_enumerations_query(),
+                *self.build_concepts_subqueries().values(),
+            ]
+        )
+
 
 def run_query(graph, query):
     """
-    Execute a SPARQL query on a graph and return the results.
+    Execute a SPARQL query on a graph and return the results in the SPARQL JSON format.
+
+    This round-trips through a JSON string and is meant for debugging;
+    use query_rows to get the rows as RDF terms.
     """
     query_result = graph.query(query)
     query_result = query_result.serialize(format="json")
@@ -253,3 +404,150 @@ def run_query(graph, query):
     return query_result
 
 
+def query_rows(graph, query) -> List[Dict[str, Identifier]]:
+    """
+    Execute a SPARQL query on a graph and return the result rows.
+
+    Each row maps the bound variable names to their RDF terms; unbound variables are omitted.
+    """
+    return [row.asdict() for row in graph.query(query)]
+
+
+def term_to_binding(term) -> Dict[str, str]:
+    """
+    Convert an RDF term to a SPARQL JSON result binding.
+    """
+    from rdflib.term import BNode, URIRef
+
+    if isinstance(term, URIRef):
+        return {"type": "uri", "value": str(term)}
+    if isinstance(term, BNode):
+        return {"type": "bnode", "value": str(term)}
+    binding = {"type": "literal", "value": str(term)}
+    if term.language:
+        binding["xml:lang"] = term.language
+    elif term.datatype:
+        binding["datatype"] = str(term.datatype)
+    return binding
+
+
+def binding_to_term(binding: Dict[str, str]) -> Identifier:
+    """
+    Convert a SPARQL JSON result binding to an RDF term.
+    """
+    from rdflib.term import BNode, Literal, URIRef
+
+    if binding["type"] == "uri":
+        return URIRef(binding["value"])
+    if binding["type"] == "bnode":
+        return BNode(binding["value"])
+    # "typed-literal" is used by SPARQL 1.0 endpoints
+    return Literal(
+        binding["value"],
+        lang=binding.get("xml:lang"),
+        datatype=binding.get("datatype"),
+    )
+
+
+def rows_from_json(results: dict) -> List[Dict[str, Identifier]]:
+    """
+    Convert results in the SPARQL JSON results format to result rows.
+    """
+    return [
+        {name: binding_to_term(binding) for name, binding in bindings.items()}
+        for bindings in results["results"]["bindings"]
+    ]
+
+
+def rows_to_json(rows: List[Dict[str, Identifier]]):
+    """
+    Convert result rows to the SPARQL JSON results format (for debugging).
+    """
+    variables = list(dict.fromkeys(name for row in rows for name in row))
+    return {
+        "head": {"vars": variables},
+        "results": {
+            "bindings": [
+                {name: term_to_binding(term) for name, term in row.items()}
+                for row in rows
+            ]
+        },
+    }
+
+
+def hash_join(
+    left: Iterable[Dict],
+    right: Iterable[Dict],
+    variables: Sequence[str],
+    optional: bool = False,
+) -> Iterator[Dict]:
+    """
+    Join two sets of result rows on the given variables.
+
+    The right rows are indexed in a hash table, which each left row is then looked up in.
+
+    Args:
+        left: The rows to join, in the order of the output.
+        right: The rows to join them with.
+        variables: The variables the rows are joined on.
+        optional: Keep the left rows without a match, as a SPARQL OPTIONAL.
+    """
+    index = defaultdict(list)
+    for row in right:
+        index[tuple(row.get(name) for name in variables)].append(row)
+    for row in left:
+        matches = index.get(tuple(row.get(name) for name in variables))
+        if matches:
+            for match in matches:
+                yield {**row, **match}
+        elif optional:
+            yield row
+
+
+def plan_concepts_rows(
+    select: Callable[[str], List[Dict[str, Identifier]]],
+    config: SparqlConfig,
+) -> List[Dict[str, Identifier]]:
+    """
+    Evaluate the concepts query as selective sub-queries joined in Python.
+
+    In the monolithic query, every predicate of every sh:or member of a property
+    shape gives a separate row. Here the ranges of each property shape are
+    deduplicated before being joined with the shapes, so the number of rows grows
+    with the number of distinct ranges. The rows are the distinct rows of the
+    concepts query.
+
+    Args:
+        select: Executes a SPARQL query and returns its result rows, e.g. on a graph with query_rows.
+        config: The configuration the sub-queries are built from.
+
+    Returns:
+        The result rows of the concepts query, without duplicates.
+    """
+    queries = config.build_concepts_subqueries()
+    shapes = select(queries["shapes"])
+    properties = select(queries["properties"])
+    classes = select(queries["classes"])
+
+    # Only keep the ranges of the first kind of option of each property shape.
+    ranges = defaultdict(list)
+    for row in select(queries["ranges"]):
+        ranges[row["propertyShape"]].append(row)
+    ranges = [
+        {"propertyShape": shape, "range": row["range"]}
+        for shape, options in ranges.items()
+        for rank in [min(int(option["rank"]) for option in options)]
+        for row in options
+        if int(row["rank"]) == rank
+    ]
+
+    rows = hash_join(shapes, properties, ["property"])
+    rows = hash_join(rows, classes, ["nodeshape"])
+    rows = hash_join(rows, ranges, ["propertyShape"], optional=True)
+    # Several property shapes on the same sh:path (e.g. with different cardinalities)
+    # give the same row once the shapes are projected out.
+    distinct = dict()
+    for row in rows:
+        row = {name: row[name] for name in CONCEPTS_VARIABLES if name in row}
+        distinct.setdefault(tuple(row.items()), row)
+    return list(distinct.values())
@@ -0,0 +1,351 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sqlite3
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import rdflib
+from rdflib.store import NO_STORE, VALID_STORE, Store
+from rdflib.term import BNode, Identifier, Literal, URIRef
+
+from respecter.ingest import PredicateFilter
+from respecter.options import GraphStore
+
+__all__ = [
+    "BATCH_SIZE",
+    "MMAP_SIZE",
+    "SCHEMA_VERSION",
+    "TERM_CACHE_SIZE",
+    "GraphStore",
+    "SQLiteStore",
+    "build_store",
+    "open_graph",
+]
+
+# Bump when the schema changes, so that older stores are rebuilt.
+SCHEMA_VERSION = 1
+# Size of the memory map of read-only stores: SQLite maps at most this much of the file.
+MMAP_SIZE = 1 << 30  # 1 GiB
+# Triples added while building a store are inserted in batches of this size.
+BATCH_SIZE = 50000
+# Maximum number of term ids and of decoded terms kept in memory, the others are read from SQLite.
+TERM_CACHE_SIZE = 65536
+
+_SCHEMA = """
+CREATE TABLE terms (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    datatype TEXT NOT NULL,
+    language TEXT NOT NULL,
+    UNIQUE (kind, value, datatype, language)
+);
+CREATE TABLE triples (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE TABLE namespaces (prefix TEXT NOT NULL, namespace TEXT NOT NULL);
+"""
+
+# Created once the triples are inserted, which is faster than maintaining them while building.
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);
+CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p);
+"""
+
+
+def _term_key(term: Identifier) -> Tuple[str, str, str, str]:
+    if isinstance(term, Literal):
+        return "L", str(term), str(term.datatype or ""), term.language or ""
+    return ("B" if isinstance(term, BNode) else "U"), str(term), "", ""
+
+
+def _make_term(kind: str, value: str, datatype: str, language: str) -> Identifier:
+    if kind == "L":
+        return Literal(value, lang=language or None, datatype=datatype or None)
+    if kind == "B":
+        return BNode(value)
+    return URIRef(value)
+
+
+class SQLiteStore(Store):
+    """
+    rdflib store keeping the triples of a single graph in an SQLite file.
+
+    Terms are stored once in a table and triples as term ids, indexed in the SPO, POS and
+    OSP orders so that any triple pattern is answered from an index. A store is built by
+    opening it with create=True and adding the triples (e.g. by parsing into a graph), and
+    is then opened read-only and memory-mapped by later runs. Only the terms read by the
+    queries are loaded into memory.
+
+    The ids of the terms are assigned by SQLite, and only the most recently used ids and
+    decoded terms are cached (see TERM_CACHE_SIZE), so that the memory used while building
+    or querying a store does not grow with the number of terms.
+
+    Args:
+        configuration: The path of the SQLite file, opened read-only if given.
+        predicate_filter: Drop the added triples whose predicate is not in the filter.
+    """
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(
+        self,
+        configuration: Optional[str] = None,
+        identifier: Optional[Identifier] = None,
+        predicate_filter: Optional[PredicateFilter] = None,
+    ):
+        self.identifier = identifier
+        self.predicate_filter = predicate_filter
+        self.path: Optional[str] = None
+        self.read_only = True
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        # Ids never change once assigned. Lookups of missing terms raise KeyError, which
+        # lru_cache does not cache, so that a term added later is found.
+        self._find_id = lru_cache(maxsize=TERM_CACHE_SIZE)(self._select_id)
+        self._term = lru_cache(maxsize=TERM_CACHE_SIZE)(self._select_term)
+        self._pending: List[Tuple[int, int, int]] = []
+        self._namespace: Dict[str, URIRef] = {}
+        self._prefix: Dict[URIRef, str] = {}
+        self._length: Optional[int] = None
+        super().__init__(configuration)
+
+    def open(self, configuration: str, create: bool = False) -> Optional[int]:
+        self.path = str(configuration)
+        self.read_only = not create
+        if create:
+            connection = sqlite3.connect(self.path)
+            connection.executescript(_SCHEMA)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+            connection.execute("BEGIN")
+        else:
+            try:
+                connection = self._connect()
+            except sqlite3.Error:
+                return NO_STORE
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                connection.close()
+                return NO_STORE
+            for prefix, namespace in connection.execute("SELECT prefix, namespace FROM namespaces ORDER BY rowid"):
+                self._namespace[prefix] = URIRef(namespace)
+                self._prefix[URIRef(namespace)] = prefix
+        self._connection = connection
+        self._pid = os.getpid()
+        return VALID_STORE
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            Path(self.path).resolve().as_uri() + "?mode=ro",
+            uri=True,
+            check_same_thread=False,
+        )
+        connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        connection.execute("PRAGMA query_only = ON")
+        return connection
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            raise ValueError("The SQLite store is not open")
+        if self._pid != os.getpid():
+            # SQLite connections must not be used across fork: reopen in forked workers.
+            if not self.read_only:
+                raise ValueError("An SQLite store being built cannot be used by another process")
+            self._connection = self._connect()
+            self._pid = os.getpid()
+        return self._connection
+
+    def close(self, commit_pending_transaction: bool = False):
+        """
+        Close the store. A store being built is first completed: the pending triples,
+        the namespace bindings and the indexes are written.
+        """
+        if self._connection is None:
+            return
+        if not self.read_only and self._pid == os.getpid():
+            self._flush()
+            self._connection.executemany(
+                "INSERT INTO namespaces (prefix, namespace) VALUES (?, ?)",
+                [(prefix, str(namespace)) for prefix, namespace in self._namespace.items()],
+            )
+            self._connection.executescript(_INDEXES)
+            self._connection.execute("ANALYZE")
+            self._connection.commit()
+        self._connection.close()
+        self._connection = None
+
+    def _flush(self):
+        if self._pending:
+            self.connection.executemany("INSERT OR IGNORE INTO triples VALUES (?, ?, ?)", self._pending)
+            self._pending = []
+            self._length = None
+
+    def _select_id(self, term: Identifier) -> int:
+        row = self.connection.execute(
+            "SELECT id FROM terms WHERE kind = ? AND value = ? AND datatype = ? AND language = ?",
+            _term_key(term),
+        ).fetchone()
+        if row is None:
+            raise KeyError(term)
+        return row[0]
+
+    def _select_term(self, term_id: int) -> Identifier:
+        row = self.connection.execute(
+            "SELECT kind, value, datatype, language FROM terms WHERE id = ?", (term_id,)
+        ).fetchone()
+        return _make_term(*row)
+
+    def _add_term(self, term: Identifier) -> int:
+        try:
+            return self._find_id(term)
+        except KeyError:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO terms (kind, value, datatype, language) VALUES (?, ?, ?, ?)",
+                _term_key(term),
+            )
+            return self._find_id(term)
+
+    def _term_id(self, term: Identifier) -> Optional[int]:
+        try:
+            return self._find_id(term)
+        except KeyError:
+            # Terms missing from the store do not match any triple.
+            return None
+
+    def add(self, triple, context, quoted: bool = False):
+        if self.read_only:
+            raise ValueError("The SQLite store is read-only")
+        if self.predicate_filter is not None and triple[1] not in self.predicate_filter:
+            return
+        self._pending.append(tuple(self._add_term(term) for term in triple))
+        if len(self._pending) >= BATCH_SIZE:
+            self._flush()
+
+    def _where(self, triple_pattern) -> Optional[Tuple[str, list]]:
+        conditions, parameters = [], []
+        for column, term in zip("spo", triple_pattern):
+            if term is None:
+                continue
+            term_id = self._term_id(term)
+            if term_id is None:
+                return None
+            conditions.append(f"{column} = ?")
+            parameters.append(term_id)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), parameters
+
+    def remove(self, triple_pattern, context=None):
+        if self.read_only:
+            raise ValueError("The SQLite store is read-only")
+        self._flush()
+        where = self._where(triple_pattern)
+        if where is not None:
+            self.connection.execute("DELETE FROM triples" + where[0], where[1])
+            self._length = None
+
+    def triples(self, triple_pattern, context=None) -> Iterator:
+        if not self.read_only:
+            self._flush()
+        where = self._where(triple_pattern)
+        if where is None:
+            return
+        term = self._term
+        for s, p, o in self.connection.execute("SELECT s, p, o FROM triples" + where[0], where[1]):
+            yield (term(s), term(p), term(o)), iter(())
+
+    def __len__(self, context=None) -> int:
+        if self._length is None:
+            if not self.read_only:
+                self._flush()
+            self._length = self.connection.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+        return self._length
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix: str, namespace: URIRef, override: bool = True):
+        # Same semantics as rdflib's Memory store, the bindings are written when the store is closed.
+        bound_namespace = self._namespace.get(prefix)
+        bound_prefix = self._prefix.get(namespace)
+        if bound_prefix is None and bound_namespace is not None:
+            bound_prefix = self._prefix.get(bound_namespace)
+        if override:
+            if bound_prefix is not None:
+                del self._namespace[bound_prefix]
+            if bound_namespace is not None:
+                del self._prefix[bound_namespace]
+            self._prefix[namespace] = prefix
+            self._namespace[prefix] = namespace
+        else:
+            namespace = bound_namespace if bound_namespace is not None else namespace
+            prefix = bound_prefix if bound_prefix is not None else prefix
+            self._prefix[namespace] = prefix
+            self._namespace[prefix] = namespace
+
+    def namespace(self, prefix: str) -> Optional[URIRef]:
+        return self._namespace.get(prefix)
+
+    def prefix(self, namespace: URIRef) -> Optional[str]:
+        return self._prefix.get(namespace)
+
+    def namespaces(self) -> Iterator[Tuple[str, URIRef]]:
+        yield from list(self._namespace.items())
+
+
+def build_store(
+    ontology_path: Path,
+    store_path: Path,
+    predicate_filter: Optional[PredicateFilter] = None,
+) -> int:
+    """
+    Parse an ontology file into a new SQLite store, keeping only the triples matching
+    the predicate filter if one is given. The terms and triples are written to SQLite
+    while parsing, so that neither the graph nor its vocabulary is held in memory as a whole.
+
+    Returns:
+        The number of triples of the store.
+    """
+    store = SQLiteStore(predicate_filter=predicate_filter)
+    store.open(str(store_path), create=True)
+    try:
+        rdflib.Graph(store=store).parse(ontology_path)
+        length = len(store)
+    finally:
+        store.close()
+    return length
+
+
+def open_graph(store_path: Path) -> rdflib.Graph:
+    """
+    Open an SQLite store read-only as a graph.
+
+    Raises:
+        ValueError: If the file is not a store in the current schema.
+    """
+    store = SQLiteStore()
+    if store.open(str(store_path)) != VALID_STORE:
+        raise ValueError(f"{store_path} is not a respecter SQLite store")
+    # The namespaces are the ones bound when the store was built.
+    return rdflib.Graph(store=store, bind_namespaces="none")
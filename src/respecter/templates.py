@@ -0,0 +1,209 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Hashable, Optional, Sequence, Tuple
+
+from jinja2 import (
+    ChoiceLoader,
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    PackageLoader,
+    Template,
+    nodes,
+)
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from respecter.cache import default_cache_dir
+from respecter.options import DEFAULT_TEMPLATE
+
+
+# Name of the template variable holding the FragmentCache of a render, if any.
+FRAGMENT_CACHE_VARIABLE = "fragment_cache"
+
+
+class FragmentCache:
+    """
+    Rendered blocks of a documentation (see FragmentExtension), kept between renders
+    so that rendering it again only renders the blocks of the terms that changed.
+
+    Only the blocks used by the last render are kept (see prune), so that the cache
+    does not grow with the terms removed or edited over the renders.
+    """
+
+    def __init__(self):
+        self.fragments: Dict[Hashable, str] = {}
+        self.used: Dict[Hashable, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """
+        Get a rendered block, or None if it is not cached.
+        """
+        text = self.fragments.get(key)
+        if text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.used[key] = text
+        return text
+
+    def put(self, key: Hashable, text: str):
+        """
+        Store a rendered block.
+        """
+        self.used[key] = text
+
+    def prune(self):
+        """
+        Only keep the blocks used since the last call, once a render is complete.
+        """
+        self.fragments, self.used = self.used, {}
+
+
+class FragmentExtension(Extension):
+    """
+    Adds a fragment tag, caching the output of its body by the term it renders:
+
+        {% for concept in concepts %}{% fragment concept %}
+          <h3>{{ concept.Label }}</h3>
+        {% endfragment %}{% endfor %}
+
+    When the template is rendered with a FragmentCache as fragment_cache, the body is
+    only rendered if the same block (the template source and the position of the tag)
+    was not rendered for a term with the same key. The terms of format_classes and
+    the other format helpers are keyed by their raw data (see FormattedTerm), so that
+    cached terms are not even formatted; other values are keyed by their repr.
+    Without a cache, the body is always rendered.
+    """
+
+    tags = {"fragment"}
+
+    def __init__(self, environment: Environment):
+        super().__init__(environment)
+        self._source_digests: Dict[Optional[str], str] = {}
+
+    def preprocess(self, source: str, name: Optional[str], filename: Optional[str] = None) -> str:
+        # The digest of the source is part of the keys, so that editing a template invalidates its blocks
+        self._source_digests[name] = hashlib.blake2b(source.encode("utf-8"), digest_size=16).hexdigest()
+        return source
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        block = f"{parser.name}:{self._source_digests.get(parser.name, '')}:{lineno}"
+        term = parser.parse_expression()
+        body = parser.parse_statements(("name:endfragment",), drop_needle=True)
+        call = self.call_method("_render_fragment", [nodes.ContextReference(), nodes.Const(block), term])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_fragment(self, context, block: str, term, caller) -> str:
+        cache = context.get(FRAGMENT_CACHE_VARIABLE)
+        if cache is None:
+            return caller()
+        fragment_key = getattr(term, "fragment_key", None)
+        key = (block, fragment_key() if fragment_key is not None else repr(term))
+        text = cache.get(key)
+        if text is None:
+            text = caller()
+            cache.put(key, text)
+        # The block is rendered output, not to be escaped again
+        return Markup(text) if context.eval_ctx.autoescape else text
+
+
+# Root directory of the caches and whether to use them, as set by configure_bytecode_cache.
+# Like the other module state shared with worker processes, forked workers inherit them.
+_cache_dir: Optional[Path] = None
+_no_cache = False
+
+
+def configure_bytecode_cache(cache_dir: Optional[Path] = None, no_cache: bool = False):
+    """
+    Store the compiled templates under the same root directory as the other caches
+    (--cache-dir), or keep them in memory only (--no-cache).
+    """
+    global _cache_dir, _no_cache
+    _cache_dir = cache_dir
+    _no_cache = no_cache
+
+
+def default_bytecode_cache_dir() -> Optional[Path]:
+    """
+    Get the default directory of the compiled templates cache, the jinja subdirectory of
+    the cache root, or None if the compiled templates are not cached on disk.
+    """
+    if _no_cache:
+        return None
+    return (Path(_cache_dir) if _cache_dir else default_cache_dir()) / "jinja"
+
+
+@lru_cache(maxsize=None)
+def _environment(template_dirs: Tuple[str, ...], bytecode_cache_dir: Optional[str]):
+    loaders = []
+    if template_dirs:
+        loaders.append(FileSystemLoader(list(template_dirs)))
+    # The bundled templates come last, so that user templates can override or extend them.
+    loaders.append(PackageLoader("respecter", "data"))
+
+    bytecode_cache = None
+    if bytecode_cache_dir is not None:
+        try:
+            Path(bytecode_cache_dir).mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+        except OSError:
+            # The templates are still compiled once per process without the on-disk cache.
+            pass
+
+    return Environment(
+        loader=ChoiceLoader(loaders),
+        bytecode_cache=bytecode_cache,
+        extensions=[FragmentExtension],
+    )
+
+
+def get_environment(
+    template_dirs: Optional[Sequence[Path]] = None,
+    bytecode_cache_dir: Optional[Path] = None,
+) -> Environment:
+    """
+    Get the Jinja environment for the given template directories.
+
+    Environments are created once per process and keep their compiled templates,
+    which are also stored in an on-disk bytecode cache shared between runs
+    (see configure_bytecode_cache).
+
+    Args:
+        template_dirs: Directories searched for templates (and their partials)
+            before the bundled ones.
+        bytecode_cache_dir: Directory of the bytecode cache. Defaults to
+            default_bytecode_cache_dir().
+    """
+    template_dirs = tuple(str(Path(d).resolve()) for d in template_dirs or ())
+    bytecode_cache_dir = bytecode_cache_dir or default_bytecode_cache_dir()
+    return _environment(template_dirs, None if bytecode_cache_dir is None else str(bytecode_cache_dir))
+
+
+def get_template(
+    template_name: str = DEFAULT_TEMPLATE,
+    template_dirs: Optional[Sequence[Path]] = None,
+) -> Template:
+    """
+    Get a compiled template, looking it up in template_dirs first, then in the bundled templates.
+    """
+    return get_environment(template_dirs).get_template(template_name)
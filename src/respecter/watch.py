@@ -0,0 +1,237 @@
+# respecter
+# Copyright 2022 - Swiss Data Science Center (SDSC)
+# A partnership between École Polytechnique Fédérale de Lausanne (EPFL) and
+# Eidgenössische Technische Hochschule Zürich (ETHZ).#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import io
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Collection, Dict, List, Optional, Sequence, Tuple, Union
+
+from respecter.cache import GraphCache, StoreCache
+from respecter.core import QueryEngine, fetch_ontology_from_graph, parse_ontology, write_template
+from respecter.imports import ImportCatalog
+from respecter.sparql import SparqlConfig
+from respecter.templates import DEFAULT_TEMPLATE, FragmentCache
+
+# Interval between two checks of the watched files, in seconds.
+DEFAULT_INTERVAL = 0.2
+
+Snapshot = Dict[Path, Tuple[int, int]]
+
+
+def snapshot(paths: Sequence[Path]) -> Snapshot:
+    """
+    Get the modification time and size of the files, and of the files in the directories.
+    Missing files are left out, so that a file being replaced shows up as changed.
+    """
+    state = {}
+    for path in paths:
+        path = Path(path)
+        files = sorted(f for f in path.rglob("*") if f.is_file()) if path.is_dir() else [path]
+        for file in files:
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            state[file] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+def changed_paths(before: Snapshot, after: Snapshot) -> List[Path]:
+    """
+    Get the files added, removed or modified between two snapshots.
+    """
+    return sorted(path for path in before.keys() | after.keys() if before.get(path) != after.get(path))
+
+
+class LiveBuild:
+    """
+    Builds the documentation of an ontology file again and again, keeping the parsed graph
+    and the extracted terms in memory between builds, so that a change only re-runs the
+    stages that depend on it: a change of the ontology re-parses it, a change of the
+    config re-runs the queries on the parsed graph, and a change of a template only
+    renders the documentation again.
+
+    The rendered blocks of the terms are kept too (see FragmentCache), keyed by the raw
+    data of the terms rather than by the objects extracted from one parse: after an edit,
+    only the blocks of the terms that changed are formatted and rendered again.
+
+    Args:
+        ontology_path: The path of the ontology file.
+        config_path: The path of the configuration file.
+        output: The path of the output HTML file, or None to only keep the last render in text.
+        template_name: The name of the template to render.
+        template_dirs: The directories searched for templates before the bundled ones.
+        cache: The cache the ontology is parsed through.
+        engine: The query engine.
+        filter_triples: Only load the triples read by the queries.
+        debug: Save the queries and their results in the debug directory.
+        catalog: The import catalog resolving the owl:imports of the ontology, if any.
+            The catalog and the files it lists are watched along with the ontology.
+    """
+
+    def __init__(
+        self,
+        ontology_path: Path,
+        config_path: Path,
+        output: Optional[Path],
+        template_name: str = DEFAULT_TEMPLATE,
+        template_dirs: Optional[Sequence[Path]] = None,
+        cache: Optional[Union[GraphCache, StoreCache]] = None,
+        engine: QueryEngine = QueryEngine.sparql,
+        filter_triples=False,
+        debug=False,
+        catalog: Optional[ImportCatalog] = None,
+    ):
+        self.ontology_path = Path(ontology_path)
+        self.config_path = Path(config_path)
+        self.output = None if output is None else Path(output)
+        self.template_name = template_name
+        self.template_dirs = list(template_dirs or ())
+        self.cache = cache
+        self.engine = engine
+        self.filter_triples = filter_triples
+        self.debug = debug
+        self.catalog = catalog
+        self.config: Optional[SparqlConfig] = None
+        self.graph = None
+        self.terms = None
+        self.text: Optional[str] = None
+        self.fragments = FragmentCache()
+        self._predicate_filter = None
+
+    @property
+    def paths(self) -> List[Path]:
+        """
+        The files and directories to watch.
+        """
+        imports = self.catalog.paths if self.catalog is not None else []
+        return [self.ontology_path, self.config_path, *imports, *self.template_dirs]
+
+    def build(self, changed: Optional[Collection[Path]] = None) -> List[str]:
+        """
+        Build the documentation, re-running the stages affected by the changed files.
+        Every stage runs on the first build, or if changed is None.
+
+        Returns:
+            The stages that ran, among "parse", "query" and "render".
+        """
+        changed = None if changed is None else {Path(path) for path in changed}
+        stages = []
+
+        if self.config is None or changed is None or self.config_path in changed:
+            self.config = SparqlConfig.from_path(self.config_path)
+            self.terms = None
+        predicate_filter = self.config.get_predicate_filter() if self.filter_triples else None
+        imports_changed = (
+            self.catalog is not None and changed is not None and not changed.isdisjoint(self.catalog.paths)
+        )
+        if imports_changed and self.catalog.path in changed:
+            self.catalog = ImportCatalog.from_path(self.catalog.path)
+        reparse = (
+            changed is None
+            or self.ontology_path in changed
+            or imports_changed
+            or predicate_filter != self._predicate_filter
+        )
+        # After restore, the graph is only parsed once the queries need to run again.
+        if reparse or (self.graph is None and self.terms is None):
+            # An edited ontology is parsed without the graph cache: each version would
+            # otherwise add an entry (and an eviction scan) that is never read again.
+            edited = changed is not None and self.ontology_path in changed
+            graph = parse_ontology(
+                self.ontology_path,
+                cache=self.cache,
+                predicate_filter=predicate_filter,
+                catalog=self.catalog,
+                cache_ontology=not (edited and isinstance(self.cache, GraphCache)),
+            )
+            if self.graph is not None:
+                self.graph.close()
+            self.graph = graph
+            self._predicate_filter = predicate_filter
+            self.terms = None
+            stages.append("parse")
+
+        if self.terms is None:
+            self.terms = fetch_ontology_from_graph(self.graph, self.config, debug=self.debug, engine=self.engine)
+            stages.append("query")
+
+        # Jinja reloads the templates that changed on disk. The output is only
+        # overwritten once rendered, so that a failed render leaves the last one.
+        buffer = io.StringIO()
+        write_template(
+            buffer,
+            *self.terms,
+            template_name=self.template_name,
+            template_dirs=self.template_dirs,
+            fragment_cache=self.fragments,
+        )
+        self.fragments.prune()
+        self.text = buffer.getvalue()
+        if self.output is not None:
+            self.output.write_text(self.text)
+        stages.append("render")
+        return stages
+
+    def restore(self, terms, text: str):
+        """
+        Take over a build made by another process, e.g. a worker of DocumentationServer.warm,
+        so that the next builds only re-run the stages affected by a change. The graph is
+        not sent along: it is parsed again, through the cache, when the queries next run.
+
+        Args:
+            terms: The extracted terms, as fetch_ontology returns them.
+            text: The rendered documentation.
+        """
+        self.config = SparqlConfig.from_path(self.config_path)
+        self._predicate_filter = self.config.get_predicate_filter() if self.filter_triples else None
+        self.graph = None
+        self.terms = terms
+        self.text = text
+
+
+def watch_build(
+    live_build: LiveBuild,
+    interval: float = DEFAULT_INTERVAL,
+    stop: Optional[Callable[[], bool]] = None,
+):
+    """
+    Build the documentation, then build it again whenever a watched file changes,
+    until interrupted (or until stop returns True).
+
+    A failed build, e.g. while the ontology is being edited and is not valid yet, is
+    reported and the previous state is kept until the next change.
+    """
+    state = snapshot(live_build.paths)
+    changed = None
+    while True:
+        start = time.perf_counter()
+        try:
+            stages = live_build.build(changed)
+        except Exception as e:
+            print(f"Build failed: {e}", file=sys.stderr)
+        else:
+            elapsed = time.perf_counter() - start
+            print(f"Built {live_build.output} ({', '.join(stages)}) in {elapsed:.2f}s", file=sys.stderr)
+
+        changed = []
+        while not changed:
+            if stop is not None and stop():
+                return
+            time.sleep(interval)
+            new_state = snapshot(live_build.paths)
+            changed = changed_paths(state, new_state)
+            state = new_state
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pytest
+import rdflib
+from rdflib.namespace import DCTERMS, OWL, RDF, SKOS
+
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl")
+CUSTODIAN_ONTOLOGY = rdflib.URIRef("https://swissdatacustodian.ch/doc/ontology#")
+DEFINITIONS = rdflib.URIRef("https://example.org/definitions")
+LABELS = rdflib.URIRef("https://example.org/labels/")
+
+
+@pytest.fixture(autouse=True, scope="session")
+def cache_home(tmp_path_factory):
+    """
+    Keep the caches written by the tests (graphs, compiled templates...) out of the user's cache directory.
+    """
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path_factory.mktemp("cache")))
+        monkeypatch.delenv("RESPECTER_CACHE_DIR", raising=False)
+        yield
+
+
+@pytest.fixture
+def split_ontology(tmp_path) -> Path:
+    """
+    Move the definitions and labels of the custodian ontology to imported ontologies:
+    the ontology imports the definitions, which import the labels, which import the
+    ontology back and an ontology that is not in the catalog.
+
+    The files and their catalog.yaml are written to tmp_path, and the path of the
+    ontology is returned.
+    """
+    graph = rdflib.Graph().parse(CUSTODIAN_FILE_PATH)
+    ontology, definitions, labels = rdflib.Graph(), rdflib.Graph(), rdflib.Graph()
+    for prefix, namespace in graph.namespaces():
+        ontology.bind(prefix, namespace)
+    for triple in graph:
+        if triple[1] == SKOS.definition:
+            definitions.add(triple)
+        elif triple[1] == SKOS.prefLabel and triple[0] != CUSTODIAN_ONTOLOGY:
+            labels.add(triple)
+        else:
+            ontology.add(triple)
+    ontology.add((CUSTODIAN_ONTOLOGY, OWL.imports, DEFINITIONS))
+    definitions.add((DEFINITIONS, RDF.type, OWL.Ontology))
+    definitions.add((DEFINITIONS, DCTERMS.title, rdflib.Literal("Definitions")))
+    definitions.add((DEFINITIONS, OWL.imports, LABELS))
+    labels.add((LABELS, RDF.type, OWL.Ontology))
+    labels.add((LABELS, OWL.imports, CUSTODIAN_ONTOLOGY))
+    labels.add((LABELS, OWL.imports, rdflib.URIRef("https://example.org/missing")))
+
+    ontology.serialize(tmp_path / "custodian.ttl")
+    definitions.serialize(tmp_path / "definitions.ttl")
+    labels.serialize(tmp_path / "labels.nt", format="nt", encoding="utf-8")
+    (tmp_path / "catalog.yaml").write_text(
+        "imports:\n  https://example.org/definitions: definitions.ttl\n  https://example.org/labels: labels.nt\n"
+    )
+    return tmp_path / "custodian.ttl"
@@ -0,0 +1,68 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from respecter.artifacts import MODELS_VERSION, dump_models, load_models, read_models, write_models
+from respecter.core import fetch_ontology, write_template
+from respecter.pages import split_pages, write_pages
+from respecter.renderers import term_catalogue
+from respecter.sparql import SparqlConfig
+
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl")
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml")
+IMAGING_FILE_PATH = Path("examples/imaging/imaging.ttl")
+IMAGING_CONFIG_FILE_PATH = Path("examples/imaging/sparql_config_imaging.yaml")
+
+
+def _render(*models) -> str:
+    sink = io.StringIO()
+    write_template(sink, *models)
+    return sink.getvalue()
+
+
+@pytest.mark.parametrize(
+    "ontology_path, config_path",
+    [(CUSTODIAN_FILE_PATH, CUSTODIAN_CONFIG_FILE_PATH), (IMAGING_FILE_PATH, IMAGING_CONFIG_FILE_PATH)],
+)
+def test_models_round_trip(ontology_path, config_path, tmp_path):
+    models = fetch_ontology(ontology_path, SparqlConfig.from_path(config_path))
+    path = write_models(tmp_path / "models.json", *models)
+    loaded = read_models(path)
+
+    assert _render(*loaded) == _render(*models)
+    assert term_catalogue(*loaded) == term_catalogue(*models)
+    assert dump_models(*loaded) == dump_models(*models)
+    # The links between the pages of a split documentation are the same too
+    for name, (ontology, *terms) in [("extracted", models), ("loaded", loaded)]:
+        (tmp_path / name).mkdir()
+        write_pages(tmp_path / name, ontology, split_pages(*terms, split="class"), workers=1)
+    pages = sorted(path.name for path in (tmp_path / "extracted").iterdir())
+    assert sorted(path.name for path in (tmp_path / "loaded").iterdir()) == pages
+    for page in pages:
+        assert (tmp_path / "loaded" / page).read_text() == (tmp_path / "extracted" / page).read_text()
+
+
+def test_models_terms(tmp_path):
+    models = fetch_ontology(CUSTODIAN_FILE_PATH, SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH))
+    data = json.loads(write_models(tmp_path / "models.json", *models).read_text())
+
+    assert data["base"] == "https://swissdatacustodian.ch/doc/ontology#"
+    # Each URI is stored once, and referred to by its index
+    uris = [uri for uri, _ in data["terms"]]
+    assert len(uris) == len(set(uris))
+    signature = next(record for record in data["classes"] if record[0] == "Signature")
+    assert data["terms"][signature[3]] == ["https://swissdatacustodian.ch/doc/ontology#Signature", "sdc:Signature"]
+
+
+def test_models_errors(tmp_path):
+    with pytest.raises(ValueError):
+        load_models({"format": "respecter-models", "version": MODELS_VERSION + 1})
+    with pytest.raises(ValueError):
+        load_models({"title": "Not models"})
+
+    path = tmp_path / "models.json"
+    path.write_text("not json")
+    with pytest.raises(ValueError):
+        read_models(path)
@@ -0,0 +1,74 @@
+from pathlib import Path
+import pytest
+
+from respecter.build import BuildItem, BuildOptions, discover_items, load_manifest, run_build
+
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl").resolve()
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml").resolve()
+IMAGING_FILE_PATH = Path("examples/imaging/imaging.ttl").resolve()
+IMAGING_CONFIG_FILE_PATH = Path("examples/imaging/sparql_config_imaging.yaml").resolve()
+
+
+def test_load_manifest(tmp_path):
+    manifest_path = tmp_path / "manifest.yaml"
+    manifest_path.write_text(
+        f"""
+items:
+  - ontology: {CUSTODIAN_FILE_PATH}
+    config: {CUSTODIAN_CONFIG_FILE_PATH}
+    output: site/custodian.html
+"""
+    )
+    assert load_manifest(manifest_path) == [
+        BuildItem(CUSTODIAN_FILE_PATH, CUSTODIAN_CONFIG_FILE_PATH, tmp_path / "site/custodian.html")
+    ]
+
+    # Items missing a path, items that are not mappings, no items, and items with the same output
+    for manifest in (
+        "- ontology: custodian.ttl\n",
+        "- null\n",
+        "- custodian.ttl\n",
+        "items: []\n",
+        "- {ontology: a.ttl, config: config.yaml, output: site/a.html}\n"
+        "- {ontology: b.ttl, config: config.yaml, output: site/../site/a.html}\n",
+    ):
+        manifest_path.write_text(manifest)
+        with pytest.raises(ValueError):
+            load_manifest(manifest_path)
+
+
+def test_discover_items(tmp_path):
+    items = discover_items("examples/*/*.ttl", CUSTODIAN_CONFIG_FILE_PATH, tmp_path)
+    assert [item.output.name for item in items] == ["custodian.html", "imaging.html"]
+    # Absolute and recursive patterns
+    assert discover_items(str(Path("examples").resolve() / "**/*.ttl"), CUSTODIAN_CONFIG_FILE_PATH, tmp_path) == [
+        BuildItem(CUSTODIAN_FILE_PATH, CUSTODIAN_CONFIG_FILE_PATH, tmp_path / "custodian.html"),
+        BuildItem(IMAGING_FILE_PATH, CUSTODIAN_CONFIG_FILE_PATH, tmp_path / "imaging.html"),
+    ]
+
+    # Files with the same name would be written to the same output
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "x.ttl").write_text("")
+    with pytest.raises(ValueError):
+        discover_items(str(tmp_path / "*/x.ttl"), CUSTODIAN_CONFIG_FILE_PATH, tmp_path)
+    # Patterns matching no file
+    with pytest.raises(ValueError):
+        discover_items(str(tmp_path / "*.ttl"), CUSTODIAN_CONFIG_FILE_PATH, tmp_path)
+
+
+def test_run_build(tmp_path):
+    items = [
+        BuildItem(CUSTODIAN_FILE_PATH, CUSTODIAN_CONFIG_FILE_PATH, tmp_path / "custodian.html"),
+        BuildItem(IMAGING_FILE_PATH, IMAGING_CONFIG_FILE_PATH, tmp_path / "imaging.html"),
+        BuildItem(tmp_path / "missing.ttl", IMAGING_CONFIG_FILE_PATH, tmp_path / "missing.html"),
+    ]
+    results = {
+        result.item.output.name: result
+        for result in run_build(items, BuildOptions(no_cache=True), workers=2)
+    }
+
+    assert results["custodian.html"].ok and results["imaging.html"].ok
+    assert (tmp_path / "custodian.html").exists() and (tmp_path / "imaging.html").exists()
+    assert not results["missing.html"].ok
+    assert results["missing.html"].error
@@ -0,0 +1,78 @@
+from pathlib import Path
+import pytest
+import rdflib
+from rdflib.compare import isomorphic
+
+from respecter.cache import DiskCache, GraphCache, dump_graph, load_graph
+from respecter.sparql import SparqlConfig
+
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl")
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml")
+LANGUAGES_DATA_FILE_PATH = Path("tests/data/languages.ttl")
+
+
+def test_dump_load_roundtrip():
+    graph = rdflib.Graph()
+    graph.parse(CUSTODIAN_FILE_PATH)
+    loaded = load_graph(dump_graph(graph))
+
+    assert isomorphic(graph, loaded)
+    assert sorted(graph.namespaces()) == sorted(loaded.namespaces())
+    # Literal datatypes and languages must survive the roundtrip
+    assert set(graph.objects()) == set(loaded.objects())
+
+
+def test_load_invalid_data():
+    with pytest.raises(ValueError):
+        load_graph(b"not a graph" + bytes(16))
+
+
+def test_graph_cache_hit(tmp_path):
+    cache = GraphCache(tmp_path)
+    graph = cache.load(CUSTODIAN_FILE_PATH)
+    key = cache.key(CUSTODIAN_FILE_PATH)
+
+    # Entries are stored in a subdirectory of the cache root
+    assert (tmp_path / "graphs" / (key + GraphCache.suffix)).exists()
+    assert isomorphic(cache.get(key), graph)
+    assert cache.get("missing") is None
+
+
+def test_disk_cache_writer(tmp_path):
+    cache = DiskCache(tmp_path)
+    with cache.writer("key") as f:
+        f.write(b"chunk ")
+        f.write(b"by chunk")
+    assert cache.read("key") == b"chunk by chunk"
+
+    # An entry that fails while being written is not stored
+    with pytest.raises(RuntimeError):
+        with cache.writer("failed") as f:
+            f.write(b"partial")
+            raise RuntimeError
+    assert cache.read("failed") is None
+    assert list(cache.directory.iterdir()) == [cache.directory / ("key" + DiskCache.suffix)]
+
+
+def test_graph_cache_eviction(tmp_path):
+    languages_size = len(dump_graph(rdflib.Graph().parse(LANGUAGES_DATA_FILE_PATH)))
+    custodian_size = len(dump_graph(rdflib.Graph().parse(CUSTODIAN_FILE_PATH)))
+    cache = GraphCache(tmp_path, max_size=languages_size + custodian_size - 1)
+
+    cache.load(LANGUAGES_DATA_FILE_PATH)
+    cache.load(CUSTODIAN_FILE_PATH)
+
+    # The least recently used entry is evicted once the cache is full
+    entries = [entry.name for entry in cache.directory.glob("*" + GraphCache.suffix)]
+    assert entries == [cache.key(CUSTODIAN_FILE_PATH) + GraphCache.suffix]
+
+
+def test_graph_cache_filter_key(tmp_path):
+    cache = GraphCache(tmp_path)
+    predicate_filter = SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH).get_predicate_filter()
+    key = cache.key(CUSTODIAN_FILE_PATH, predicate_filter)
+
+    # Filtered graphs are cached separately from the full graph
+    assert key != cache.key(CUSTODIAN_FILE_PATH)
+    graph = cache.load(CUSTODIAN_FILE_PATH, predicate_filter)
+    assert len(cache.get(key)) == len(graph) < len(cache.load(CUSTODIAN_FILE_PATH))
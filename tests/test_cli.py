@@ -1,3 +1,7 @@
+import json
+import os
+import subprocess
+import sys
 from respecter.cli import app
 from typer.testing import CliRunner
 
@@ -14,9 +18,169 @@ def test_version():
 
 
 def test_run():
-    result = runner.invoke(app, ["run", "-c", "examples/custodian/config.yaml", "examples/custodian/custodian.ttl"])
+    result = runner.invoke(app, ["run", "--no-cache", "-c", "examples/custodian/config.yaml", "examples/custodian/custodian.ttl"])
     with open('examples/custodian/custodian.html', 'r') as f:
         expected = f.read()
-    # TODO: compare generated html to example
-    # NOTE: so far section ordering does not seem deterministic
     assert result.exit_code == 0
+    assert result.stdout == expected
+
+
+def test_run_outputs(tmp_path):
+    outputs = [tmp_path / "custodian.html", tmp_path / "custodian.json", tmp_path / "custodian.md"]
+    args = ["run", "--no-cache", "-c", "examples/custodian/config.yaml", "examples/custodian/custodian.ttl"]
+    result = runner.invoke(app, [*args, *(option for path in outputs for option in ("-o", str(path)))])
+    assert result.exit_code == 0
+    assert outputs[0].read_text() == open("examples/custodian/custodian.html").read()
+    assert json.loads(outputs[1].read_text())["classes"]
+    assert outputs[2].read_text().startswith("# ")
+
+    result = runner.invoke(app, [*args, "-o", str(tmp_path / "custodian.pdf")])
+    assert result.exit_code == 2
+
+
+def test_run_split_template(tmp_path):
+    result = runner.invoke(
+        app,
+        ["run", "--no-cache", "-c", "examples/custodian/config.yaml", "examples/custodian/custodian.ttl",
+         "--split", "class", "--output-dir", str(tmp_path), "--template", "custom.html"],
+    )
+    assert result.exit_code == 2
+    assert not any(tmp_path.iterdir())
+
+
+def test_extract_render(tmp_path):
+    models = tmp_path / "custodian.json"
+    result = runner.invoke(
+        app, ["extract", "-c", "examples/custodian/config.yaml", "examples/custodian/custodian.ttl", "-o", str(models)]
+    )
+    assert result.exit_code == 0
+    assert json.loads(models.read_text())["format"] == "respecter-models"
+
+    result = runner.invoke(app, ["render", str(models)])
+    assert result.exit_code == 0
+    assert result.stdout == open("examples/custodian/custodian.html").read()
+
+    outputs = [tmp_path / "custodian.html", tmp_path / "custodian.md"]
+    result = runner.invoke(app, ["render", str(models), "-o", str(outputs[0]), "-o", str(outputs[1])])
+    assert result.exit_code == 0
+    assert outputs[0].read_text() == open("examples/custodian/custodian.html").read()
+    assert outputs[1].read_text().startswith("# ")
+
+    # Not a models file
+    result = runner.invoke(app, ["render", "examples/custodian/config.yaml"])
+    assert result.exit_code == 2
+
+
+def test_run_catalog(tmp_path, split_ontology):
+    ontology_path = split_ontology
+    args = ["run", "--no-cache", "-c", "examples/custodian/config.yaml", str(ontology_path)]
+    result = runner.invoke(app, [*args, "--catalog", str(tmp_path / "catalog.yaml")])
+    assert result.exit_code == 0
+    assert result.stdout == open("examples/custodian/custodian.html").read()
+
+    result = runner.invoke(app, [*args, "--catalog", "examples/custodian/config.yaml"])
+    assert result.exit_code == 2
+
+
+def test_run_deterministic(tmp_path):
+    """ The same inputs give byte-identical outputs, whatever the hash seed and query engine."""
+    outputs = set()
+    for seed, engine in [("0", "sparql"), ("1", "native"), ("2", "planned")]:
+        output = tmp_path / f"custodian-{seed}.html"
+        subprocess.run(
+            [sys.executable, "-m", "respecter.cli", "run", "--no-cache", "--engine", engine, "-c", "examples/custodian/config.yaml", "examples/custodian/custodian.ttl", "-o", str(output)],
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            check=True,
+            capture_output=True,
+        )
+        outputs.add(output.read_bytes())
+    assert len(outputs) == 1
+
+
+def test_run_output_cache(tmp_path):
+    output = tmp_path / "custodian.html"
+    args = ["run", "--cache-dir", str(tmp_path / "cache"), "-c", "examples/custodian/config.yaml", "examples/custodian/custodian.ttl", "-o", str(output)]
+    result = runner.invoke(app, args)
+    assert result.exit_code == 0
+    [entry] = (tmp_path / "cache" / "outputs").glob("*.out")
+    assert entry.read_text() == output.read_text()
+
+    # Unchanged inputs skip the build: the output is restored from the cache
+    entry.write_text("cached")
+    output.unlink()
+    result = runner.invoke(app, args)
+    assert result.exit_code == 0
+    assert output.read_text() == "cached"
+
+    # A change of the ontology rebuilds the output
+    ontology = tmp_path / "custodian.ttl"
+    ontology.write_text(open("examples/custodian/custodian.ttl").read() + "\n# edited\n")
+    result = runner.invoke(app, [*args[:5], str(ontology), *args[6:]])
+    assert result.exit_code == 0
+    assert output.read_text() == open("examples/custodian/custodian.html").read()
+
+
+def test_run_stdout_cache(tmp_path):
+    args = ["run", "--cache-dir", str(tmp_path), "-c", "examples/custodian/config.yaml", "examples/custodian/custodian.ttl"]
+    result = runner.invoke(app, args)
+    assert result.exit_code == 0
+    # The page printed to stdout is stored in the cache as it is rendered
+    [entry] = (tmp_path / "outputs").glob("*.out")
+    assert entry.read_text() == result.stdout
+
+    result = runner.invoke(app, args)
+    assert result.exit_code == 0
+    assert result.stdout == entry.read_text()
+
+
+def test_build(tmp_path):
+    result = runner.invoke(app, ["build", "--no-cache", "-g", "examples/*/*.ttl", "-c", "examples/custodian/config.yaml", "-o", str(tmp_path)])
+    assert result.exit_code == 0
+    assert (tmp_path / "custodian.html").exists()
+
+    manifest_path = tmp_path / "manifest.yaml"
+    manifest_path.write_text("- {ontology: missing.ttl, config: missing.yaml, output: missing.html}\n")
+    result = runner.invoke(app, ["build", "--no-cache", str(manifest_path)])
+    assert result.exit_code == 1
+
+    # A pattern matching no file is an error, like a missing manifest
+    result = runner.invoke(app, ["build", "--no-cache", "-g", str(tmp_path / "*.ttl"), "-c", "examples/custodian/config.yaml"])
+    assert result.exit_code == 2
+
+
+def test_run_profile(tmp_path):
+    profile_path = tmp_path / "profile.json"
+    result = runner.invoke(app, ["run", "--no-cache", "-c", "examples/custodian/config.yaml", "examples/custodian/custodian.ttl", "-o", str(tmp_path / "custodian.html"), "--profile", str(profile_path)])
+    assert result.exit_code == 0
+    assert [phase["name"] for phase in json.loads(profile_path.read_text())["phases"]][-1] == "render"
+
+
+def test_run_source():
+    # Either an ontology file or a SPARQL endpoint, not both
+    result = runner.invoke(app, ["run", "-c", "examples/custodian/config.yaml"])
+    assert result.exit_code == 2
+    result = runner.invoke(app, ["run", "-c", "examples/custodian/config.yaml", "examples/custodian/custodian.ttl", "--endpoint", "http://localhost/sparql"])
+    assert result.exit_code == 2
+
+
+def test_run_watch_options():
+    # --watch rebuilds an output file, it cannot print to stdout
+    result = runner.invoke(app, ["run", "--watch", "-c", "examples/custodian/config.yaml", "examples/custodian/custodian.ttl"])
+    assert result.exit_code == 2
+
+
+HEAVY_MODULES = ("rdflib", "jinja2", "respecter.core", "respecter.cache", "respecter.templates")
+
+
+def test_lazy_imports():
+    """ The lightweight commands do not import rdflib, jinja2 nor the pipeline."""
+    code = (
+        "import sys\n"
+        "from typer.testing import CliRunner\n"
+        "from respecter.cli import app\n"
+        "for args in (['--version'], ['--help'], ['generate-config']):\n"
+        "    assert CliRunner().invoke(app, args).exit_code == 0\n"
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, text=True)
+    assert result.stdout.split() == []
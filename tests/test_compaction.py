@@ -0,0 +1,95 @@
+import gc
+import weakref
+from pathlib import Path
+import rdflib
+
+from respecter.compaction import UriCompactor, preferred_prefixes
+
+IMAGING_FILE_PATH = Path("examples/imaging/imaging.ttl")
+
+
+def test_qname_matches_rdflib():
+    graph = rdflib.Graph()
+    graph.parse(IMAGING_FILE_PATH)
+    compactor = UriCompactor.from_graph(graph)
+    reference = rdflib.Graph()
+    reference.parse(IMAGING_FILE_PATH)
+
+    uris = {term for triple in graph for term in triple if isinstance(term, rdflib.URIRef)}
+    for uri in uris:
+        assert compactor.qname(str(uri)) == reference.qname(uri).replace("schema1:", "schema:")
+
+
+def test_from_graph_releases_graph():
+    graph = rdflib.Graph()
+    graph.parse(IMAGING_FILE_PATH)
+    compactor = UriCompactor.from_graph(graph)
+    term = compactor.intern("https://example.org/unbound/term")
+    reference = weakref.ref(graph)
+    del graph
+    gc.collect()
+
+    assert reference() is None
+    assert str(term) == '<a href="https://example.org/unbound/term">ns1:term</a>'
+
+
+def test_preferred_prefixes():
+    graph = rdflib.Graph()
+    graph.bind("schema", "http://schema.org/")
+    prefixes = preferred_prefixes(graph.namespaces())
+
+    assert prefixes["http://schema.org/"] == "schema"
+    assert prefixes["https://schema.org/"] == "schema"
+    assert prefixes["http://www.w3.org/ns/shacl#"] == "sh"
+
+
+def test_anchor():
+    compactor = UriCompactor(
+        [("ex", "https://example.com/"), ("", "https://example.org/")],
+        current_ontology_url="https://example.com/",
+    )
+    assert compactor.anchor("https://example.com/respecter") == '<a href="#respecter">ex:respecter</a>'
+    assert compactor.anchor("https://example.org/respecter") == '<a href="https://example.org/respecter">respecter</a>'
+    # URIs outside of the namespaces are kept as is without a fallback
+    assert compactor.anchor("https://other.com/a/b") == '<a href="https://other.com/a/b">https://other.com/a/b</a>'
+    assert compactor.anchor("https://example.com/respecter") is compactor.anchor("https://example.com/respecter")
+
+
+def test_format():
+    compactor = UriCompactor([("ex", "https://example.com/")])
+    assert compactor.format(rdflib.URIRef("https://example.com/a")) == '<a href="https://example.com/a">ex:a</a>'
+    assert compactor.format(rdflib.Literal("Respecter")) == "Respecter"
+    assert compactor.format(None) == ""
+
+
+def test_term():
+    compactor = UriCompactor([("ex", "https://example.com/")])
+    term = compactor.term(rdflib.URIRef("https://example.com/a"))
+
+    assert term is compactor.term(rdflib.URIRef("https://example.com/a"))
+    assert str(term) == '<a href="https://example.com/a">ex:a</a>'
+    assert compactor.term(rdflib.Literal("Respecter")) == "Respecter"
+
+
+def test_link_pages():
+    compactor = UriCompactor([("ex", "https://example.com/")], current_ontology_url="https://example.com/")
+    assert compactor.anchor("https://example.com/a") == '<a href="#a">ex:a</a>'
+
+    compactor.link_pages({"https://example.com/a": "page.html"})
+    assert compactor.anchor("https://example.com/a") == '<a href="page.html#a">ex:a</a>'
+    assert compactor.anchor("https://example.com/b") == '<a href="#b">ex:b</a>'
+
+
+def test_key():
+    compactor = UriCompactor([("ex", "https://example.com/")], current_ontology_url="https://example.com/")
+    # Compactors with the same bindings render the same anchors
+    assert compactor.key == UriCompactor([("ex", "https://example.com/")], current_ontology_url="https://example.com/").key
+    assert compactor.key != UriCompactor([("ex", "https://example.org/")], current_ontology_url="https://example.com/").key
+
+    key = compactor.key
+    compactor.link_pages({"https://example.com/a": "page.html"})
+    assert compactor.key != key
+    compactor.link_pages({})
+    assert compactor.key == key
+
+    assert UriCompactor.from_qnames({"https://example.com/a": "ex:a"}).key != UriCompactor.from_qnames({}).key
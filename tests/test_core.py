@@ -1,12 +1,18 @@
-import pytest
-
-from respecter.core import fix_prefixes
-
-def test_fix_prefixes():
-    input_html = """
-    ex:Bob a schema1:Person
-    """
-    expected_html = """
-    ex:Bob a schema:Person
-    """
-    assert fix_prefixes(input_html) == expected_html
+from pathlib import Path
+import rdflib
+
+from respecter.core import QUERY_STAGES, query_ontology
+from respecter.sparql import SparqlConfig
+
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl")
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml")
+
+
+def test_query_ontology_parallel():
+    graph = rdflib.Graph()
+    graph.parse(CUSTODIAN_FILE_PATH)
+    config = SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH)
+
+    results = query_ontology(graph, config, parallel=True)
+    assert list(results) == list(QUERY_STAGES)
+    assert results == query_ontology(graph, config)
@@ -0,0 +1,161 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import pytest
+import rdflib
+
+from respecter.cache import ResultCache
+from respecter.core import QUERY_STAGES, fetch_ontology, fetch_ontology_from_endpoint, query_endpoint, query_ontology
+from respecter.endpoint import EndpointError, SparqlEndpoint, ordered_query
+from respecter.sparql import SparqlConfig, query_rows, rows_to_json
+
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl")
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml")
+
+
+class StandInEndpoint(ThreadingHTTPServer):
+    """
+    A local SPARQL endpoint answering queries on a graph, counting connections and queries.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, graph):
+        super().__init__(("127.0.0.1", 0), SparqlHandler)
+        self.graph = graph
+        self.connections = 0
+        self.queries = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/sparql"
+
+
+class SparqlHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        query = parse_qs(body)["query"][0]
+        self.server.queries.append(query)
+        try:
+            status, data = 200, json.dumps(rows_to_json(query_rows(self.server.graph, query)))
+        except Exception as e:
+            status, data = 400, str(e)
+        data = data.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/sparql-results+json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return rdflib.Graph().parse(CUSTODIAN_FILE_PATH)
+
+
+@pytest.fixture
+def server(graph):
+    server = StandInEndpoint(graph)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _sorted(rows):
+    return sorted(sorted((name, str(value)) for name, value in row.items()) for row in rows)
+
+
+def test_query_endpoint(graph, server):
+    config = SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH)
+    with SparqlEndpoint(server.url) as endpoint:
+        results = query_endpoint(endpoint, config)
+        assert list(results) == list(QUERY_STAGES)
+
+        expected = query_ontology(graph, config)
+        for stage in QUERY_STAGES:
+            assert _sorted(results[stage]) == _sorted(expected[stage])
+
+        # Every query reuses the same keep-alive connection
+        assert server.connections == 1
+
+        with pytest.raises(ValueError):
+            query_endpoint(endpoint, config, engine="native")
+
+
+def test_pagination(graph, server):
+    query = SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH).build_enumerations_query()
+    expected = query_rows(graph, query)
+    page_size = len(expected) // 3
+
+    with SparqlEndpoint(server.url, page_size=page_size) as endpoint:
+        rows = list(endpoint.iter_rows(query))
+
+    assert len(server.queries) == len(expected) // page_size + 1
+    assert server.queries[1] == f"{ordered_query(query)}\nLIMIT {page_size} OFFSET {page_size}"
+    assert _sorted(rows) == _sorted(expected)
+
+
+def test_ordered_query(graph):
+    query = "PREFIX skos: <http://www.w3.org/2004/02/skos/core#>\nSELECT DISTINCT ?s ?label WHERE { ?s skos:prefLabel ?label }"
+    ordered = ordered_query(query)
+    assert ordered.startswith("PREFIX skos: <http://www.w3.org/2004/02/skos/core#>\nSELECT * WHERE {\nSELECT DISTINCT ?s")
+    assert ordered.endswith("}\nORDER BY ?s ?label")
+    rows = query_rows(graph, ordered)
+    assert _sorted(rows) == _sorted(query_rows(graph, query))
+    assert rows == sorted(rows, key=lambda row: (str(row["s"]), str(row["label"])))
+
+    # Queries that cannot be ordered are fetched at once
+    assert ordered_query("ASK { ?s ?p ?o }") is None
+    assert ordered_query("SELECT ?s WHERE { ?s ?p ?o } BINDINGS") is None
+
+
+def test_result_cache(server, tmp_path):
+    query = SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH).build_enumerations_query()
+    with SparqlEndpoint(server.url, cache=ResultCache(tmp_path)) as endpoint:
+        rows = endpoint.select(query)
+        assert endpoint.select(query) == rows
+    assert len(server.queries) == 1
+
+    # Results older than max_age are fetched again
+    with SparqlEndpoint(server.url, cache=ResultCache(tmp_path, max_age=-1)) as endpoint:
+        assert endpoint.select(query) == rows
+    assert len(server.queries) == 2
+
+
+def test_endpoint_errors(server):
+    with pytest.raises(ValueError):
+        SparqlEndpoint("ftp://example.org/sparql")
+    with SparqlEndpoint(server.url) as endpoint:
+        with pytest.raises(EndpointError):
+            endpoint.select("not a query")
+        # The connection stays usable after an error
+        assert endpoint.select("SELECT ?s WHERE { ?s ?p ?o } LIMIT 1")
+    assert server.connections == 1
+
+
+def test_fetch_ontology_from_endpoint(server):
+    config = SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH)
+    with SparqlEndpoint(server.url) as endpoint:
+        ontology, concepts, properties, enumerations = fetch_ontology_from_endpoint(
+            endpoint, config, parallel=True
+        )
+    expected = fetch_ontology(CUSTODIAN_FILE_PATH, config)
+
+    assert ontology == expected[0]
+    assert sorted(concepts) == sorted(expected[1])
+    assert sorted(properties) == sorted(expected[2])
+    assert sorted(enumerations) == sorted(expected[3])
@@ -1,15 +1,47 @@
 import pytest
+import rdflib
 
-from respecter.helpers import extract_fragment_identifier, format_value
+from respecter.compaction import UriCompactor
+from respecter.helpers import (
+    extract_fragment_identifier,
+    extract_terms,
+    format_classes,
+)
+from respecter.models import Class
+from respecter.sparql import query_rows, SparqlConfig
 
 
 def test_extract_fragment_identifier():
     assert extract_fragment_identifier("https://example.com/respecter", "/") == "respecter"
     assert extract_fragment_identifier("https://example.com#respecter", "#") == "respecter"
 
-def test_format_value():
-    assert format_value({"type": "uri", "value": "https://example.com/respecter"}, 
-                        current_ontology_url="https://example.com/") == '<a href="#respecter">https://example.com/respecter</a>'
-    assert format_value({"type": "uri", "value": "https://example.com/respecter"},
-                        current_ontology_url="https://my-other-example.com/") == '<a href="https://example.com/respecter">https://example.com/respecter</a>'
-    assert format_value({"type": "litteral", "value": "Respecter"}) == "Respecter"
+
+def test_extract_terms():
+    graph = rdflib.Graph()
+    graph.parse("examples/custodian/custodian.ttl")
+    config = SparqlConfig.from_path("examples/custodian/config.yaml")
+    concepts_rows = query_rows(graph, config.build_concepts_query())
+    enumerations_rows = query_rows(graph, config.build_enumerations_query())
+    compactor = UriCompactor.from_graph(graph, current_ontology_url="https://example.com/")
+
+    classes, properties, enumerations = extract_terms(concepts_rows, enumerations_rows, compactor)
+
+    assert len(classes) > 0 and len(properties) > 0 and len(enumerations) > 0
+    data_handling = classes["Data Handling"]
+    assert data_handling.term.uri == "https://swissdatacustodian.ch/doc/ontology#DataHandling"
+    assert data_handling.fragment_identifier == "DataHandling"
+    assert any(term.uri == "https://w3id.org/dpv#hasDataController" for term in data_handling.property)
+    # extract_terms orders the rows first, so the order of the results does not matter
+    assert (classes, properties, enumerations) == extract_terms(concepts_rows[::-1], enumerations_rows[::-1], compactor)
+
+
+def test_format_classes():
+    classes = {"a": Class(label="A", term="https://example.com/A"), "b": Class(label="B", term="https://example.com/B")}
+
+    formatted = format_classes(classes)
+
+    assert len(formatted) == 2 and formatted
+    assert list(formatted) == [term.to_dict() for term in classes.values()]
+    # Each iteration formats the terms again
+    assert list(formatted) == list(formatted)
+    assert not format_classes({})
@@ -0,0 +1,119 @@
+import io
+from pathlib import Path
+
+import pytest
+import rdflib
+from rdflib.namespace import OWL, RDF, SKOS
+
+from respecter.cache import GraphCache
+from respecter.core import fetch_ontology, write_template
+from respecter.imports import ImportCatalog, parse_imports, resolve_imports
+from respecter.sparql import SparqlConfig
+from respecter.watch import LiveBuild
+
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml")
+CUSTODIAN_ONTOLOGY = rdflib.URIRef("https://swissdatacustodian.ch/doc/ontology#")
+DEFINITIONS = rdflib.URIRef("https://example.org/definitions")
+LABELS = rdflib.URIRef("https://example.org/labels/")
+
+
+def _render(*models) -> str:
+    sink = io.StringIO()
+    write_template(sink, *models)
+    return sink.getvalue()
+
+
+def test_catalog(tmp_path, split_ontology):
+    catalog = ImportCatalog.from_path(tmp_path / "catalog.yaml")
+    assert catalog.resolve("https://example.org/definitions#") == tmp_path / "definitions.ttl"
+    assert catalog.resolve("https://example.org/labels/") == tmp_path / "labels.nt"
+    assert catalog.resolve("https://example.org/missing") is None
+    assert catalog.paths == [tmp_path / "catalog.yaml", tmp_path / "definitions.ttl", tmp_path / "labels.nt"]
+
+    # Protégé catalogs list the imports as uri elements
+    (tmp_path / "catalog-v001.xml").write_text(
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        '<catalog prefer="public" xmlns="urn:oasis:names:tc:entity:xmlns:xml:catalog">\n'
+        '    <uri id="Imports" name="https://example.org/definitions" uri="definitions.ttl"/>\n'
+        "</catalog>\n"
+    )
+    assert ImportCatalog.from_path(tmp_path / "catalog-v001.xml").entries == {
+        "https://example.org/definitions": tmp_path / "definitions.ttl"
+    }
+
+    # The digest changes with the content of the imported files
+    digest = catalog.digest()
+    (tmp_path / "labels.nt").write_text("")
+    assert catalog.digest() != digest
+
+    (tmp_path / "invalid.yaml").write_text("- definitions.ttl\n")
+    with pytest.raises(ValueError):
+        ImportCatalog.from_path(tmp_path / "invalid.yaml")
+    # Entries without a path
+    (tmp_path / "invalid.yaml").write_text("imports:\n  https://example.org/definitions:\n")
+    with pytest.raises(ValueError):
+        ImportCatalog.from_path(tmp_path / "invalid.yaml")
+
+
+@pytest.mark.parametrize("filter_triples", [False, True])
+def test_fetch_ontology_imports(tmp_path, split_ontology, filter_triples):
+    ontology_path = split_ontology
+    config = SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH)
+    catalog = ImportCatalog.from_path(tmp_path / "catalog.yaml")
+    expected = open("examples/custodian/custodian.html").read()
+
+    assert _render(*fetch_ontology(ontology_path, config, filter_triples=filter_triples)) != expected
+    # The imported definitions and labels are merged, without the metadata of the imported ontologies
+    models = fetch_ontology(ontology_path, config, filter_triples=filter_triples, catalog=catalog)
+    assert _render(*models) == expected
+
+    cache = GraphCache(tmp_path / "cache")
+    for _ in range(2):
+        models = fetch_ontology(ontology_path, config, filter_triples=filter_triples, catalog=catalog, cache=cache)
+        assert _render(*models) == expected
+    # The ontology and each import are cached once
+    assert len(list(cache.directory.iterdir())) == 3
+
+
+def test_parse_imports(tmp_path, split_ontology):
+    paths = [tmp_path / "definitions.ttl", tmp_path / "labels.nt"]
+    cache = GraphCache(tmp_path / "cache")
+
+    # Parsed in worker processes, and stored in the cache by the current process
+    graphs = parse_imports(paths, cache=cache, workers=2)
+    assert [len(graph) for graph in graphs] == [len(rdflib.Graph().parse(path)) for path in paths]
+    assert all(cache.get(cache.key(path)) is not None for path in paths)
+    assert [set(graph) for graph in parse_imports(paths, cache=cache)] == [set(graph) for graph in graphs]
+
+
+def test_resolve_imports(tmp_path, split_ontology):
+    graph = rdflib.Graph().parse(split_ontology)
+    catalog = ImportCatalog.from_path(tmp_path / "catalog.yaml")
+
+    assert resolve_imports(graph, catalog) == [str(DEFINITIONS), str(LABELS)]
+    assert set(graph.subjects(RDF.type, OWL.Ontology)) == {CUSTODIAN_ONTOLOGY}
+    assert graph.value(rdflib.URIRef("https://swissdatacustodian.ch/doc/ontology#Signature"), SKOS.prefLabel)
+
+
+def test_resolve_missing_file(tmp_path, split_ontology, capsys):
+    graph = rdflib.Graph().parse(split_ontology)
+    (tmp_path / "labels.nt").unlink()
+    catalog = ImportCatalog.from_path(tmp_path / "catalog.yaml")
+
+    # Like an import that is not in the catalog, the missing file is skipped
+    assert resolve_imports(graph, catalog, cache=GraphCache(tmp_path / "cache")) == [str(DEFINITIONS)]
+    assert "labels.nt of import https://example.org/labels/ does not exist" in capsys.readouterr().err
+
+
+def test_live_build_imports(tmp_path, split_ontology):
+    ontology_path = split_ontology
+    catalog = ImportCatalog.from_path(tmp_path / "catalog.yaml")
+    live_build = LiveBuild(ontology_path, CUSTODIAN_CONFIG_FILE_PATH, None, catalog=catalog)
+    assert set(catalog.paths) <= set(live_build.paths)
+    live_build.build()
+
+    # A change of an imported file parses the ontology and its imports again
+    definitions = tmp_path / "definitions.ttl"
+    definitions.write_text(definitions.read_text().replace("A unique label or code", "An edited label"))
+    assert live_build.build([definitions]) == ["parse", "query", "render"]
+    assert "An edited label" in live_build.text
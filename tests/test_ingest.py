@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import rdflib
+from rdflib.namespace import RDF, RDFS, SH, SKOS
+
+from respecter.core import fetch_ontology
+from respecter.ingest import PredicateFilter, parse_graph, query_predicates
+from respecter.sparql import SparqlConfig
+
+IMAGING_FILE_PATH = Path("examples/imaging/imaging.ttl")
+IMAGING_CONFIG_FILE_PATH = Path("examples/imaging/sparql_config_imaging.yaml")
+
+
+def test_query_predicates():
+    query = """
+    PREFIX sh: <http://www.w3.org/ns/shacl#>
+    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    SELECT * WHERE {
+        ?shape a sh:PropertyShape ; ?predicate ?object .
+        OPTIONAL { ?shape sh:or/rdf:rest*/rdf:first ?option }
+    }
+    """
+    assert query_predicates(query) == {RDF.type, SH["or"], RDF.rest, RDF.first}
+
+
+def test_predicate_filter():
+    predicate_filter = SparqlConfig.from_path(IMAGING_CONFIG_FILE_PATH).get_predicate_filter()
+    assert RDFS.subClassOf in predicate_filter
+    # The whole SHACL vocabulary is kept, e.g. for the members of sh:or lists
+    assert SH.hasValue in predicate_filter
+    assert SKOS.related not in predicate_filter
+    assert predicate_filter.key() != PredicateFilter(frozenset(), ()).key()
+
+
+def test_parse_graph():
+    predicate_filter = SparqlConfig.from_path(IMAGING_CONFIG_FILE_PATH).get_predicate_filter()
+    graph = parse_graph(IMAGING_FILE_PATH, predicate_filter)
+    full_graph = rdflib.Graph().parse(IMAGING_FILE_PATH)
+
+    assert 0 < len(graph) < len(full_graph)
+    assert len(graph) + graph.store.dropped == len(full_graph)
+    assert all(predicate in predicate_filter for predicate in graph.predicates())
+
+
+def test_fetch_filtered_ontology():
+    config = SparqlConfig.from_path(IMAGING_CONFIG_FILE_PATH)
+    ontology, concepts, properties, enumerations = fetch_ontology(IMAGING_FILE_PATH, config, filter_triples=True)
+    expected = fetch_ontology(IMAGING_FILE_PATH, config)
+
+    assert ontology == expected[0]
+    assert sorted(concepts) == sorted(expected[1])
+    assert sorted(properties) == sorted(expected[2])
+    assert sorted(enumerations) == sorted(expected[3])
@@ -0,0 +1,12 @@
+from respecter.models import add_member, MAX_TUPLE_MEMBERS
+
+
+def test_add_member():
+    members = ()
+    for member in ["a", "b", "a"]:
+        members = add_member(members, member)
+    assert members == ("a", "b")
+
+    for member in range(MAX_TUPLE_MEMBERS):
+        members = add_member(members, member)
+    assert list(members) == ["a", "b", *range(MAX_TUPLE_MEMBERS)]
@@ -0,0 +1,62 @@
+import io
+import re
+from pathlib import Path
+import pytest
+
+from respecter.core import fetch_ontology, write_template
+from respecter.pages import INDEX_PAGE, Split, split_pages, write_pages
+from respecter.sparql import SparqlConfig
+
+IMAGING_FILE_PATH = Path("examples/imaging/imaging.ttl")
+IMAGING_CONFIG_FILE_PATH = Path("examples/imaging/sparql_config_imaging.yaml")
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl")
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml")
+CUSTODIAN_HTML_PATH = Path("examples/custodian/custodian.html")
+
+
+@pytest.fixture(scope="module")
+def imaging():
+    return fetch_ontology(IMAGING_FILE_PATH, SparqlConfig.from_path(IMAGING_CONFIG_FILE_PATH))
+
+
+@pytest.mark.parametrize("split", list(Split))
+def test_split_pages(imaging, split):
+    _, concepts, properties, enumerations = imaging
+    pages = split_pages(concepts, properties, enumerations, split=split, page_size=10)
+
+    assert len({page.name for page in pages}) == len(pages)
+    assert {label for page in pages for label in page.concepts} == set(concepts)
+    assert {label for page in pages for label in page.properties} == set(properties)
+    assert {label for page in pages for label in page.enumerations} == set(enumerations)
+    if split == Split.class_:
+        assert sum(1 for page in pages if page.concepts) == len(concepts)
+    if split == Split.size:
+        assert all(len(page.concepts) + len(page.properties) <= 10 for page in pages)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_write_pages(imaging, tmp_path, workers):
+    ontology, concepts, properties, enumerations = imaging
+    pages = split_pages(concepts, properties, enumerations, split=Split.group, page_size=10)
+    paths = write_pages(tmp_path, ontology, pages, workers=workers)
+
+    assert [path.name for path in paths] == [INDEX_PAGE] + [page.name for page in pages]
+    ids = {path.name: set(re.findall(r'id="([^"]*)"', path.read_text())) for path in paths}
+    links = [link for path in paths for link in re.findall(r'href="([^"#:]*)#([^"]*)"', path.read_text())]
+    assert len(links) > 0
+    # Links to the terms of the ontology resolve to a fragment of the page documenting them
+    for page, fragment in links:
+        assert fragment in ids[page]
+
+
+def test_write_pages_keeps_single_page_links(tmp_path):
+    models = fetch_ontology(CUSTODIAN_FILE_PATH, SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH))
+    ontology, concepts, properties, enumerations = models
+    pages = split_pages(concepts, properties, enumerations, split=Split.class_)
+    paths = write_pages(tmp_path, ontology, pages, workers=1)
+    assert re.search(r'href="class-[^"#:]+\.html#', paths[1].read_text())
+
+    # The links to the pages only apply while rendering them
+    single_page = io.StringIO()
+    write_template(single_page, *models)
+    assert single_page.getvalue() == CUSTODIAN_HTML_PATH.read_text()
@@ -0,0 +1,29 @@
+from pathlib import Path
+import pytest
+import rdflib
+
+from respecter import parallel
+from respecter.parallel import graph_pool, shared_graph
+
+LANGUAGES_DATA_FILE_PATH = Path("tests/data/languages.ttl")
+
+
+def graph_size():
+    return len(shared_graph())
+
+
+@pytest.mark.parametrize("fork", [True, False])
+def test_graph_pool(monkeypatch, fork):
+    graph = rdflib.Graph()
+    graph.parse(LANGUAGES_DATA_FILE_PATH)
+    if not fork:
+        # Fall back to sharing the graph through a snapshot file
+        monkeypatch.setattr(parallel, "fork_context", lambda: None)
+
+    with graph_pool(graph, max_workers=2) as pool:
+        assert pool.submit(graph_size).result() == len(graph)
+
+
+def test_shared_graph_outside_pool():
+    with pytest.raises(RuntimeError):
+        shared_graph()
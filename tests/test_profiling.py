@@ -0,0 +1,38 @@
+import io
+import json
+import pstats
+from pathlib import Path
+
+from respecter.core import fetch_ontology, write_template
+from respecter.profiling import Profiler, profile_phase
+from respecter.sparql import SparqlConfig
+
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl")
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml")
+
+
+def test_profile_pipeline(tmp_path):
+    profiler = Profiler(capture_stats=True)
+    config = SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH)
+    results = fetch_ontology(CUSTODIAN_FILE_PATH, config, profiler=profiler)
+    write_template(io.StringIO(), *results, profiler=profiler)
+    profiler.stop()
+
+    phases = {phase.name: phase for phase in profiler.phases}
+    assert list(phases) == ["parse", "query_ontology", "query_concepts", "query_enumerations", "extract", "render"]
+    assert phases["parse"].counts["triples"] > 0
+    assert phases["extract"].counts["classes"] == len(results[1])
+    assert all(phase.wall_seconds > 0 and phase.peak_memory > 0 for phase in profiler.phases)
+
+    profiler.dump(tmp_path / "profile.json", ontology=str(CUSTODIAN_FILE_PATH))
+    profile = json.loads((tmp_path / "profile.json").read_text())
+    assert profile["ontology"] == str(CUSTODIAN_FILE_PATH)
+    assert len(profile["phases"]) == 6
+
+    assert profiler.dump_stats(tmp_path / "profile.prof") == profiler.slowest_phase().name
+    assert pstats.Stats(str(tmp_path / "profile.prof")).total_calls > 0
+
+
+def test_profile_phase_without_profiler():
+    with profile_phase(None, "parse") as phase:
+        phase.count(triples=1)
@@ -0,0 +1,81 @@
+import json
+from pathlib import Path
+
+import pytest
+import rdflib
+
+from respecter.compaction import UriCompactor
+from respecter.core import fetch_ontology
+from respecter.models import Class, Ontology
+from respecter.renderers import output_format, term_catalogue, write_outputs
+from respecter.sparql import SparqlConfig
+
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl")
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml")
+
+
+@pytest.fixture(scope="module")
+def models():
+    return fetch_ontology(CUSTODIAN_FILE_PATH, SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH))
+
+
+def test_output_format():
+    assert output_format(Path("doc.html")) == "html"
+    assert output_format(Path("terms.JSON")) == "json"
+    assert output_format(Path("wiki/doc.md")) == "markdown"
+    with pytest.raises(ValueError):
+        output_format(Path("doc.pdf"))
+
+
+def test_term_catalogue(models):
+    qnames = {}
+    catalogue = term_catalogue(*models, qnames=qnames)
+    ontology, concepts, properties, enumerations = models
+
+    assert catalogue["ontology"] == ontology.to_dict()
+    assert [entry["label"] for entry in catalogue["classes"]] == list(concepts)
+    assert [entry["label"] for entry in catalogue["properties"]] == list(properties)
+    assert len(catalogue["enumerations"]) == len(enumerations)
+
+    signature = next(entry for entry in catalogue["classes"] if entry["label"] == "Signature")
+    assert signature["uri"] == "https://swissdatacustodian.ch/doc/ontology#Signature"
+    assert signature["qname"] == "sdc:Signature"
+    assert "https://swissdatacustodian.ch/doc/ontology#hasSignee" in signature["properties"]
+    # Every related term has a prefixed name, and no HTML is left in the catalogue
+    assert all(uri in qnames for entry in catalogue["properties"] for uri in entry["domain"] + entry["range"])
+    assert "<a " not in json.dumps(catalogue)
+
+
+def test_term_catalogue_uri_definition():
+    compactor = UriCompactor.from_graph(rdflib.Graph(), current_ontology_url="https://example.com/")
+    concepts = {
+        "A": Class(
+            label="A",
+            definition=compactor.term(rdflib.URIRef("https://example.com/definitions#A")),
+            term=compactor.term(rdflib.URIRef("https://example.com/A")),
+        )
+    }
+    catalogue = term_catalogue(Ontology(), concepts, {}, {})
+
+    # A definition given as a URI is written as the URI, not as its HTML anchor
+    assert catalogue["classes"][0]["definition"] == "https://example.com/definitions#A"
+
+
+def test_write_outputs(models, tmp_path):
+    outputs = [tmp_path / "custodian.html", tmp_path / "custodian.json", tmp_path / "custodian.md"]
+    assert write_outputs(outputs, *models, workers=3) == outputs
+
+    assert outputs[0].read_text() == open("examples/custodian/custodian.html").read()
+    assert json.loads(outputs[1].read_text()) == term_catalogue(*models)
+    markdown = outputs[2].read_text()
+    assert markdown.startswith("# Swiss Data Custodian Contract Ontology\n")
+    assert "### Signature\n\n[`sdc:Signature`](https://swissdatacustodian.ch/doc/ontology#Signature)" in markdown
+
+    # The outputs rendered in worker processes are the same as in the current process
+    serial = [tmp_path / "serial" / path.name for path in outputs]
+    serial[0].parent.mkdir()
+    write_outputs(serial, *models, workers=1)
+    assert [path.read_text() for path in serial] == [path.read_text() for path in outputs]
+
+    with pytest.raises(ValueError):
+        write_outputs([tmp_path / "custodian.pdf"], *models)
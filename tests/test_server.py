@@ -0,0 +1,110 @@
+import http.client
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+
+from respecter.build import BuildItem, BuildOptions
+from respecter.server import DocumentationServer
+
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl")
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml")
+IMAGING_FILE_PATH = Path("examples/imaging/imaging.ttl")
+IMAGING_CONFIG_FILE_PATH = Path("examples/imaging/sparql_config_imaging.yaml")
+
+
+@pytest.fixture
+def ontology_path(tmp_path):
+    path = tmp_path / "custodian.ttl"
+    shutil.copy(CUSTODIAN_FILE_PATH, path)
+    return path
+
+
+@pytest.fixture
+def server(ontology_path, tmp_path):
+    items = [BuildItem(ontology_path, CUSTODIAN_CONFIG_FILE_PATH, Path("custodian.html"))]
+    server = DocumentationServer(items, BuildOptions(no_cache=True), ("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get(server, path, headers=None):
+    connection = http.client.HTTPConnection(*server.server_address[:2])
+    try:
+        connection.request("GET", path, headers=headers or {})
+        response = connection.getresponse()
+        return response, response.read()
+    finally:
+        connection.close()
+
+
+def test_serve(server, ontology_path):
+    response, body = _get(server, "/")
+    assert response.status == 200
+    assert b'href="/custodian.html"' in body
+
+    response, body = _get(server, "/custodian.html")
+    assert response.status == 200
+    assert body.decode("utf-8") == open("examples/custodian/custodian.html").read()
+    etag = response.getheader("ETag")
+    last_modified = response.getheader("Last-Modified")
+    assert etag and last_modified
+
+    # The page is served from memory, and revalidated with its ETag or modification time
+    assert _get(server, "/custodian.html", {"If-None-Match": etag})[0].status == 304
+    assert _get(server, "/custodian.html", {"If-Modified-Since": last_modified})[0].status == 304
+
+    # A change of the ontology renders the page again
+    ontology_path.write_text(ontology_path.read_text().replace("A unique label or code", "An edited label"))
+    response, body = _get(server, "/custodian.html", {"If-None-Match": etag})
+    assert response.status == 200
+    assert response.getheader("ETag") != etag
+    assert b"An edited label" in body
+
+    assert _get(server, "/missing.html")[0].status == 404
+
+
+def test_serve_errors(server, ontology_path):
+    ontology_path.write_text("not turtle")
+    assert _get(server, "/custodian.html")[0].status == 500
+
+    with pytest.raises(ValueError):
+        DocumentationServer(
+            [BuildItem(CUSTODIAN_FILE_PATH, CUSTODIAN_CONFIG_FILE_PATH, Path(f"{name}/custodian.html")) for name in "ab"],
+            address=("127.0.0.1", 0),
+        )
+
+
+def test_warm(ontology_path, tmp_path):
+    imaging_path = tmp_path / "imaging.ttl"
+    shutil.copy(IMAGING_FILE_PATH, imaging_path)
+    items = [
+        BuildItem(ontology_path, CUSTODIAN_CONFIG_FILE_PATH, Path("custodian.html")),
+        BuildItem(imaging_path, IMAGING_CONFIG_FILE_PATH, Path("imaging.html")),
+    ]
+    server = DocumentationServer(items, BuildOptions(no_cache=True), ("127.0.0.1", 0))
+    try:
+        # Rendered in worker processes, and served from the terms they send back
+        assert server.warm(workers=2) == []
+        site = server.sites["custodian.html"]
+        assert site.page().body.decode("utf-8") == open("examples/custodian/custodian.html").read()
+        assert site.live_build.graph is None
+
+        # A change of the ontology parses it and only re-runs the stages of that page
+        ontology_path.write_text(ontology_path.read_text().replace("A unique label or code", "An edited label"))
+        assert b"An edited label" in site.page().body
+        assert len(site.live_build.graph) > 0
+        assert server.sites["imaging.html"].page().body
+
+        ontology_path.write_text("not turtle")
+        failures = DocumentationServer(items, BuildOptions(no_cache=True), ("127.0.0.1", 0))
+        try:
+            assert [name for name, _ in failures.warm(workers=2)] == ["custodian.html"]
+        finally:
+            failures.server_close()
+    finally:
+        server.server_close()
@@ -0,0 +1,52 @@
+from collections import Counter
+from pathlib import Path
+import pytest
+import rdflib
+
+from respecter.shacl import concepts_rows, enumerations_rows, resolve_term
+from respecter.sparql import query_rows, SparqlConfig
+
+EXAMPLES = [
+    (Path("examples/custodian/custodian.ttl"), Path("examples/custodian/config.yaml")),
+    (Path("examples/imaging/imaging.ttl"), Path("examples/imaging/sparql_config_imaging.yaml")),
+]
+
+
+def row_key(row):
+    return tuple(sorted(row.items()))
+
+
+def load(ontology_path, config_path):
+    graph = rdflib.Graph()
+    graph.parse(ontology_path)
+    return graph, SparqlConfig.from_path(config_path)
+
+
+@pytest.mark.parametrize("ontology_path,config_path", EXAMPLES)
+def test_concepts_rows_match_sparql(ontology_path, config_path):
+    graph, config = load(ontology_path, config_path)
+    expected = query_rows(graph, config.build_concepts_query())
+    rows = list(concepts_rows(graph, config))
+
+    assert len(rows) > 0
+    assert Counter(map(row_key, rows)) == Counter(map(row_key, expected))
+
+
+@pytest.mark.parametrize("ontology_path,config_path", EXAMPLES)
+def test_enumerations_rows_match_sparql(ontology_path, config_path):
+    graph, config = load(ontology_path, config_path)
+    expected = query_rows(graph, config.build_enumerations_query())
+    rows = list(enumerations_rows(graph, config))
+
+    assert len(rows) > 0
+    assert Counter(map(row_key, rows)) == Counter(map(row_key, expected))
+
+
+def test_resolve_term():
+    assert resolve_term("<https://example.com/label>") == rdflib.URIRef("https://example.com/label")
+    assert resolve_term("skos:definition") == rdflib.SKOS.definition
+    # The prefixes of the queries, whatever prefixes the graph binds
+    assert resolve_term("schema:name") == rdflib.URIRef("http://schema.org/name")
+    assert resolve_term("sdc:DataCategory") == rdflib.URIRef("https://swissdatacustodian.ch/doc/ontology#DataCategory")
+    with pytest.raises(ValueError):
+        resolve_term("unknown:label")
@@ -2,9 +2,11 @@ from pathlib import Path
 import pytest
 import rdflib
 
-from respecter.sparql import run_query, SparqlConfig
+from respecter.sparql import hash_join, plan_concepts_rows, query_rows, rows_to_json, run_query, SparqlConfig
 
 LANGUAGES_DATA_FILE_PATH = Path("tests/data/languages.ttl")
+OR_SHAPES_DATA_FILE_PATH = Path("tests/data/or_shapes.ttl")
+IMAGING_CONFIG_FILE_PATH = Path("examples/imaging/sparql_config_imaging.yaml")
 SPARQL_FILE_PATH = Path("tests/sparql/languages.sparql")
 SPARQL_CONFIG_FILE_PATH = Path("tests/config/sparql_config.yaml")
 
@@ -15,11 +17,13 @@ SELECT ?subject WHERE {
 }
 """
 
+
 def load_graph():
     graph = rdflib.Graph()
     graph.parse(LANGUAGES_DATA_FILE_PATH, format="ttl")
     return graph
 
+
 def test_sparql_query():
     graph = load_graph()
     query_results = run_query(graph, SAMPLE_SPARQL)
@@ -28,6 +32,15 @@ def test_sparql_query():
     assert len(bindings) == 1
     assert bindings[0].get("subject", {}).get("value", "") == "https://example.com/Alice"
 
+
+def test_query_rows():
+    graph = load_graph()
+    rows = query_rows(graph, SAMPLE_SPARQL)
+
+    assert rows == [{"subject": rdflib.URIRef("https://example.com/Alice")}]
+    assert rows_to_json(rows) == run_query(graph, SAMPLE_SPARQL)
+
+
 def test_load_sparql_config():
     sparql_config = SparqlConfig.from_path(SPARQL_CONFIG_FILE_PATH)
     assert sparql_config.get_uri_base() == "https://example.com"
@@ -38,3 +51,52 @@ def test_load_sparql_config():
     assert sparql_config.get_predicate("definition") == "<http://www.w3.org/2000/01/rdf-schema#comment>"
     assert sparql_config.get_predicate("example") == "<http://www.w3.org/2004/02/skos/core#example>"
     assert sparql_config.get_predicate("label") == "<http://www.w3.org/2000/01/rdf-schema#label>"
+
+
+def test_hash_join():
+    left = [{"a": 1, "b": 2}, {"a": 2, "b": 3}]
+    right = [{"a": 1, "c": 4}, {"a": 1, "c": 5}]
+
+    assert list(hash_join(left, right, ["a"])) == [{"a": 1, "b": 2, "c": 4}, {"a": 1, "b": 2, "c": 5}]
+    assert list(hash_join(left, right, ["a"], optional=True))[-1] == {"a": 2, "b": 3}
+
+
+def test_plan_concepts_rows():
+    graph = rdflib.Graph()
+    graph.parse(OR_SHAPES_DATA_FILE_PATH)
+    config = SparqlConfig.from_path(IMAGING_CONFIG_FILE_PATH)
+    expected = query_rows(graph, config.build_concepts_query())
+    rows = plan_concepts_rows(lambda query: query_rows(graph, query), config)
+
+    def key(row):
+        return tuple(sorted(row.items()))
+
+    # The sh:or members repeat the address rows once per predicate
+    assert len(rows) < len(expected)
+    assert sorted(map(key, rows)) == sorted(set(map(key, expected)))
+
+
+def test_plan_concepts_rows_shared_path():
+    graph = rdflib.Graph()
+    graph.parse(OR_SHAPES_DATA_FILE_PATH)
+    graph.parse(
+        data="""
+        @prefix ex: <https://example.com/> .
+        @prefix sh: <http://www.w3.org/ns/shacl#> .
+        @prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+
+        ex:PersonShape sh:property ex:requiredNameShape .
+
+        ex:requiredNameShape a sh:PropertyShape ;
+            sh:path ex:name ;
+            sh:datatype xsd:string ;
+            sh:minCount 1 .
+        """,
+        format="turtle",
+    )
+    config = SparqlConfig.from_path(IMAGING_CONFIG_FILE_PATH)
+    rows = plan_concepts_rows(lambda query: query_rows(graph, query), config)
+
+    name_rows = [row for row in rows if row["property"] == rdflib.URIRef("https://example.com/name")]
+    assert len(name_rows) == 1
+    assert len(set(tuple(sorted(row.items())) for row in rows)) == len(rows)
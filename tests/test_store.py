@@ -0,0 +1,59 @@
+from pathlib import Path
+import pytest
+import rdflib
+from rdflib.compare import isomorphic
+from rdflib.namespace import RDF, SH
+
+import respecter.cache
+from respecter.cache import StoreCache
+from respecter.core import query_ontology
+from respecter.sparql import SparqlConfig
+from respecter.store import SQLiteStore, build_store, open_graph
+
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl")
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml")
+
+
+def test_build_open_roundtrip(tmp_path):
+    store_path = tmp_path / "custodian.sqlite"
+    graph = rdflib.Graph().parse(CUSTODIAN_FILE_PATH)
+    assert build_store(CUSTODIAN_FILE_PATH, store_path) == len(graph)
+
+    stored = open_graph(store_path)
+    assert isinstance(stored.store, SQLiteStore)
+    assert isomorphic(stored, graph)
+    assert list(stored.namespaces()) == list(graph.namespaces())
+    assert set(stored.subjects(RDF.type, SH.NodeShape)) == set(graph.subjects(RDF.type, SH.NodeShape))
+    # Terms missing from the store match no triple
+    assert list(stored.triples((rdflib.URIRef("https://example.org/missing"), None, None))) == []
+
+    with pytest.raises(ValueError):
+        stored.add((rdflib.URIRef("https://example.org/s"), RDF.type, SH.NodeShape))
+
+
+def test_open_invalid_store(tmp_path):
+    with pytest.raises(ValueError):
+        open_graph(tmp_path / "missing.sqlite")
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_query_store(tmp_path, parallel):
+    store_path = tmp_path / "custodian.sqlite"
+    build_store(CUSTODIAN_FILE_PATH, store_path)
+    config = SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH)
+
+    def rows(graph):
+        results = query_ontology(graph, config, parallel=parallel)
+        return {stage: sorted(map(sorted, (row.items() for row in stage_rows))) for stage, stage_rows in results.items()}
+
+    assert rows(open_graph(store_path)) == rows(rdflib.Graph().parse(CUSTODIAN_FILE_PATH))
+
+
+def test_store_cache(tmp_path, monkeypatch):
+    cache = StoreCache(tmp_path)
+    graph = cache.load(CUSTODIAN_FILE_PATH)
+    assert (tmp_path / "stores" / (cache.key(CUSTODIAN_FILE_PATH) + StoreCache.suffix)).exists()
+
+    # The store is opened, not built again, on the next load
+    monkeypatch.setattr(respecter.cache, "build_store", None)
+    assert len(cache.load(CUSTODIAN_FILE_PATH)) == len(graph)
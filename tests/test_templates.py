@@ -0,0 +1,77 @@
+import io
+from pathlib import Path
+
+from respecter.core import fetch_ontology, write_template
+from respecter.sparql import SparqlConfig
+from respecter.templates import FragmentCache, configure_bytecode_cache, get_environment, get_template
+
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl")
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml")
+CUSTODIAN_HTML_PATH = Path("examples/custodian/custodian.html")
+
+CONTEXT = {
+    "ontology": {"title": "Example", "creators": ["Alice"], "contributors": []},
+    "concepts": [{"Label": "Person", "FragmentIdentifier": "Person", "Term": "ex:Person"}],
+    "properties": [],
+    "grouped_enumerations": {},
+}
+
+
+def test_bundled_template():
+    template = get_template()
+    assert template is get_template()
+    # The bundled template includes its partials from the package data
+    models = fetch_ontology(CUSTODIAN_FILE_PATH, SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH))
+    sink = io.StringIO()
+    write_template(sink, *models)
+    assert sink.getvalue() == CUSTODIAN_HTML_PATH.read_text()
+
+
+def test_user_template_with_partials(tmp_path):
+    (tmp_path / "partials").mkdir()
+    (tmp_path / "partials" / "title.html").write_text("<h1>{{ ontology.title }}</h1>")
+    (tmp_path / "custom.html").write_text('{% include "partials/title.html" %}')
+
+    assert get_template("custom.html", [tmp_path]).render(**CONTEXT) == "<h1>Example</h1>"
+    # The bundled template is still available next to the user templates
+    assert get_template("template.html", [tmp_path]) is not None
+
+
+def test_bytecode_cache(tmp_path):
+    environment = get_environment(bytecode_cache_dir=tmp_path)
+    environment.get_template("template.html")
+    assert any(tmp_path.iterdir())
+
+
+def test_configure_bytecode_cache(tmp_path):
+    try:
+        # Under the root directory of the other caches
+        configure_bytecode_cache(tmp_path)
+        get_template("template.html")
+        assert any((tmp_path / "jinja").iterdir())
+
+        configure_bytecode_cache(tmp_path, no_cache=True)
+        assert get_environment().bytecode_cache is None
+    finally:
+        configure_bytecode_cache()
+
+
+def test_fragment_cache(tmp_path):
+    models = fetch_ontology(CUSTODIAN_FILE_PATH, SparqlConfig.from_path(CUSTODIAN_CONFIG_FILE_PATH))
+    cache = FragmentCache()
+    for _ in range(2):
+        sink = io.StringIO()
+        write_template(sink, *models, fragment_cache=cache)
+        cache.prune()
+        assert sink.getvalue() == CUSTODIAN_HTML_PATH.read_text()
+    # The blocks of every class, property and enumeration were rendered once, then reused
+    ontology, concepts, properties, enumerations = models
+    assert cache.misses == cache.hits == len(concepts) + len(properties) + len(enumerations)
+
+    # The blocks are keyed by the template source, and by the values rendered in them
+    (tmp_path / "page.html").write_text("{% for concept in concepts %}{% fragment concept %}{{ concept.Label }},{% endfragment %}{% endfor %}")
+    template = get_template("page.html", [tmp_path])
+    assert template.render(concepts=[{"Label": "A"}, {"Label": "A"}], fragment_cache=cache) == "A,A,"
+    (tmp_path / "page.html").write_text("{% for concept in concepts %}{% fragment concept %}{{ concept.Label }};{% endfragment %}{% endfor %}")
+    template = get_environment([tmp_path]).get_template("page.html")
+    assert template.render(concepts=[{"Label": "A"}, {"Label": "B"}], fragment_cache=cache) == "A;B;"
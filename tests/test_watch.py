@@ -0,0 +1,137 @@
+import shutil
+from pathlib import Path
+
+from respecter.cache import GraphCache
+from respecter.watch import LiveBuild, changed_paths, snapshot, watch_build
+
+CUSTODIAN_FILE_PATH = Path("examples/custodian/custodian.ttl")
+CUSTODIAN_CONFIG_FILE_PATH = Path("examples/custodian/config.yaml")
+
+
+def _live_build(tmp_path, cache=None):
+    ontology_path = tmp_path / "custodian.ttl"
+    config_path = tmp_path / "config.yaml"
+    template_dir = tmp_path / "templates"
+    template_dir.mkdir()
+    shutil.copy(CUSTODIAN_FILE_PATH, ontology_path)
+    shutil.copy(CUSTODIAN_CONFIG_FILE_PATH, config_path)
+    (template_dir / "page.html").write_text("{{ concepts | length }} classes")
+    return LiveBuild(
+        ontology_path,
+        config_path,
+        tmp_path / "custodian.html",
+        template_name="page.html",
+        template_dirs=[template_dir],
+        cache=cache,
+    )
+
+
+def test_snapshot(tmp_path):
+    live_build = _live_build(tmp_path)
+    before = snapshot(live_build.paths)
+    assert set(before) == {live_build.ontology_path, live_build.config_path, tmp_path / "templates" / "page.html"}
+
+    (tmp_path / "templates" / "partial.html").write_text("partial")
+    live_build.config_path.write_text(live_build.config_path.read_text() + "\n")
+    assert changed_paths(before, snapshot(live_build.paths)) == [
+        live_build.config_path,
+        tmp_path / "templates" / "partial.html",
+    ]
+
+
+def test_live_build(tmp_path):
+    live_build = _live_build(tmp_path)
+    assert live_build.build() == ["parse", "query", "render"]
+    classes = live_build.output.read_text()
+    assert classes.endswith(" classes\n")
+
+    # A template change only renders again
+    template_path = tmp_path / "templates" / "page.html"
+    template_path.write_text("{{ properties | length }} properties")
+    assert live_build.build([template_path]) == ["render"]
+    assert live_build.output.read_text().endswith(" properties\n")
+
+    # A config change re-runs the queries on the parsed graph
+    assert live_build.build([live_build.config_path]) == ["query", "render"]
+
+    # An ontology change parses it again
+    graph = live_build.graph
+    with open(live_build.ontology_path, "a") as f:
+        f.write("\n<https://example.org/A> a <http://www.w3.org/2002/07/owl#Class> .\n")
+    assert live_build.build([live_build.ontology_path]) == ["parse", "query", "render"]
+    assert len(live_build.graph) == len(graph) + 1
+
+
+def test_live_build_cache(tmp_path):
+    cache = GraphCache(tmp_path / "cache")
+    live_build = _live_build(tmp_path, cache=cache)
+    live_build.build()
+    entries = list(cache.directory.iterdir())
+    assert len(entries) == 1
+
+    # The edited ontology is parsed again without adding an entry to the cache
+    with open(live_build.ontology_path, "a") as f:
+        f.write("\n<https://example.org/A> a <http://www.w3.org/2002/07/owl#Class> .\n")
+    assert live_build.build([live_build.ontology_path]) == ["parse", "query", "render"]
+    assert list(cache.directory.iterdir()) == entries
+
+
+def test_live_build_restore(tmp_path):
+    built = _live_build(tmp_path)
+    built.build()
+    live_build = LiveBuild(
+        built.ontology_path, built.config_path, built.output, template_name=built.template_name, template_dirs=built.template_dirs
+    )
+    live_build.restore(built.terms, built.text)
+
+    # A template change renders the restored terms without parsing the ontology
+    template_path = tmp_path / "templates" / "page.html"
+    template_path.write_text("{{ properties | length }} properties")
+    assert live_build.build([template_path]) == ["render"]
+    assert live_build.graph is None
+
+    # The graph is parsed once the queries run again
+    assert live_build.build([live_build.config_path]) == ["parse", "query", "render"]
+    assert len(live_build.graph) == len(built.graph)
+
+
+def test_live_build_fragments(tmp_path):
+    ontology_path = tmp_path / "custodian.ttl"
+    shutil.copy(CUSTODIAN_FILE_PATH, ontology_path)
+    live_build = LiveBuild(ontology_path, CUSTODIAN_CONFIG_FILE_PATH, None)
+    live_build.build()
+    blocks = live_build.fragments.misses
+
+    # After an edit, the ontology is parsed and queried again, but only the block of the
+    # edited term is rendered again: the others are keyed by their raw data
+    ontology_path.write_text(ontology_path.read_text().replace("A unique label or code", "An edited label"))
+    assert live_build.build([ontology_path]) == ["parse", "query", "render"]
+    assert live_build.fragments.misses == blocks + 1
+    assert live_build.fragments.hits == blocks - 1
+    assert "An edited label" in live_build.text
+    assert len(live_build.fragments.fragments) == blocks
+
+
+def test_watch_build(tmp_path, capsys):
+    live_build = _live_build(tmp_path)
+    template_path = tmp_path / "templates" / "page.html"
+    calls = []
+
+    def stop():
+        calls.append(None)
+        if len(calls) == 1:
+            template_path.write_text("edited")
+        elif len(calls) == 2:
+            # An invalid template fails the build, and the watch goes on
+            template_path.write_text("{% if %}")
+        elif len(calls) == 3:
+            template_path.write_text("fixed")
+        return len(calls) > 3
+
+    watch_build(live_build, interval=0.01, stop=stop)
+
+    assert live_build.output.read_text() == "fixed\n"
+    err = capsys.readouterr().err
+    assert err.count("Built") == 3
+    assert "(render)" in err
+    assert "Build failed" in err